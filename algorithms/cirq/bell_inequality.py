@@ -45,18 +45,46 @@ After collecting the measurements:
 """
 # pylint: disable=import-error
 
+import os
+import pathlib
+import sys
+import tempfile
+
 import numpy as np
 
 import cirq
 
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.instrumentation import annotate, instrumented, span
+from src.shot_archive import ShotArchive
+from src.utils import get_simulator, iter_shards, map_shards
+
 
 def bit_string(bits: list[int]) -> str:
     """return bit in string fasion"""
     return ''.join('1' if e else '_' for e in bits)
 
 
-def make_bell_test_circuit() -> cirq.Circuit:
-    """make a bell test circuit"""
+# (Alice XOR Bob) == (x AND y), indexed as [a, b, x, y]
+_A, _B, _X, _Y = np.indices((2, 2, 2, 2))
+WIN_MASK: np.ndarray = (_A ^ _B) == (_X & _Y)
+
+
+@instrumented(stage='build')
+def make_bell_test_circuit(alice_exponent: float = -0.25,
+                           cnot_exponent: float = 0.5,
+                           verbose: bool = False
+                           ) -> cirq.Circuit:
+    """make a bell test circuit
+    alice_exponent: exponent of the X rotation on Alice's qubit
+    cnot_exponent: exponent of the players' controlled-X
+    verbose: print the circuit after each stage
+    """
     # Qubit for Alice, Bob, Refree
     alice: "cirq.devices.grid_qubit.GridQubit" = cirq.GridQubit(0, 0)
     bob: "cirq.devices.grid_qubit.GridQubit" = cirq.GridQubit(1, 0)
@@ -70,23 +98,29 @@ def make_bell_test_circuit() -> cirq.Circuit:
     circuit.append([
         cirq.H(alice),
         cirq.CNOT(alice, bob),
-        cirq.X(alice)**(-0.25)
+        cirq.X(alice)**alice_exponent
         ])
-    print(f'\nIntitial circuit is:\n{circuit}')
+    if verbose:
+        with span('bell_inequality.diagram', stage='print'):
+            print(f'\nIntitial circuit is:\n{circuit}')
 
     # Refrees flip coins
     circuit.append([
         cirq.H(alice_refree),
         cirq.H(bob_refree)
     ])
-    print(f'\nAfter refrees flip coins, circuit is:\n{circuit}')
+    if verbose:
+        with span('bell_inequality.diagram', stage='print'):
+            print(f'\nAfter refrees flip coins, circuit is:\n{circuit}')
 
     # Players do a sqrt(X) based on their referee's coin
     circuit.append([
-        cirq.CNOT(alice_refree, alice)**(0.5),
-        cirq.CNOT(bob_refree, bob)**(0.5)
+        cirq.CNOT(alice_refree, alice)**cnot_exponent,
+        cirq.CNOT(bob_refree, bob)**cnot_exponent
     ])
-    print(f"\nAfter players play sqrt(X):\n{circuit}")
+    if verbose:
+        with span('bell_inequality.diagram', stage='print'):
+            print(f"\nAfter players play sqrt(X):\n{circuit}")
 
     # The results are recorded
     circuit.append([
@@ -95,33 +129,264 @@ def make_bell_test_circuit() -> cirq.Circuit:
         cirq.measure(alice_refree, key='x'),
         cirq.measure(bob_refree, key='y')
     ])
-    print(f"\nAfter collecting the measurements:\n{circuit}")
+    if verbose:
+        with span('bell_inequality.diagram', stage='print'):
+            print(f"\nAfter collecting the measurements:\n{circuit}")
 
     return circuit
 
 
+class BellGameScore:
+    """Win and trial counts of the game, per referee coins (x, y)
+    The counts are accumulated with NumPy reductions, so the score of a
+    huge run can be built chunk by chunk with bounded memory.
+    """
+    wins: np.ndarray
+    trials: np.ndarray
+
+    def __init__(self) -> None:
+        # Indexed as [x, y]
+        self.wins = np.zeros((2, 2), dtype=np.int64)
+        self.trials = np.zeros((2, 2), dtype=np.int64)
+
+    @instrumented(stage='post-process')
+    def update(self,
+               measurements: dict[str, np.ndarray]
+               ) -> 'BellGameScore':
+        """add a batch of `result.measurements` to the score"""
+        a_result: np.ndarray = measurements['a'][:, 0]
+        b_result: np.ndarray = measurements['b'][:, 0]
+        x_result: np.ndarray = measurements['x'][:, 0]
+        y_result: np.ndarray = measurements['y'][:, 0]
+
+        # (Alice XOR Bob) == (x AND y), binned by the referee coins
+        outcomes: np.ndarray = (a_result ^ b_result) == (x_result & y_result)
+        coins: np.ndarray = 2 * x_result.astype(np.intp) + y_result
+        self.trials += np.bincount(coins, minlength=4).reshape(2, 2)
+        self.wins += np.bincount(coins[outcomes], minlength=4).reshape(2, 2)
+        return self
+
+    def merge(self,
+              other: 'BellGameScore'
+              ) -> 'BellGameScore':
+        """add the counts of another (partial) score"""
+        self.wins += other.wins
+        self.trials += other.trials
+        return self
+
+    @property
+    def repetitions(self) -> int:
+        """number of scored shots"""
+        return int(self.trials.sum())
+
+    @property
+    def win_rate(self) -> float:
+        """fraction of the games won"""
+        return float(self.wins.sum() / max(self.repetitions, 1))
+
+    @property
+    def conditional_win_rates(self) -> np.ndarray:
+        """win rate for each (x, y), nan if a pair never occurred"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.wins / self.trials
+
+    def confidence_interval(self,
+                            z_score: float = 1.96
+                            ) -> tuple[float, float]:
+        """Wilson score interval of the win rate, 95% by default"""
+        return wilson_interval(int(self.wins.sum()), self.repetitions,
+                               z_score)
+
+
+def wilson_interval(wins: int,
+                    trials: int,
+                    z_score: float = 1.96
+                    ) -> tuple[float, float]:
+    """Wilson score interval of a success rate, 95% by default"""
+    n_shots: int = max(trials, 1)
+    p_win: float = wins / n_shots
+    denominator: float = 1 + z_score**2 / n_shots
+    center: float = (p_win + z_score**2 / (2 * n_shots)) / denominator
+    half_width: float = z_score * np.sqrt(
+        p_win * (1 - p_win) / n_shots + z_score**2 / (4 * n_shots**2)
+        ) / denominator
+    return float(center - half_width), float(center + half_width)
+
+
+def score_measurements(measurements: dict[str, np.ndarray]
+                       ) -> BellGameScore:
+    """score of one batch of measurements"""
+    return BellGameScore().update(measurements)
+
+
+def run_bell_game(circuit: cirq.Circuit,
+                  repetitions: int,
+                  chunk_size: int = 1_000_000,
+                  simulator: "cirq.Simulator | None" = None,
+                  workers: int = 1,
+                  seed: int | None = None,
+                  archive: ShotArchive | None = None
+                  ) -> BellGameScore:
+    """Sample the game in chunks of at most `chunk_size` shots and
+    score each chunk as it arrives, so the memory stays bounded by the
+    chunk and not by the total number of repetitions
+    The chunks are shards seeded from `seed`, so the score is the same
+    for any number of workers; with workers > 1 they are scored on a
+    process pool, and only the (2, 2) counts come back from the workers.
+    With an `archive`, every chunk is also appended to it as soon as it
+    arrives, so only the shards in flight are held in memory.
+    An explicit `simulator` samples the chunks instead, and ignores
+    `seed` and `workers`.
+    """
+    if simulator is None and archive is not None:
+        score = BellGameScore()
+        for measurements in iter_shards(circuit, repetitions, seed=seed,
+                                        workers=workers,
+                                        shard_size=chunk_size):
+            archive.append(measurements)
+            score.update(measurements)
+        return score
+    if simulator is None:
+        score = BellGameScore()
+        for shard_score in map_shards(circuit, repetitions,
+                                      reducer=score_measurements,
+                                      seed=seed,
+                                      workers=workers,
+                                      shard_size=chunk_size):
+            score.merge(shard_score)
+        return score
+    score = BellGameScore()
+    remaining: int = repetitions
+    while remaining > 0:
+        chunk: int = min(chunk_size, remaining)
+        with span('bell_inequality.run_chunk', stage='sample', shots=chunk):
+            result: "cirq.study.result.ResultDict" = \
+                simulator.run(program=circuit, repetitions=chunk)
+        score.update(result.measurements)
+        if archive is not None:
+            archive.append(result.measurements)
+        remaining -= chunk
+    return score
+
+
+@instrumented(stage='post-process')
+def score_archive(archive: ShotArchive,
+                  chunk_bytes: int = 1 << 20
+                  ) -> BellGameScore:
+    """Score an archived game without unpacking it: on the packed
+    columns a win is ~(a ^ b ^ (x & y)), and the wins and trials of each
+    (x, y) are bit counts, 8 shots per byte
+    """
+    score = BellGameScore()
+    columns: list[np.ndarray] = [archive.column(key) for key in 'abxy']
+    n_bytes: int = len(columns[0])
+    for start in range(0, n_bytes, chunk_bytes):
+        a_bits, b_bits, x_bits, y_bits = (
+            column[start:start + chunk_bytes] for column in columns)
+        # Only the bits of written shots count in the last byte
+        valid: np.ndarray = np.full(len(a_bits), 0xFF, dtype=np.uint8)
+        if start + len(a_bits) == n_bytes and archive.count % 8:
+            valid[-1] = (0xFF << (8 - archive.count % 8)) & 0xFF
+        wins: np.ndarray = ~(a_bits ^ b_bits ^ (x_bits & y_bits))
+        for x_coin in (0, 1):
+            for y_coin in (0, 1):
+                played: np.ndarray = valid \
+                    & (x_bits if x_coin else ~x_bits) \
+                    & (y_bits if y_coin else ~y_bits)
+                score.trials[x_coin, y_coin] += int(
+                    np.bitwise_count(played).sum())
+                score.wins[x_coin, y_coin] += int(
+                    np.bitwise_count(played & wins).sum())
+    return score
+
+
+def win_probability(probabilities: np.ndarray) -> float:
+    """exact win rate from the outcome probabilities indexed [a, b, x, y]"""
+    return float(np.sum(probabilities.reshape(2, 2, 2, 2)[WIN_MASK]))
+
+
+@instrumented(stage='simulate')
+def exact_win_probability(circuit: cirq.Circuit,
+                          simulator: "cirq.Simulator | None" = None
+                          ) -> float:
+    """Exact win rate of the game from a single `simulate()` call
+    The terminal measurements are dropped and the probabilities are read
+    from the final state vector, in the order of the keys a, b, x, y.
+    """
+    if simulator is None:
+        simulator = get_simulator()
+    measured: dict[str, cirq.Qid] = {
+        cirq.measurement_key_name(op): op.qubits[0]
+        for op in circuit.all_operations() if cirq.is_measurement(op)}
+    qubit_order: list[cirq.Qid] = [measured[key] for key in 'abxy']
+    final_state: np.ndarray = simulator.simulate(
+        cirq.drop_terminal_measurements(circuit),
+        qubit_order=qubit_order).final_state_vector
+    annotate(qubits=len(qubit_order), state_bytes=final_state.nbytes)
+    return win_probability(np.abs(final_state)**2)
+
+
+def _x_pow_matrices(exponents: np.ndarray) -> np.ndarray:
+    """matrices of X**t for an array of t, same phase as cirq.XPowGate"""
+    phase: np.ndarray = np.exp(1j * np.pi * exponents)[..., None, None]
+    return (0.5 * (1 + phase) * np.eye(2)
+            + 0.5 * (1 - phase) * np.array([[0, 1], [1, 0]]))
+
+
+def sweep_win_probability(alice_exponents: np.ndarray,
+                          cnot_exponents: np.ndarray
+                          ) -> np.ndarray:
+    """Exact win rate on the grid alice_exponents x cnot_exponents
+    Same game as make_bell_test_circuit, but evaluated in one vectorized
+    pass: the referees' coins are only controls, so for each (x, y) the
+    players share (X**(c x) X**t (x) X**(c y))|Phi+>, and the win rate is
+    the average over the four coins of P(a XOR b == x AND y).
+    Returns an array of shape (len(alice_exponents), len(cnot_exponents))
+    """
+    alice_pow: np.ndarray = _x_pow_matrices(
+        np.asarray(alice_exponents, dtype=float)[:, None])
+    cnot_pow: np.ndarray = np.broadcast_to(
+        _x_pow_matrices(np.asarray(cnot_exponents, dtype=float)[None, :]),
+        alice_pow.shape[:1] + (len(cnot_exponents), 2, 2))
+    identity: np.ndarray = np.broadcast_to(np.eye(2), cnot_pow.shape)
+
+    # Player operations for coin 0 and coin 1
+    alice_ops: tuple[np.ndarray, np.ndarray] = \
+        (np.broadcast_to(alice_pow, cnot_pow.shape), cnot_pow @ alice_pow)
+    bob_ops: tuple[np.ndarray, np.ndarray] = (identity, cnot_pow)
+
+    win: np.ndarray = np.zeros(cnot_pow.shape[:2])
+    for x_coin in (0, 1):
+        for y_coin in (0, 1):
+            # amplitude[a, b] of (A (x) B)|Phi+> = (A B^T)[a, b] / sqrt(2)
+            amplitude: np.ndarray = alice_ops[x_coin] @ np.swapaxes(
+                bob_ops[y_coin], -1, -2) / np.sqrt(2)
+            probability: np.ndarray = np.abs(amplitude)**2
+            win += probability[..., WIN_MASK[:, :, x_coin, y_coin]].sum(-1)
+    return win / 4
+
+
 def main() -> None:
     """Bell inequalty"""
     # Create a circuit
-    circuit = make_bell_test_circuit()
+    circuit = make_bell_test_circuit(verbose=True)
 
     # Run the simulations
     repetitions = 1000
     print(f"\nSimulating {repetitions} repetitions...\n")
-    result: "cirq.study.result.ResultDict" = \
-        cirq.Simulator().run(program=circuit, repetitions=repetitions)
-
-    # Collect results
-    a_result: np.ndarray = np.array(result.measurements['a'][:, 0])
-    b_result: np.ndarray = np.array(result.measurements['b'][:, 0])
-    x_result: np.ndarray = np.array(result.measurements['x'][:, 0])
-    y_result: np.ndarray = np.array(result.measurements['y'][:, 0])
+    with span('bell_inequality.run', stage='sample', shots=repetitions):
+        result: "cirq.study.result.ResultDict" = \
+            get_simulator().run(program=circuit, repetitions=repetitions)
 
     # Compute the winning percentage
-    outcomes = a_result ^ b_result == x_result & y_result
-    win_precentage: float = len([e for e in outcomes if e]) * 100 / repetitions
+    score: BellGameScore = BellGameScore().update(result.measurements)
 
     if SHOW_ARRAYS:
+        a_result: np.ndarray = result.measurements['a'][:, 0]
+        b_result: np.ndarray = result.measurements['b'][:, 0]
+        x_result: np.ndarray = result.measurements['x'][:, 0]
+        y_result: np.ndarray = result.measurements['y'][:, 0]
+        outcomes = a_result ^ b_result == x_result & y_result
         print("\nResults are:"
               f"Alice: {bit_string(a_result)}"
               f"Bob: {bit_string(b_result)}"
@@ -130,7 +395,26 @@ def main() -> None:
               )
         print(f"(Alice XOR Bob) == (x AND y)\n{bit_string(outcomes)}")
 
-    print(f"Win rate: {win_precentage}")
+    low, high = score.confidence_interval()
+    print(f"Win rate: {score.win_rate * 100}")
+    print(f"95% confidence interval: [{low * 100:.2f}, {high * 100:.2f}]")
+    print(f"Win rate per (x, y):\n{score.conditional_win_rates}")
+    print(f"Exact win rate: {exact_win_probability(circuit) * 100:.4f}")
+
+    # Keep a larger run on disk, bit-packed, and score it again from there
+    repetitions = 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'bell_game.shots')
+        with ShotArchive.for_circuit(path, circuit, repetitions) as archive:
+            live: BellGameScore = run_bell_game(
+                circuit, repetitions, chunk_size=250_000, archive=archive)
+        with ShotArchive.open(path) as stored:
+            archived: BellGameScore = score_archive(stored)
+        print(f"\n{repetitions} shots archived in "
+              f"{os.path.getsize(path) / 2**20:.2f} MB "
+              f"(int8 measurements: {4 * repetitions / 2**20:.2f} MB)")
+        print(f"Win rate while sampling: {live.win_rate * 100:.4f}, "
+              f"from the archive: {archived.win_rate * 100:.4f}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,292 @@
+"""
+Noise study of the CHSH game and the four Bell states
+
+The circuits of bell_inequality.py and cirq_hidary/bell_states.py are
+noiseless. Here they run under the depolarizing, amplitude-damping and
+readout noise of `src.trajectories.NoiseModel`, with two methods:
+
+    trajectories:    batched Monte Carlo trajectories, sharded over a
+                     process pool by `map_shards`. Shots are added in
+                     rounds until the 95% Wilson interval of the
+                     estimate is narrower than `target_width`; each new
+                     round is sized from the width reached so far, since
+                     the width shrinks as 1 / sqrt(shots)
+    density matrix:  one exact `DensityMatrixSimulator` run, only for
+                     small circuits (the memory grows as 4^n)
+
+The CHSH estimate is the win rate (~85% without noise). For a Bell state
+the sampled estimate is its Z-basis success rate, the probability of an
+outcome the noiseless state can produce (00/11 for |Φ±⟩, 01/10 for
+|Ψ±⟩); the density matrix also gives the fidelity <ψ|ρ|ψ> before
+readout.
+"""
+# pylint: disable=import-error
+
+import functools
+import os
+import pathlib
+import sys
+import time
+import typing
+
+import numpy as np
+
+import cirq
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq.bell_inequality import (BellGameScore,
+                                             make_bell_test_circuit,
+                                             score_measurements,
+                                             win_probability,
+                                             wilson_interval)
+from cirq_hidary import bell_states
+from src.trajectories import (NoiseModel, density_matrix_probabilities,
+                              sample_trajectories)
+from src.utils import map_shards
+
+
+# Largest circuit for the density-matrix path
+DENSITY_MATRIX_MAX_QUBITS: int = 10
+
+
+class Score(typing.Protocol):
+    """what the early stopping needs from a (mergeable) score"""
+    repetitions: int
+
+    def merge(self, other: typing.Any) -> typing.Any:
+        """add the counts of another score"""
+
+    def confidence_interval(self,
+                            z_score: float = 1.96
+                            ) -> tuple[float, float]:
+        """interval of the estimate"""
+
+
+class SuccessTally:
+    """shots whose outcome is allowed by the noiseless state"""
+    wins: int
+    trials: int
+
+    def __init__(self, wins: int = 0, trials: int = 0) -> None:
+        self.wins = wins
+        self.trials = trials
+
+    def merge(self, other: 'SuccessTally') -> 'SuccessTally':
+        """add the counts of another (partial) tally"""
+        self.wins += other.wins
+        self.trials += other.trials
+        return self
+
+    @property
+    def repetitions(self) -> int:
+        """number of scored shots"""
+        return self.trials
+
+    @property
+    def win_rate(self) -> float:
+        """fraction of the allowed outcomes"""
+        return self.wins / max(self.trials, 1)
+
+    def confidence_interval(self,
+                            z_score: float = 1.96
+                            ) -> tuple[float, float]:
+        """Wilson score interval of the success rate, 95% by default"""
+        return wilson_interval(self.wins, self.trials, z_score)
+
+
+class StudyPoint(typing.NamedTuple):
+    """one estimate of one circuit under one noise model"""
+    circuit: str
+    noise: NoiseModel
+    method: str
+    estimate: float
+    low: float
+    high: float
+    repetitions: int
+    seconds: float
+    fidelity: float = float('nan')
+
+
+def bell_state_circuits() -> dict[str, cirq.Circuit]:
+    """the four measured Bell states of cirq_hidary/bell_states.py"""
+    builders: dict[str, typing.Callable[..., cirq.Circuit]] = {
+        'phi_plus': bell_states.bell_phi_plus,
+        'phi_minus': bell_states.bell_phi_minus,
+        'psi_plus': bell_states.bell_psi_plus,
+        'psi_minus': bell_states.bell_psi_minus,
+    }
+    return {name: builder(bell_states.QREG, cirq.Circuit())
+            for name, builder in builders.items()}
+
+
+def allowed_outcomes(circuit: cirq.Circuit) -> np.ndarray:
+    """outcomes (big-endian over the sorted qubits) of the noiseless
+    circuit, as a boolean mask"""
+    probabilities: np.ndarray = density_matrix_probabilities(
+        circuit, sorted(circuit.all_qubits()))
+    return probabilities > 1e-9
+
+
+def score_outcomes(allowed: np.ndarray,
+                   key: str,
+                   measurements: dict[str, np.ndarray]
+                   ) -> SuccessTally:
+    """tally of one batch; `key` measures the qubits in sorted order"""
+    bits: np.ndarray = measurements[key].astype(np.intp)
+    outcomes: np.ndarray = bits @ (1 << np.arange(bits.shape[1])[::-1])
+    return SuccessTally(int(allowed[outcomes].sum()), len(outcomes))
+
+
+def run_until_converged(circuit: cirq.Circuit,
+                        score: Score,
+                        reducer: typing.Callable[[dict[str, np.ndarray]],
+                                                 typing.Any],
+                        target_width: float = 0.01,
+                        first_round: int = 2_000,
+                        max_repetitions: int = 1_000_000,
+                        workers: int | None = None,
+                        seed: int | None = None
+                        ) -> Score:
+    """
+    Add rounds of trajectories, sharded over `workers` processes, until
+    the confidence interval of `score` is narrower than `target_width`
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds: np.random.SeedSequence = np.random.SeedSequence(seed)
+    shots: int = first_round
+    while True:
+        shots = min(shots, max_repetitions - score.repetitions)
+        round_seed: int = int(seeds.spawn(1)[0].generate_state(1)[0])
+        for shard in map_shards(circuit, shots, reducer=reducer,
+                                seed=round_seed, workers=workers,
+                                shard_size=min(-(-shots // workers),
+                                               100_000),
+                                runner=sample_trajectories):
+            score.merge(shard)
+        low, high = score.confidence_interval()
+        if high - low <= target_width \
+                or score.repetitions >= max_repetitions:
+            return score
+        # The width goes as 1 / sqrt(shots): aim for the target, +10%
+        needed: float = score.repetitions * ((high - low) / target_width)**2
+        shots = int(1.1 * needed) - score.repetitions + 1
+
+
+def trajectory_study(name: str,
+                     circuit: cirq.Circuit,
+                     noise: NoiseModel,
+                     target_width: float = 0.01,
+                     workers: int | None = None,
+                     seed: int | None = None
+                     ) -> StudyPoint:
+    """estimate the win or success rate from noisy trajectories"""
+    start: float = time.perf_counter()
+    score: Score
+    reducer: typing.Callable[[dict[str, np.ndarray]], typing.Any]
+    if name == 'chsh':
+        score, reducer = BellGameScore(), score_measurements
+    else:
+        score = SuccessTally()
+        reducer = functools.partial(
+            score_outcomes, allowed_outcomes(circuit), 'z')
+    score = run_until_converged(noise.apply(circuit), score, reducer,
+                                target_width, workers=workers, seed=seed)
+    low, high = score.confidence_interval()
+    return StudyPoint(name, noise, 'trajectories',
+                      typing.cast(typing.Any, score).win_rate, low, high,
+                      score.repetitions, time.perf_counter() - start)
+
+
+def density_matrix_study(name: str,
+                         circuit: cirq.Circuit,
+                         noise: NoiseModel
+                         ) -> StudyPoint:
+    """the exact win or success rate, and the Bell state fidelity"""
+    qubits: list[cirq.Qid] = sorted(circuit.all_qubits())
+    if len(qubits) > DENSITY_MATRIX_MAX_QUBITS:
+        raise ValueError(f"{len(qubits)} qubits is too many for the "
+                         "density-matrix path")
+    start: float = time.perf_counter()
+    fidelity: float = float('nan')
+    if name == 'chsh':
+        measured: dict[str, cirq.Qid] = {
+            cirq.measurement_key_name(op): op.qubits[0]
+            for op in circuit.all_operations() if cirq.is_measurement(op)}
+        estimate: float = win_probability(density_matrix_probabilities(
+            noise.apply(circuit), [measured[key] for key in 'abxy']))
+    else:
+        estimate = float(density_matrix_probabilities(
+            noise.apply(circuit), qubits)[allowed_outcomes(circuit)].sum())
+        # Fidelity of the state itself, before the readout errors
+        unmeasured = cirq.Circuit(
+            op for op in circuit.all_operations()
+            if not cirq.is_measurement(op))
+        ideal: np.ndarray = cirq.final_state_vector(
+            unmeasured, qubit_order=qubits, dtype=np.complex128)
+        rho: np.ndarray = cirq.DensityMatrixSimulator(
+            dtype=np.complex128).simulate(
+                noise._replace(readout=0.0).apply(unmeasured),
+                qubit_order=qubits).final_density_matrix
+        fidelity = float(np.real(ideal.conj() @ rho @ ideal))
+    return StudyPoint(name, noise, 'density matrix', estimate, estimate,
+                      estimate, 0, time.perf_counter() - start, fidelity)
+
+
+def noise_study(noise_models: typing.Iterable[NoiseModel],
+                target_width: float = 0.01,
+                workers: int | None = None,
+                seed: int | None = None
+                ) -> list[StudyPoint]:
+    """both methods for the CHSH game and the Bell states, per model"""
+    circuits: dict[str, cirq.Circuit] = {
+        'chsh': make_bell_test_circuit(), **bell_state_circuits()}
+    points: list[StudyPoint] = []
+    for noise in noise_models:
+        for name, circuit in circuits.items():
+            points.append(trajectory_study(
+                name, circuit, noise, target_width, workers, seed))
+            points.append(density_matrix_study(name, circuit, noise))
+    return points
+
+
+def main() -> None:
+    """CHSH and Bell state estimates under increasing noise"""
+    noise_models: list[NoiseModel] = [
+        NoiseModel(),
+        NoiseModel(depolarizing=0.01),
+        NoiseModel(depolarizing=0.05),
+        NoiseModel(amplitude_damping=0.05),
+        NoiseModel(readout=0.02),
+        NoiseModel(depolarizing=0.01, amplitude_damping=0.02, readout=0.02),
+    ]
+    points: list[StudyPoint] = noise_study(noise_models, seed=1234)
+    print(f"{'noise':<34} {'circuit':<10} {'method':<15} {'estimate':>8} "
+          f"{'95% interval':>17} {'shots':>7} {'seconds':>8} "
+          f"{'fidelity':>8}")
+    for point in points:
+        interval: str = f"[{point.low:.4f}, {point.high:.4f}]" \
+            if point.repetitions else ""
+        print(f"{point.noise.label():<34} {point.circuit:<10} "
+              f"{point.method:<15} {point.estimate:8.4f} {interval:>17} "
+              f"{point.repetitions or '':>7} {point.seconds:8.4f} "
+              f"{point.fidelity:8.4f}")
+
+    # Accuracy: how often the exact value falls in the sampled interval
+    exact: dict[tuple[str, NoiseModel], float] = {
+        (point.circuit, point.noise): point.estimate
+        for point in points if point.method == 'density matrix'}
+    covered: list[bool] = [
+        point.low <= exact[point.circuit, point.noise] <= point.high
+        for point in points if point.method == 'trajectories']
+    print(f"\nexact value inside the trajectory interval: "
+          f"{sum(covered)}/{len(covered)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -28,13 +28,30 @@ quantum communication and quantum computing.
 """
 # pylint: disable=import-error
 
+import functools
+import pathlib
 import random
+import sys
+import typing
+
+import numpy as np
+import sympy
 
 import cirq
 
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.instrumentation import annotate, instrumented
+from src.utils import get_simulator
 
-def make_quantum_teleportation_circuit(ran_x: float,
-                                       ran_y: float,
+
+@instrumented(stage='build')
+def make_quantum_teleportation_circuit(ran_x: float | sympy.Symbol,
+                                       ran_y: float | sympy.Symbol,
                                        ) -> tuple[cirq.LineQubit, cirq.Circuit
                                                   ]:
     """Make a quantum teleportation circuit.
@@ -70,6 +87,97 @@ def make_quantum_teleportation_circuit(ran_x: float,
     return msg, circuit
 
 
+# Symbols of the message rotations, resolved per sample
+RAN_X, RAN_Y = sympy.symbols('ran_x ran_y')
+
+PAULI_X: np.ndarray = np.array([[0, 1], [1, 0]], dtype=complex)
+PAULI_Y: np.ndarray = np.array([[0, -1j], [1j, 0]], dtype=complex)
+
+
+class TeleportationCheck(typing.NamedTuple):
+    """batched verification of the protocol, one row per input state"""
+    ran_x: np.ndarray
+    ran_y: np.ndarray
+    message_bloch: np.ndarray
+    bob_bloch: np.ndarray
+    fidelity: np.ndarray
+
+
+@functools.lru_cache(maxsize=None)
+@instrumented(stage='compile')
+def compile_teleportation_circuit() -> np.ndarray:
+    """
+    Compile the parameterized circuit once: the message rotations
+    X^ran_x Y^ran_y only act on the msg qubit before anything else does,
+    so the final state is U_rest (V(ran_x, ran_y)|0>) (x) |00>, where
+    U_rest is the unitary of every other operation (the measurement is
+    deferred; it does not change Bob's reduced state).
+    Returns U_rest in the qubit order msg, alice, bob.
+    """
+    msg, circuit = make_quantum_teleportation_circuit(RAN_X, RAN_Y)
+    rest: list[cirq.Operation] = []
+    for op in circuit.all_operations():
+        if cirq.is_parameterized(op):
+            assert op.qubits == (msg,) and not any(
+                msg in rest_op.qubits for rest_op in rest), \
+                "message rotations must come first on the msg qubit"
+        elif not cirq.is_measurement(op):
+            rest.append(op)
+    return cirq.Circuit(rest).unitary(
+        qubit_order=cirq.LineQubit.range(3))
+
+
+def _pauli_pow(pauli: np.ndarray,
+               exponents: np.ndarray
+               ) -> np.ndarray:
+    """P**t for an array of t, with the phase of cirq's XPow/YPow gates"""
+    phase: np.ndarray = np.exp(1j * np.pi * exponents)[:, None, None]
+    return 0.5 * (1 + phase) * np.eye(2) + 0.5 * (1 - phase) * pauli
+
+
+def _bloch_vectors(rho: np.ndarray) -> np.ndarray:
+    """(N, 3) Bloch vectors of a stack of 2x2 density matrices"""
+    return np.stack([2 * rho[:, 0, 1].real,
+                     -2 * rho[:, 0, 1].imag,
+                     (rho[:, 0, 0] - rho[:, 1, 1]).real], axis=1)
+
+
+@instrumented(stage='simulate')
+def verify_teleportation(samples: int = 100_000,
+                         rng: np.random.Generator | None = None
+                         ) -> TeleportationCheck:
+    """
+    Teleport `samples` random states at once: the message and Bob's
+    Bloch vectors come from reduced density matrices computed with
+    NumPy on the compiled circuit, and the fidelity of Bob's qubit to
+    the pure message state is (1 + m.b) / 2.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    ran_x: np.ndarray = rng.random(samples)
+    ran_y: np.ndarray = rng.random(samples)
+
+    # |psi> = Y^ran_y X^ran_x |0>, the first column of the product
+    message: np.ndarray = (_pauli_pow(PAULI_Y, ran_y)
+                           @ _pauli_pow(PAULI_X, ran_x))[:, :, 0]
+
+    # (msg (x) |00>) through U_rest, msg is the most significant qubit
+    initial: np.ndarray = np.zeros((samples, 8), dtype=complex)
+    initial[:, [0, 4]] = message
+    final: np.ndarray = (initial @ compile_teleportation_circuit().T
+                         ).reshape(samples, 4, 2)
+    annotate(samples=samples, state_bytes=final.nbytes)
+
+    # Trace out msg and alice for Bob's qubit
+    bob_rho: np.ndarray = np.einsum('nki,nkj->nij', final, final.conj())
+    message_rho: np.ndarray = np.einsum('ni,nj->nij', message, message.conj())
+    message_bloch: np.ndarray = _bloch_vectors(message_rho)
+    bob_bloch: np.ndarray = _bloch_vectors(bob_rho)
+    fidelity: np.ndarray = 0.5 * (1 + np.sum(message_bloch * bob_bloch, 1))
+    return TeleportationCheck(
+        ran_x, ran_y, message_bloch, bob_bloch, fidelity)
+
+
 def main():
     """Run the quantum teleportation protocol."""
 
@@ -83,7 +191,7 @@ def main():
     print(circuit)
 
     # Simulate the circuit.
-    sim = cirq.Simulator()
+    sim = get_simulator()
     message = sim.simulate(cirq.Circuit(
         [cirq.X(msg)**ran_x, cirq.Y(msg)**ran_y]))
 
@@ -109,6 +217,14 @@ def main():
           "y:", round(b2_y, 4),
           "z:", round(b2_z, 4))
 
+    # Verify the fidelity over many random input states at once
+    check = verify_teleportation(samples := 100_000)
+    print(f"\nFidelity over {samples} random states:")
+    print("min:", round(check.fidelity.min(), 6),
+          "mean:", round(check.fidelity.mean(), 6),
+          "percentiles (1, 50, 99):",
+          np.round(np.percentile(check.fidelity, [1, 50, 99]), 6))
+
 
 if __name__ == '__main__':
     main()
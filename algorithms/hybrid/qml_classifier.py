@@ -0,0 +1,279 @@
+"""
+Quantum machine-learning classifier with data re-uploading in cirq
+
+Data re-uploading: the features x of a sample are fed into the circuit
+again in every layer, through rotation angles that are affine in x:
+    u_{l,q} = w_u[l,q] . x + b_u[l,q],  v_{l,q} = w_v[l,q] . x + b_v[l,q]
+    0: ───Y^u_0_0───Z^v_0_0───@───Y^u_1_0───Z^v_1_0─── ...
+                              │
+    1: ───Y^u_0_1───Z^v_0_1───@───Y^u_1_1───Z^v_1_1─── ...
+and the probability of class 1 is p = (1 - <Z_0>) / 2.
+
+The circuit is built once with the angles as sympy symbols; a sample
+is only a parameter resolver. Training a mini-batch then takes one
+`simulate_expectation_values_sweep` per sub-batch: for every sample
+the angles and their parameter shifts (+-1/2 in the exponent), and the
+chain rule through the affine encoding gives the gradient of the
+binary cross-entropy with respect to the weights. With workers > 1
+the sub-batches of a mini-batch are evaluated on a process pool and
+their gradients summed, so a 10k-sample dataset trains on a CPU box;
+sub-batches are kept to at least MIN_PART_SIZE samples, since smaller
+ones cost more to pickle than to simulate.
+"""
+# pylint: disable=import-error
+
+import concurrent.futures
+import functools
+import os
+import pathlib
+import sys
+import time
+import typing
+
+import numpy as np
+import pandas as pd
+import sympy
+
+import cirq
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from src.utils import get_simulator  # pylint: disable=wrong-import-position
+
+
+# Smallest sub-batch sent to a pool worker
+MIN_PART_SIZE: int = 32
+
+
+@functools.lru_cache(maxsize=None)
+def reuploading_circuit(n_qubits: int,
+                        layers: int
+                        ) -> tuple[cirq.Circuit, tuple[sympy.Symbol, ...]]:
+    """circuit with one angle symbol per rotation, built once per process"""
+    qubits: list[cirq.LineQubit] = cirq.LineQubit.range(n_qubits)
+    circuit = cirq.Circuit()
+    angles: list[sympy.Symbol] = []
+    for layer in range(layers):
+        u_angles = sympy.symbols(f'u_{layer}_0:{n_qubits}')
+        v_angles = sympy.symbols(f'v_{layer}_0:{n_qubits}')
+        circuit.append(cirq.Y(qubit)**u for qubit, u in zip(qubits, u_angles))
+        circuit.append(cirq.Z(qubit)**v for qubit, v in zip(qubits, v_angles))
+        if layer < layers - 1:
+            circuit.append(cirq.CZ(q_a, q_b)
+                           for q_a, q_b in zip(qubits, qubits[1:]))
+        angles.extend([*u_angles, *v_angles])
+    return circuit, tuple(angles)
+
+
+def _expectations(n_qubits: int,
+                  layers: int,
+                  angle_values: np.ndarray
+                  ) -> np.ndarray:
+    """<Z_0> for rows of angle values, one sweep"""
+    circuit, angles = reuploading_circuit(n_qubits, layers)
+    sweep = cirq.ListSweep([dict(zip(angles, row)) for row in angle_values])
+    results = get_simulator().simulate_expectation_values_sweep(
+        circuit, observables=[cirq.Z(cirq.LineQubit(0))], params=sweep)
+    return np.real(np.array(results)[:, 0])
+
+
+def batch_loss_and_gradient(weights: np.ndarray,
+                            features: np.ndarray,
+                            labels: np.ndarray,
+                            n_qubits: int,
+                            layers: int
+                            ) -> tuple[float, np.ndarray]:
+    """
+    Summed cross-entropy of a batch and its gradient with respect to
+    `weights`, shape (n_angles, n_features + 1) (last column: bias).
+    All the samples and shifts go through one sweep.
+    """
+    n_samples: int = len(features)
+    inputs: np.ndarray = np.hstack([features, np.ones((n_samples, 1))])
+    base: np.ndarray = inputs @ weights.T          # (B, K) angles
+    n_angles: int = base.shape[1]
+    shifts: np.ndarray = 0.5 * np.eye(n_angles)
+    batch: np.ndarray = np.concatenate([
+        base[:, None, :],
+        base[:, None, :] + shifts,
+        base[:, None, :] - shifts], axis=1).reshape(-1, n_angles)
+    values: np.ndarray = _expectations(n_qubits, layers, batch).reshape(
+        n_samples, 2 * n_angles + 1)
+
+    # p = (1 - <Z>) / 2 and the parameter-shift rule per angle
+    prob: np.ndarray = np.clip((1 - values[:, 0]) / 2, 1e-7, 1 - 1e-7)
+    dprob_dangle: np.ndarray = -0.5 * np.pi / 2 * (
+        values[:, 1:n_angles + 1] - values[:, n_angles + 1:])
+    loss: float = float(-np.sum(labels * np.log(prob)
+                                + (1 - labels) * np.log(1 - prob)))
+    dloss_dprob: np.ndarray = (prob - labels) / (prob * (1 - prob))
+    gradient: np.ndarray = (dloss_dprob[:, None] * dprob_dangle).T @ inputs
+    return loss, gradient
+
+
+class QuantumClassifier:
+    """Binary data re-uploading classifier trained with Adam"""
+    n_qubits: int
+    layers: int
+    weights: np.ndarray | None
+
+    def __init__(self,
+                 n_qubits: int = 1,
+                 layers: int = 3,
+                 seed: int | None = None
+                 ) -> None:
+        self.n_qubits = n_qubits
+        self.layers = layers
+        self.weights = None
+        self._rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _arrays(data: pd.DataFrame | np.ndarray,
+                label: str | None
+                ) -> tuple[np.ndarray, np.ndarray | None]:
+        """features and labels from a DataFrame or an array"""
+        if isinstance(data, pd.DataFrame):
+            if label is not None and label in data:
+                return (data.drop(columns=label).to_numpy(float),
+                        data[label].to_numpy(float))
+            return data.to_numpy(float), None
+        return np.asarray(data, dtype=float), None
+
+    def predict_proba(self,
+                      data: pd.DataFrame | np.ndarray,
+                      label: str | None = 'label'
+                      ) -> np.ndarray:
+        """probability of class 1 for every sample, one sweep"""
+        features, _ = self._arrays(data, label)
+        inputs = np.hstack([features, np.ones((len(features), 1))])
+        values: np.ndarray = _expectations(
+            self.n_qubits, self.layers, inputs @ self.weights.T)
+        return (1 - values) / 2
+
+    def predict(self,
+                data: pd.DataFrame | np.ndarray,
+                label: str | None = 'label'
+                ) -> np.ndarray:
+        """class 0 or 1 for every sample"""
+        return (self.predict_proba(data, label) > 0.5).astype(int)
+
+    def fit(self,
+            data: pd.DataFrame | np.ndarray,
+            labels: np.ndarray | None = None,
+            label: str = 'label',
+            epochs: int = 10,
+            batch_size: int = 64,
+            learning_rate: float = 0.05,
+            workers: int | None = 1,
+            verbose: bool = False
+            ) -> list[float]:
+        """
+        Train on a DataFrame (with a `label` column) or on an array and
+        `labels`. With workers > 1 each mini-batch is split over that
+        many processes (workers=None: every CPU); returns the mean loss
+        of every epoch.
+        """
+        features, data_labels = self._arrays(data, label)
+        if labels is None:
+            labels = data_labels
+        if labels is None:
+            raise ValueError(f"no labels: pass `labels`, or a DataFrame "
+                             f"with a '{label}' column")
+        labels = np.asarray(labels, dtype=float)
+        if labels.shape != (len(features),):
+            raise ValueError(f"expected {len(features)} labels, "
+                             f"got shape {labels.shape}")
+        n_angles: int = 2 * self.n_qubits * self.layers
+        if self.weights is None:
+            self.weights = self._rng.normal(
+                0, 0.5, (n_angles, features.shape[1] + 1))
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        # Adam moments
+        moment_1: np.ndarray = np.zeros_like(self.weights)
+        moment_2: np.ndarray = np.zeros_like(self.weights)
+        step: int = 0
+        history: list[float] = []
+        pool = concurrent.futures.ProcessPoolExecutor(workers) \
+            if workers > 1 else None
+        try:
+            for epoch in range(epochs):
+                start: float = time.perf_counter()
+                order: np.ndarray = self._rng.permutation(len(features))
+                epoch_loss: float = 0.0
+                for first in range(0, len(order), batch_size):
+                    batch: np.ndarray = order[first:first + batch_size]
+                    loss, gradient = self._batch(
+                        pool, workers, features[batch], labels[batch])
+                    epoch_loss += loss
+                    gradient /= len(batch)
+                    step += 1
+                    moment_1 = 0.9 * moment_1 + 0.1 * gradient
+                    moment_2 = 0.999 * moment_2 + 0.001 * gradient**2
+                    self.weights -= learning_rate * (
+                        moment_1 / (1 - 0.9**step)) / (
+                        np.sqrt(moment_2 / (1 - 0.999**step)) + 1e-8)
+                history.append(epoch_loss / len(features))
+                if verbose:
+                    print(f"epoch {epoch}: loss {history[-1]:.4f} "
+                          f"({time.perf_counter() - start:.1f} s)")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return history
+
+    def _batch(self,
+               pool: concurrent.futures.ProcessPoolExecutor | None,
+               workers: int,
+               features: np.ndarray,
+               labels: np.ndarray
+               ) -> tuple[float, np.ndarray]:
+        """summed loss and gradient of a mini-batch, split over the pool
+        in parts of at least MIN_PART_SIZE samples"""
+        n_parts: int = min(workers, len(features) // MIN_PART_SIZE)
+        if pool is None or n_parts <= 1:
+            return batch_loss_and_gradient(
+                self.weights, features, labels, self.n_qubits, self.layers)
+        parts: list[np.ndarray] = np.array_split(
+            np.arange(len(features)), n_parts)
+        futures: list[concurrent.futures.Future] = [
+            pool.submit(batch_loss_and_gradient, self.weights,
+                        features[part], labels[part],
+                        self.n_qubits, self.layers)
+            for part in parts]
+        results: list[tuple[float, np.ndarray]] = [
+            future.result() for future in futures]
+        return (sum(loss for loss, _ in results),
+                typing.cast(np.ndarray, sum(grad for _, grad in results)))
+
+
+def circle_dataset(n_samples: int,
+                   rng: np.random.Generator
+                   ) -> pd.DataFrame:
+    """points in [-1, 1]^2, label 1 inside the circle of radius 0.7"""
+    points: np.ndarray = rng.uniform(-1, 1, (n_samples, 2))
+    return pd.DataFrame({
+        'x_0': points[:, 0],
+        'x_1': points[:, 1],
+        'label': (np.hypot(points[:, 0], points[:, 1]) < 0.7).astype(int)})
+
+
+def main() -> None:
+    """Train on a circle dataset and report the accuracy"""
+    rng: np.random.Generator = np.random.default_rng(7)
+    train: pd.DataFrame = circle_dataset(1000, rng)
+    test: pd.DataFrame = circle_dataset(500, rng)
+
+    classifier = QuantumClassifier(n_qubits=1, layers=3, seed=7)
+    classifier.fit(train, epochs=10, batch_size=50, verbose=True)
+    accuracy: float = float(np.mean(
+        classifier.predict(test) == test['label'].to_numpy()))
+    print(f"Test accuracy: {accuracy:.3f}")
+
+
+if __name__ == '__main__':
+    main()
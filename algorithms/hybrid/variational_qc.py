@@ -0,0 +1,258 @@
+"""
+Variational quantum circuits (VQE / QAOA) in cirq
+
+A variational algorithm minimizes the energy <psi(theta)|H|psi(theta)>
+of a parameterized circuit (the ansatz) with a classical optimizer. The
+parameters enter the circuit the same way as the message rotation
+`cirq.X(msg)**ran_x` in quantum_teleportation.py, as sympy symbols in
+the gate exponents:
+    0: ───Y^t_0_0───Z^p_0_0───@───Y^t_1_0───Z^p_1_0───
+                              │
+    1: ───Y^t_0_1───Z^p_0_1───@───Y^t_1_1───Z^p_1_1───
+
+Parameter-shift gradient:
+    For the gates P**t (XPow, YPow, ZPow, ZZPow, CZPow, ...) the
+    generator has the eigenvalues 0 and 1, so the exact derivative is
+        dE/dt = (pi / 2) * (E(t + 1/2) - E(t - 1/2))
+    and for two eigenvalues a gap d apart the shift is 1 / (2 d) and the
+    factor pi d / 2. Gates with more eigenvalues (ISWAP**t, FSim, ...)
+    are decomposed into such gates first.
+    `VariationalEngine` compiles the ansatz once: every occurrence of a
+    symbol gets its own internal symbol (an exponent c * theta + d adds
+    c times its derivative), and the energy and all 2 K shifted energies
+    are evaluated in ONE `simulate_expectation_values_sweep` call,
+    instead of 2 P separate simulations per gradient. The compiled
+    circuit and simulator are reused by every optimizer iteration.
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+import time
+import typing
+
+import numpy as np
+import scipy.optimize
+import sympy
+
+import cirq
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from src.utils import get_simulator  # pylint: disable=wrong-import-position
+
+
+def hardware_efficient_ansatz(qubits: list[cirq.Qid],
+                              layers: int
+                              ) -> tuple[cirq.Circuit, list[sympy.Symbol]]:
+    """Y**t and Z**p on every qubit, then a CZ ladder, for each layer"""
+    circuit = cirq.Circuit()
+    symbols: list[sympy.Symbol] = []
+    for layer in range(layers):
+        thetas = sympy.symbols(f't_{layer}_0:{len(qubits)}')
+        phis = sympy.symbols(f'p_{layer}_0:{len(qubits)}')
+        circuit.append(cirq.Y(qubit)**theta
+                       for qubit, theta in zip(qubits, thetas))
+        circuit.append(cirq.Z(qubit)**phi for qubit, phi in zip(qubits, phis))
+        if layer < layers - 1:
+            circuit.append(cirq.CZ(q_a, q_b)
+                           for q_a, q_b in zip(qubits, qubits[1:]))
+        symbols.extend([*thetas, *phis])
+    return circuit, symbols
+
+
+def qaoa_maxcut_ansatz(qubits: list[cirq.Qid],
+                       edges: list[tuple[int, int]],
+                       layers: int
+                       ) -> tuple[cirq.Circuit, list[sympy.Symbol]]:
+    """QAOA: H on all, then ZZ**gamma on the edges and X**beta per layer"""
+    circuit = cirq.Circuit(cirq.H.on_each(*qubits))
+    symbols: list[sympy.Symbol] = []
+    for layer in range(layers):
+        gamma, beta = sympy.symbols(f'gamma_{layer} beta_{layer}')
+        circuit.append(cirq.ZZ(qubits[i], qubits[j])**gamma for i, j in edges)
+        circuit.append(cirq.X(qubit)**beta for qubit in qubits)
+        symbols.extend([gamma, beta])
+    return circuit, symbols
+
+
+def ising_hamiltonian(qubits: list[cirq.Qid],
+                      coupling: float = 1.0,
+                      field: float = 1.0
+                      ) -> cirq.PauliSum:
+    """transverse-field Ising chain, -J sum Z_i Z_i+1 - h sum X_i"""
+    hamiltonian = cirq.PauliSum()
+    for q_a, q_b in zip(qubits, qubits[1:]):
+        hamiltonian -= coupling * cirq.Z(q_a) * cirq.Z(q_b)
+    for qubit in qubits:
+        hamiltonian -= field * cirq.X(qubit)
+    return hamiltonian
+
+
+def maxcut_hamiltonian(qubits: list[cirq.Qid],
+                       edges: list[tuple[int, int]]
+                       ) -> cirq.PauliSum:
+    """minus the cut size, sum (Z_i Z_j - 1) / 2 over the edges"""
+    hamiltonian = cirq.PauliSum()
+    for i, j in edges:
+        hamiltonian += 0.5 * cirq.Z(qubits[i]) * cirq.Z(qubits[j]) - 0.5
+    return hamiltonian
+
+
+class VariationalEngine:
+    """Energy and parameter-shift gradient of an ansatz, batched"""
+    symbols: list[sympy.Symbol]
+    hamiltonian: cirq.PauliSum
+    circuit: cirq.Circuit
+    internal: list[sympy.Symbol]
+    coefficients: np.ndarray
+    offsets: np.ndarray
+    gaps: np.ndarray
+    simulator: cirq.Simulator
+
+    def __init__(self,
+                 ansatz: cirq.Circuit,
+                 symbols: list[sympy.Symbol],
+                 hamiltonian: cirq.PauliSum,
+                 simulator: cirq.Simulator | None = None
+                 ) -> None:
+        self.symbols = list(symbols)
+        self.hamiltonian = hamiltonian
+        self.simulator = get_simulator() if simulator is None else simulator
+        self._compile(ansatz)
+
+    def _compile(self, ansatz: cirq.Circuit) -> None:
+        """
+        Give each parameterized gate its own internal symbol u_k, with
+        u_k = coefficients[k] . params + offsets[k], decomposing the
+        gates that the two-term shift rule does not hold for
+        """
+        # Every symbol of the ansatz must be a parameter
+        unknown: set[sympy.Symbol] = cirq.parameter_symbols(ansatz) \
+            - set(self.symbols)
+        if unknown:
+            raise ValueError(
+                f"ansatz symbols {sorted(map(str, unknown))} are not in "
+                f"the parameters {self.symbols}")
+        internal: list[sympy.Symbol] = []
+        rows: list[np.ndarray] = []
+        offsets: list[float] = []
+        gaps: list[float] = []
+
+        def rewrite(op: cirq.Operation,
+                    source: cirq.Operation | None = None
+                    ) -> cirq.OP_TREE:
+            if not cirq.is_parameterized(op):
+                return op
+            gate = op.gate
+            exponent = getattr(gate, 'exponent', None)
+            # pylint: disable=protected-access
+            shifts: list[float] = sorted({
+                round(float(shift), 12) for shift in gate._eigen_shifts()}) \
+                if isinstance(gate, cirq.EigenGate) else []
+            if len(shifts) != 2 or not isinstance(exponent, sympy.Expr):
+                decomposed = cirq.decompose_once(op, None)
+                if decomposed is None:
+                    raise ValueError(
+                        f"unsupported parameterized operation {op}")
+                return [rewrite(sub_op, source or op) for sub_op in decomposed]
+            # The shift rule needs u_k = c . params + d
+            derivatives: list[sympy.Expr] = [
+                sympy.diff(exponent, symbol) for symbol in self.symbols]
+            if any(derivative.free_symbols for derivative in derivatives):
+                raise ValueError(
+                    f"unsupported exponent {exponent} of {source or op}: only "
+                    f"exponents linear in the parameters are supported")
+            row: np.ndarray = np.array(
+                [float(derivative) for derivative in derivatives])
+            offset: float = float(exponent.subs(
+                {symbol: 0 for symbol in self.symbols}))
+            u_k = sympy.Symbol(f'_u_{len(internal)}')
+            internal.append(u_k)
+            rows.append(row)
+            offsets.append(offset)
+            gaps.append(shifts[1] - shifts[0])
+            return gate._with_exponent(u_k).on(*op.qubits)
+
+        self.circuit = ansatz.map_operations(rewrite)
+        self.internal = internal
+        self.coefficients = np.array(rows).reshape(-1, len(self.symbols))
+        self.offsets = np.array(offsets)
+        self.gaps = np.array(gaps)
+
+    def _sweep(self, internal_values: np.ndarray) -> np.ndarray:
+        """energies for rows of internal values, one simulator call"""
+        sweep = cirq.ListSweep(
+            [dict(zip(self.internal, row)) for row in internal_values])
+        results = self.simulator.simulate_expectation_values_sweep(
+            self.circuit, observables=self.hamiltonian, params=sweep)
+        return np.real(np.array(results)[:, 0])
+
+    def _internal(self, params: np.ndarray) -> np.ndarray:
+        """internal values u for parameter vectors (..., P)"""
+        return np.asarray(params) @ self.coefficients.T + self.offsets
+
+    def energies(self, params_batch: np.ndarray) -> np.ndarray:
+        """energies of a (B, P) batch of parameter vectors"""
+        return self._sweep(self._internal(np.atleast_2d(params_batch)))
+
+    def energy(self, params: np.ndarray) -> float:
+        """energy of one parameter vector"""
+        return float(self.energies(params)[0])
+
+    def energy_and_gradient(self,
+                            params: np.ndarray
+                            ) -> tuple[float, np.ndarray]:
+        """energy and its exact gradient from one sweep of 2 K + 1 points"""
+        base: np.ndarray = self._internal(params)
+        n_internal: int = len(base)
+        shifts: np.ndarray = np.diag(0.5 / self.gaps)
+        batch: np.ndarray = np.vstack([base, base + shifts, base - shifts])
+        values: np.ndarray = self._sweep(batch)
+        internal_gradient: np.ndarray = np.pi * self.gaps / 2 * (
+            values[1:n_internal + 1] - values[n_internal + 1:])
+        return float(values[0]), internal_gradient @ self.coefficients
+
+    def minimize(self,
+                 initial: np.ndarray,
+                 method: str = 'L-BFGS-B',
+                 **options: typing.Any
+                 ) -> scipy.optimize.OptimizeResult:
+        """scipy minimization with the batched parameter-shift gradient"""
+        return scipy.optimize.minimize(
+            self.energy_and_gradient, np.asarray(initial, dtype=float),
+            jac=True, method=method, options=options or None)
+
+
+def main() -> None:
+    """VQE of an Ising chain and QAOA of a MaxCut ring"""
+    rng: np.random.Generator = np.random.default_rng()
+
+    # VQE, 3 qubits and 2 layers: 12 parameters
+    qubits: list[cirq.LineQubit] = cirq.LineQubit.range(3)
+    ansatz, symbols = hardware_efficient_ansatz(qubits, layers=2)
+    hamiltonian: cirq.PauliSum = ising_hamiltonian(qubits)
+    print(f"Ansatz with {len(symbols)} parameters:\n{ansatz}\n")
+    engine = VariationalEngine(ansatz, symbols, hamiltonian)
+    start: float = time.perf_counter()
+    result = engine.minimize(rng.uniform(-0.5, 0.5, len(symbols)))
+    exact: float = np.linalg.eigvalsh(hamiltonian.matrix(qubits))[0]
+    print(f"VQE energy: {result.fun:.6f}, exact ground energy: {exact:.6f}"
+          f" ({result.nit} iterations, "
+          f"{time.perf_counter() - start:.2f} s)\n")
+
+    # QAOA on a ring of 4 nodes, the maximum cut is 4
+    qubits = cirq.LineQubit.range(4)
+    edges: list[tuple[int, int]] = [(0, 1), (1, 2), (2, 3), (3, 0)]
+    ansatz, symbols = qaoa_maxcut_ansatz(qubits, edges, layers=2)
+    engine = VariationalEngine(
+        ansatz, symbols, maxcut_hamiltonian(qubits, edges))
+    result = engine.minimize(rng.uniform(0, 1, len(symbols)))
+    print(f"QAOA expected cut: {-result.fun:.4f} of 4")
+
+
+if __name__ == '__main__':
+    main()
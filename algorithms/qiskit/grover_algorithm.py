@@ -0,0 +1,216 @@
+"""
+Grover's search algorithm in qiskit
+
+Given an oracle that marks M of the N = 2^n basis states, Grover's
+algorithm finds a marked state with O(sqrt(N / M)) oracle queries:
+    1. Start in the uniform superposition H^{(*)n}|0>^n,
+    2. Repeat k times:
+        - Oracle: flip the sign of the marked amplitudes,
+            O|x> = (-1)^{f(x)}|x>
+        - Diffusion: reflect every amplitude about the mean,
+            D = H^{(*)n} (2|0><0| - I) H^{(*)n} = 2|s><s| - I
+    3. Measure, a marked state comes out with probability
+            sin^2((2k + 1) theta),  sin(theta) = sqrt(M / N)
+       which is largest for k = round(pi / (4 theta) - 1/2).
+
+For n = 2 and the marked state |11>:
+    q_0: ─H──■──H──X──■──X──H─
+             │        │
+    q_1: ─H──■──H──X──■──X──H─
+           oracle    diffusion
+
+Fast path:
+    The state only ever holds two distinct amplitudes, `a` on the marked
+    states and `b` on the others, so one iteration is
+        a -> -a,  mean = (M a + (N - M) b) / N,  (a, b) -> 2 mean - (a, b)
+    `grover_subspace` iterates these two numbers (and
+    `grover_probabilities` has the closed form), which benchmarks the
+    optimal iteration counts up to 30+ qubits in milliseconds. The
+    circuit path (`grover_circuit` with qiskit's `Statevector`) is used
+    to cross-check them for small n.
+"""
+# pylint: disable=import-error
+
+import time
+import typing
+
+import numpy as np
+
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import ZGate
+from qiskit.quantum_info import Statevector
+
+
+def marked_states(n_qubits: int,
+                  marked: typing.Iterable[int] | typing.Callable[[int], bool]
+                  ) -> list[int]:
+    """marked basis states from a list or from a predicate f(x)"""
+    if callable(marked):
+        return [x for x in range(2**n_qubits) if marked(x)]
+    return sorted(set(marked))
+
+
+def optimal_iterations(n_qubits: int,
+                       n_marked: int
+                       ) -> int:
+    """k = round(pi / (4 theta) - 1/2), sin(theta) = sqrt(M / N)"""
+    if not 0 < n_marked <= 2**n_qubits:
+        raise ValueError(f"n_marked must be in [1, {2**n_qubits}] for "
+                         f"{n_qubits} qubits, not {n_marked}")
+    theta: float = np.arcsin(np.sqrt(n_marked / 2**n_qubits))
+    return max(int(np.round(np.pi / (4 * theta) - 0.5)), 0)
+
+
+def _multi_controlled_z(circuit: QuantumCircuit) -> None:
+    """Z on the last qubit controlled by all the others"""
+    n_qubits: int = circuit.num_qubits
+    if n_qubits == 1:
+        circuit.z(0)
+    else:
+        circuit.append(ZGate().control(n_qubits - 1), range(n_qubits))
+
+
+def phase_oracle(n_qubits: int,
+                 marked: typing.Iterable[int]
+                 ) -> QuantumCircuit:
+    """
+    Flip the sign of every marked state: X on the qubits that are 0 in
+    the state (qubit i is bit i, qiskit order), a multi-controlled Z,
+    and X again
+    """
+    oracle = QuantumCircuit(n_qubits, name='oracle')
+    for state in marked:
+        zeros: list[int] = [i for i in range(n_qubits) if not state >> i & 1]
+        if zeros:
+            oracle.x(zeros)
+        _multi_controlled_z(oracle)
+        if zeros:
+            oracle.x(zeros)
+    return oracle
+
+
+def diffuser(n_qubits: int) -> QuantumCircuit:
+    """2|s><s| - I, up to a global phase"""
+    diffusion = QuantumCircuit(n_qubits, name='diffuser')
+    diffusion.h(range(n_qubits))
+    diffusion.x(range(n_qubits))
+    _multi_controlled_z(diffusion)
+    diffusion.x(range(n_qubits))
+    diffusion.h(range(n_qubits))
+    return diffusion
+
+
+def grover_circuit(n_qubits: int,
+                   marked: typing.Iterable[int] | typing.Callable[[int], bool],
+                   iterations: int | None = None,
+                   measure: bool = True
+                   ) -> QuantumCircuit:
+    """Grover's circuit, with the optimal number of iterations by default"""
+    states: list[int] = marked_states(n_qubits, marked)
+    if iterations is None:
+        iterations = optimal_iterations(n_qubits, len(states))
+    oracle: QuantumCircuit = phase_oracle(n_qubits, states)
+    diffusion: QuantumCircuit = diffuser(n_qubits)
+
+    circuit = QuantumCircuit(n_qubits)
+    circuit.h(range(n_qubits))
+    for _ in range(iterations):
+        circuit.compose(oracle, inplace=True)
+        circuit.compose(diffusion, inplace=True)
+    if measure:
+        circuit.measure_all()
+    return circuit
+
+
+def circuit_success_probability(n_qubits: int,
+                                marked: typing.Iterable[int],
+                                iterations: int | None = None
+                                ) -> float:
+    """probability of a marked state from qiskit's Statevector"""
+    states: list[int] = marked_states(n_qubits, marked)
+    probabilities: np.ndarray = Statevector(grover_circuit(
+        n_qubits, states, iterations, measure=False)).probabilities()
+    return float(probabilities[states].sum())
+
+
+def grover_subspace(n_qubits: int,
+                    n_marked: int,
+                    iterations: int
+                    ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Amplitudes (a_k, b_k) of one marked and one unmarked state after
+    k = 0 .. iterations, iterating on the 2-D subspace
+    """
+    size: float = 2.0**n_qubits
+    marked_amp: np.ndarray = np.empty(iterations + 1)
+    other_amp: np.ndarray = np.empty(iterations + 1)
+    a_amp = b_amp = 1 / np.sqrt(size)
+    marked_amp[0], other_amp[0] = a_amp, b_amp
+    for k in range(1, iterations + 1):
+        mean: float = (-n_marked * a_amp + (size - n_marked) * b_amp) / size
+        a_amp, b_amp = 2 * mean + a_amp, 2 * mean - b_amp
+        marked_amp[k], other_amp[k] = a_amp, b_amp
+    return marked_amp, other_amp
+
+
+def grover_probabilities(n_qubits: int,
+                         n_marked: int,
+                         iterations: np.ndarray
+                         ) -> np.ndarray:
+    """closed form sin^2((2k + 1) theta) for an array of k"""
+    theta: float = np.arcsin(np.sqrt(n_marked / 2**n_qubits))
+    return np.sin((2 * np.asarray(iterations) + 1) * theta)**2
+
+
+def grover_state_vector(n_qubits: int,
+                        marked: typing.Iterable[int],
+                        iterations: int
+                        ) -> np.ndarray:
+    """Grover's state with vectorized NumPy oracle and diffusion steps"""
+    states: np.ndarray = np.asarray(marked_states(n_qubits, marked))
+    state: np.ndarray = np.full(2**n_qubits, 2**(-n_qubits / 2))
+    for _ in range(iterations):
+        state[states] *= -1
+        state = 2 * state.mean() - state
+    return state
+
+
+def main() -> None:
+    """Run Grover's search and benchmark the fast path"""
+    n_qubits: int = 3
+    marked: list[int] = [0b101]
+    circuit: QuantumCircuit = grover_circuit(n_qubits, marked)
+    print(f"Grover's circuit for {n_qubits} qubits, marked {marked}:")
+    print(circuit.decompose(['oracle', 'diffuser']))
+    counts: dict[str, int] = {
+        str(key): int(value) for key, value in Statevector(
+            circuit.remove_final_measurements(inplace=False)
+            ).sample_counts(shots=1000).items()}
+    print(f"Counts for 1000 shots: {counts}\n")
+
+    # Cross-check the circuit path against the subspace iteration
+    print("n  M  k   circuit   subspace")
+    rng: np.random.Generator = np.random.default_rng()
+    for n_qubits in range(2, 8):
+        n_marked: int = int(rng.integers(1, 2**(n_qubits - 1)))
+        marked = list(rng.choice(2**n_qubits, n_marked, replace=False))
+        k_opt: int = optimal_iterations(n_qubits, n_marked)
+        marked_amp, _ = grover_subspace(n_qubits, n_marked, k_opt)
+        subspace: float = n_marked * marked_amp[-1]**2
+        circuit_prob: float = circuit_success_probability(
+            n_qubits, marked, k_opt)
+        print(f"{n_qubits:<2} {n_marked:<2} {k_opt:<3} {circuit_prob:.6f}  "
+              f"{subspace:.6f}")
+
+    # Optimal iteration counts for large registers
+    print("\nn   k_opt   P(success)  seconds")
+    for n_qubits in (10, 20, 30, 36):
+        start: float = time.perf_counter()
+        k_opt = optimal_iterations(n_qubits, 1)
+        marked_amp, _ = grover_subspace(n_qubits, 1, k_opt)
+        print(f"{n_qubits:<3} {k_opt:<7} {marked_amp[-1]**2:.8f}  "
+              f"{time.perf_counter() - start:.4f}")
+
+
+if __name__ == '__main__':
+    main()
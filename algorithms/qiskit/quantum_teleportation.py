@@ -0,0 +1,179 @@
+"""
+Quantum teleportation in qiskit
+
+The same protocol as algorithms/cirq/quantum_teleportation.py: Alice
+and Bob share a Bell pair, Alice makes a Bell measurement of the message
+qubit and her half of the pair, and Bob's corrections (X from Alice's
+bit, Z from the message bit) leave the message on his qubit. The
+corrections are controlled by the measured qubits (deferred
+measurement), as in the cirq version:
+            ┌──────────────┐┌──────────────┐     ┌───┐┌─┐
+    msg:   ─┤ Rx(pi ran_x) ├┤ Ry(pi ran_y) ├──■──┤ H ├┤M├──────■─
+            └─────┬───┬────┘└──────────────┘┌─┴─┐└┬─┬┘└╥┘      │
+    alice: ───────┤ H ├───────────■─────────┤ X ├─┤M├──╫───■───┼─
+                  └───┘         ┌─┴─┐       └───┘ └╥┘  ║ ┌─┴─┐ │
+    bob:   ─────────────────────┤ X ├──────────────╫───╫─┤ X ├─■─
+                                └───┘              ║   ║ └───┘
+    c: 2/══════════════════════════════════════════╩═══╩═════════
+
+`verify_teleportation` checks many random messages at once with the
+batched statevectors of src/local_estimator.py, and `main` converts the
+cirq circuit with src/circuit_ir.py to compare both frameworks on the
+identical circuit.
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+import typing
+
+import numpy as np
+
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+from qiskit.circuit import Parameter
+from qiskit.quantum_info import Statevector, partial_trace
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq import quantum_teleportation as cirq_teleportation
+from src.circuit_ir import benchmark, final_state, to_ir, to_qiskit
+from src.local_estimator import statevectors
+
+
+# Parameters of the message rotations, bound per sample
+RAN_X: Parameter = Parameter('ran_x')
+RAN_Y: Parameter = Parameter('ran_y')
+
+
+class TeleportationCheck(typing.NamedTuple):
+    """batched verification of the protocol, one row per input state"""
+    ran_x: np.ndarray
+    ran_y: np.ndarray
+    fidelity: np.ndarray
+
+
+def make_quantum_teleportation_circuit(ran_x: float | Parameter,
+                                       ran_y: float | Parameter
+                                       ) -> QuantumCircuit:
+    """
+    Teleport the message Ry(pi ran_y) Rx(pi ran_x)|0> from qubit 0
+    (msg) to qubit 2 (bob)
+    """
+    qreg = QuantumRegister(3, 'q')
+    creg = ClassicalRegister(2, 'c')
+    circuit = QuantumCircuit(qreg, creg)
+    msg, alice, bob = qreg
+
+    # Create a Bell pair between Alice and Bob.
+    circuit.h(alice)
+    circuit.cx(alice, bob)
+
+    # Prepare the message on the msg qubit
+    circuit.rx(np.pi * ran_x, msg)
+    circuit.ry(np.pi * ran_y, msg)
+
+    # Bell measurement of the message and Alice's entangled qubit
+    circuit.cx(msg, alice)
+    circuit.h(msg)
+    circuit.measure([msg, alice], creg)
+
+    # Bob's corrections, controlled by the measured qubits
+    circuit.cx(alice, bob)
+    circuit.cz(msg, bob)
+    return circuit
+
+
+def bob_density_matrices(states: np.ndarray) -> np.ndarray:
+    """
+    Bob's reduced density matrices of (N, 8) final states (qiskit
+    order: bob is the most significant qubit)
+    """
+    final: np.ndarray = states.reshape(len(states), 2, 4)
+    return np.einsum('nik,njk->nij', final, final.conj())
+
+
+def verify_teleportation(samples: int = 10_000,
+                         rng: np.random.Generator | None = None
+                         ) -> TeleportationCheck:
+    """
+    Teleport `samples` random messages with one batched statevector
+    run; the fidelity of Bob's qubit is <psi|rho_bob|psi>
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    ran_x: np.ndarray = rng.random(samples)
+    ran_y: np.ndarray = rng.random(samples)
+    circuit: QuantumCircuit = _deferred(
+        make_quantum_teleportation_circuit(RAN_X, RAN_Y))
+    values: np.ndarray = np.column_stack([
+        ran_x if parameter is RAN_X else ran_y
+        for parameter in circuit.parameters])
+    states: np.ndarray = statevectors(circuit, values)
+
+    # The message alone: Ry(pi ran_y) Rx(pi ran_x)|0> on one qubit
+    message_circuit = QuantumCircuit(1)
+    message_circuit.rx(np.pi * RAN_X, 0)
+    message_circuit.ry(np.pi * RAN_Y, 0)
+    messages: np.ndarray = statevectors(message_circuit, values)
+
+    bob_rho: np.ndarray = bob_density_matrices(states)
+    fidelity: np.ndarray = np.real(np.einsum(
+        'ni,nij,nj->n', messages.conj(), bob_rho, messages))
+    return TeleportationCheck(ran_x, ran_y, fidelity)
+
+
+def _deferred(circuit: QuantumCircuit) -> QuantumCircuit:
+    """the circuit with its (mid-circuit) measurements deferred"""
+    deferred: QuantumCircuit = circuit.copy_empty_like()
+    for instruction in circuit.data:
+        if instruction.operation.name != 'measure':
+            deferred.append(instruction)
+    return deferred
+
+
+def main() -> None:
+    """Run the quantum teleportation protocol."""
+    rng: np.random.Generator = np.random.default_rng()
+    ran_x, ran_y = rng.random(2)
+    circuit: QuantumCircuit = make_quantum_teleportation_circuit(
+        ran_x, ran_y)
+    print("circuit for quantum teleportation:")
+    print(circuit)
+
+    # Bob's qubit against the message, from qiskit's Statevector
+    state = Statevector(_deferred(circuit))
+    bob_rho = partial_trace(state, [0, 1])
+    message_circuit = QuantumCircuit(1)
+    message_circuit.rx(np.pi * ran_x, 0)
+    message_circuit.ry(np.pi * ran_y, 0)
+    message_state = Statevector(message_circuit)
+    print("Fidelity of Bob's qubit:",
+          round(float(np.real(message_state.expectation_value(
+              bob_rho.to_operator()))), 6))
+
+    # The cirq circuit through the shared IR: identical final states
+    _, cirq_circuit = cirq_teleportation.make_quantum_teleportation_circuit(
+        ran_x, ran_y)
+    converted: QuantumCircuit = to_qiskit(to_ir(cirq_circuit))
+    print("\ncirq circuit converted to qiskit:")
+    print(converted)
+    difference: float = np.abs(final_state(cirq_circuit, 'cirq')
+                               - final_state(converted, 'qiskit')).max()
+    print(f"largest amplitude difference, cirq vs qiskit: {difference:.2e}")
+    timings: dict[str, float] = benchmark(cirq_circuit)
+    print("seconds per simulation:",
+          {name: round(seconds, 6) for name, seconds in timings.items()})
+
+    # Verify the fidelity over many random input states at once
+    check = verify_teleportation(samples := 10_000, rng)
+    print(f"\nFidelity over {samples} random states:")
+    print("min:", round(check.fidelity.min(), 6),
+          "mean:", round(check.fidelity.mean(), 6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+Benchmarks of the algorithm entry points
+
+Every case times one entry point, circuit construction or simulation,
+at increasing repetitions and (for the GHZ states and Bell chains)
+qubit counts:
+    bell_inequality      make_bell_test_circuit, run_bell_game
+    bell_states          the four Bell builders, simulate, ghz_circuit,
+                         bell_chain
+    deutsch_jozsa        deutsch_josza_algorithm and its sampling
+    teleportation        make_quantum_teleportation_circuit, its
+                         sampling and verify_teleportation
+    superdense           the message circuits and superdense_throughput
+
+A case is called once to warm up (caches, lazy imports), then timed with
+`timeit` (best of `--repeat`), and its peak memory is taken from one more
+call under `tracemalloc`, so the tracing does not slow the timings.
+Throughput is in the units of the case (shots, circuits, bits, ...)
+per second.
+
+Baselines:
+    python benchmarks/run_benchmarks.py --save       # write the baseline
+    python benchmarks/run_benchmarks.py              # compare with it
+    python benchmarks/run_benchmarks.py --filter ghz --quick
+Results are compared with benchmarks/baseline.json (or `--baseline`),
+and a case whose throughput dropped by more than `--tolerance` (10%)
+is flagged; the exit status is then 1. Baselines depend on the machine,
+so they are kept out of git.
+"""
+# pylint: disable=import-error
+
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import sys
+import timeit
+import tracemalloc
+import typing
+
+import numpy as np
+
+import cirq
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq import bell_inequality, deutsch_jozsa_algorithm
+from algorithms.cirq import quantum_teleportation
+from cirq_hidary import bell_states, super_dense_teleportation
+from src.utils import get_sampler, get_simulator
+
+
+DEFAULT_BASELINE: pathlib.Path = pathlib.Path(__file__).parent / \
+    'baseline.json'
+
+
+class Case(typing.NamedTuple):
+    """one benchmark: `function()` processes `units` items per call"""
+    name: str
+    function: typing.Callable[[], typing.Any]
+    units: int
+    unit: str
+
+
+class Measurement(typing.NamedTuple):
+    """timing and memory of one case"""
+    name: str
+    seconds: float
+    throughput: float
+    unit: str
+    peak_bytes: int
+
+
+def _bell_cases(repetitions: list[int],
+                qubit_counts: list[int]
+                ) -> list[Case]:
+    """the CHSH game and the Bell states, GHZ states and Bell chains"""
+    circuit: cirq.Circuit = bell_inequality.make_bell_test_circuit()
+    builders = (bell_states.bell_phi_plus, bell_states.bell_phi_minus,
+                bell_states.bell_psi_plus, bell_states.bell_psi_minus)
+    phi_plus: cirq.Circuit = bell_states.bell_phi_plus(
+        bell_states.QREG, cirq.Circuit())
+    cases: list[Case] = [
+        Case('bell_inequality/build', bell_inequality.make_bell_test_circuit,
+             1, 'circuits'),
+        Case('bell_states/build',
+             lambda: [builder(bell_states.QREG, cirq.Circuit())
+                      for builder in builders],
+             len(builders), 'circuits'),
+    ]
+    for reps in repetitions:
+        cases.append(Case(
+            f'bell_inequality/run/{reps}',
+            lambda reps=reps: bell_inequality.run_bell_game(circuit, reps),
+            reps, 'shots'))
+        cases.append(Case(
+            f'bell_states/run/{reps}',
+            lambda reps=reps: bell_states.simulate(phi_plus, reps),
+            reps, 'shots'))
+    for n_qubits in qubit_counts:
+        ghz: cirq.Circuit = bell_states.ghz_circuit(n_qubits)
+        chain: cirq.Circuit = bell_states.bell_chain(max(n_qubits // 2, 1))
+        cases.append(Case(
+            f'ghz/run/{n_qubits}q',
+            lambda ghz=ghz: bell_states.simulate(ghz, 1000),
+            1000, 'shots'))
+        cases.append(Case(
+            f'bell_chain/run/{n_qubits}q',
+            lambda chain=chain: bell_states.simulate(chain, 1000),
+            1000, 'shots'))
+    return cases
+
+
+def _deutsch_jozsa_cases(repetitions: list[int]) -> list[Case]:
+    """DJA circuits of the four oracles"""
+    oracles = deutsch_jozsa_algorithm.ORACLES
+    q_0, q_1 = deutsch_jozsa_algorithm.Q_0, deutsch_jozsa_algorithm.Q_1
+    circuit: cirq.Circuit = cirq.Circuit(
+        deutsch_jozsa_algorithm.deutsch_josza_algorithm(
+            oracles['balanced'], q_0, q_1))
+    cases: list[Case] = [Case(
+        'deutsch_jozsa/build',
+        lambda: [cirq.Circuit(deutsch_jozsa_algorithm.deutsch_josza_algorithm(
+            oracle, q_0, q_1)) for oracle in oracles.values()],
+        len(oracles), 'circuits')]
+    for reps in repetitions:
+        cases.append(Case(
+            f'deutsch_jozsa/run/{reps}',
+            lambda reps=reps: get_sampler(circuit).run(
+                circuit, repetitions=reps),
+            reps, 'shots'))
+    return cases
+
+
+def _teleportation_cases(repetitions: list[int]) -> list[Case]:
+    """teleportation of a random message; the Bell measurement is
+    mid-circuit, so cirq samples it shot by shot"""
+    rng: np.random.Generator = np.random.default_rng(1234)
+    _, circuit = quantum_teleportation.make_quantum_teleportation_circuit(
+        *rng.random(2))
+    cases: list[Case] = [Case(
+        'teleportation/build',
+        lambda: quantum_teleportation.make_quantum_teleportation_circuit(
+            *rng.random(2)),
+        1, 'circuits')]
+    for reps in repetitions:
+        # Shot-by-shot sampling: 10x fewer shots keeps the suite short
+        shots: int = max(reps // 10, 1)
+        cases.append(Case(
+            f'teleportation/run/{shots}',
+            lambda shots=shots: get_simulator().run(
+                circuit, repetitions=shots),
+            shots, 'shots'))
+        cases.append(Case(
+            f'teleportation/verify/{reps}',
+            lambda reps=reps: quantum_teleportation.verify_teleportation(
+                reps, np.random.default_rng(1234)),
+            reps, 'states'))
+    return cases
+
+
+def _superdense_cases(repetitions: list[int]) -> list[Case]:
+    """message circuits and the bitstream protocol"""
+    qreg: list[cirq.LineQubit] = cirq.LineQubit.range(2)
+    messages = super_dense_teleportation.message_operations(qreg)
+
+    def build() -> list[cirq.Circuit]:
+        return [super_dense_teleportation.bob_message_measurement(
+            super_dense_teleportation.alice_message_perepration(
+                cirq.Circuit(), qreg, mesg, messages), qreg)
+            for mesg in messages]
+
+    cases: list[Case] = [Case('superdense/build', build, len(messages),
+                              'circuits')]
+    for reps in repetitions:
+        # One byte carries four 2-bit messages
+        data: bytes = os.urandom(reps)
+        cases.append(Case(
+            f'superdense/throughput/{8 * reps}',
+            lambda data=data: super_dense_teleportation.superdense_throughput(
+                data, rng=np.random.default_rng(1234)),
+            8 * reps, 'bits'))
+    return cases
+
+
+def benchmark_cases(quick: bool = False) -> list[Case]:
+    """every case, smallest sizes only when `quick`"""
+    repetitions: list[int] = [1_000] if quick else [1_000, 10_000, 100_000]
+    qubit_counts: list[int] = [2, 16] if quick else [2, 16, 64, 256]
+    return (_bell_cases(repetitions, qubit_counts)
+            + _deutsch_jozsa_cases(repetitions)
+            + _teleportation_cases(repetitions)
+            + _superdense_cases(repetitions))
+
+
+def measure(case: Case, repeat: int = 5) -> Measurement:
+    """best-of-`repeat` timing and traced peak memory of one case"""
+    case.function()
+    timer = timeit.Timer(case.function)
+    number, _ = timer.autorange()
+    seconds: float = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        case.function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(case.name, seconds, case.units / seconds, case.unit,
+                       peak)
+
+
+def load_baseline(path: pathlib.Path) -> dict[str, dict[str, typing.Any]]:
+    """the results of a saved baseline, {} if there is none"""
+    if not path.exists():
+        return {}
+    with path.open(encoding='utf-8') as handle:
+        return json.load(handle)['results']
+
+
+def save_baseline(path: pathlib.Path,
+                  measurements: list[Measurement]
+                  ) -> None:
+    """write the measurements, with the environment they ran in"""
+    # Keep the cases of the saved baseline that were not run this time
+    results: dict[str, dict[str, typing.Any]] = load_baseline(path)
+    results.update({m.name: m._asdict() for m in measurements})
+    payload: dict[str, typing.Any] = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'numpy': np.__version__,
+            'cirq': cirq.__version__,
+        },
+        'results': results,
+    }
+    with path.open('w', encoding='utf-8') as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+
+
+def regressions(measurements: list[Measurement],
+                baseline: dict[str, dict[str, typing.Any]],
+                tolerance: float = 0.10
+                ) -> dict[str, float]:
+    """relative throughput change of the cases slower than tolerated"""
+    changes: dict[str, float] = {}
+    for m in measurements:
+        if m.name in baseline:
+            change: float = m.throughput / baseline[m.name]['throughput'] - 1
+            if change < -tolerance:
+                changes[m.name] = change
+    return changes
+
+
+def main(argv: list[str] | None = None) -> int:
+    """run the suite; non-zero exit status on a regression"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--filter', default='',
+                        help="only run the cases whose name contains this")
+    parser.add_argument('--quick', action='store_true',
+                        help="smallest repetitions and qubit counts only")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="timing repeats, the best one is kept")
+    parser.add_argument('--baseline', type=pathlib.Path,
+                        default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="largest tolerated throughput drop")
+    args = parser.parse_args(argv)
+
+    baseline: dict[str, dict[str, typing.Any]] = load_baseline(args.baseline)
+    measurements: list[Measurement] = []
+    print(f"{'case':<32} {'time/call':>12} {'throughput':>20} "
+          f"{'peak memory':>12} {'vs baseline':>12}")
+    for case in benchmark_cases(args.quick):
+        if args.filter not in case.name:
+            continue
+        m: Measurement = measure(case, args.repeat)
+        measurements.append(m)
+        change: str = ""
+        if m.name in baseline:
+            relative: float = m.throughput / baseline[m.name]['throughput']
+            change = f"{relative - 1:+.1%}"
+        print(f"{m.name:<32} {m.seconds * 1e3:10.3f}ms "
+              f"{m.throughput:12.4g} {m.unit + '/s':>7} "
+              f"{m.peak_bytes / 2**20:10.2f}MB {change:>12}", flush=True)
+
+    if args.save:
+        save_baseline(args.baseline, measurements)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+    slower: dict[str, float] = regressions(measurements, baseline,
+                                           args.tolerance)
+    for name, change in slower.items():
+        print(f"REGRESSION {name}: throughput {change:+.1%}")
+    if not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --save")
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
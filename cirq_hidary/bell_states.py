@@ -57,17 +57,52 @@ which gives the third Bell state |Ψ+⟩.
 3- Start from state |10> and Using the Hadamard gate and the CNOT gate,
 which gives the fourth Bell state |Ψ-⟩.
 
+All these circuits are Clifford circuits, so `simulate` and
+`run_bell_sweep` go through the tableau sampler of src/stabilizer.py
+(picked by `get_sampler`), which also handles the 100+ qubit GHZ states
+and Bell chains of `ghz_circuit` and `bell_chain`.
+
 Also see the flloing link from qiskit:
 https://quantumcomputinguk.org/tutorials/introduction-to-bell-states
 """
 
 # pylint: disable=import-error
 
+import functools
+import pathlib
+import sys
+import typing
+
 import cirq
+import sympy
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.instrumentation import instrumented, span
+from src.utils import get_sampler, run_sharded
 
 
+# Preparation bits of the template: Z on qubit 0 and X on qubit 1
+Z_BIT, X_BIT = sympy.symbols('z_bit x_bit')
+
+# (z_bit, x_bit) of each Bell state
+BELL_PREPARATIONS: dict[str, tuple[int, int]] = {
+    'phi_plus': (0, 0),
+    'phi_minus': (1, 0),
+    'psi_plus': (0, 1),
+    'psi_minus': (1, 1),
+}
+
+
+@instrumented(stage='build')
 def bell_phi_plus(qreg: cirq.Qid,
-                  circ: cirq.Circuit) -> None:
+                  circ: cirq.Circuit,
+                  verbose: bool = False
+                  ) -> cirq.Circuit:
     """
     |Φ+⟩ = (|00⟩ + |11⟩)/√2
     0: ───H───@───
@@ -81,15 +116,20 @@ def bell_phi_plus(qreg: cirq.Qid,
     circ.append(cirq.CNOT(qreg[0], qreg[1]))
 
     # Display the circuit.
-    print("circuit for |\\phi+>:")
-    print(circ)
+    if verbose:
+        with span('bell_states.diagram', stage='print'):
+            print("circuit for |\\phi+>:")
+            print(circ)
 
     message(circ, qreg)
-    print(simulate(circ, 10), end='\n\n')
+    return circ
 
 
+@instrumented(stage='build')
 def bell_psi_plus(qreg: cirq.Qid,
-                  circ: cirq.Circuit) -> None:
+                  circ: cirq.Circuit,
+                  verbose: bool = False
+                  ) -> cirq.Circuit:
     """
     The third Bell state
     |Ψ+⟩ = (|01⟩ + |10⟩)/√2
@@ -107,16 +147,20 @@ def bell_psi_plus(qreg: cirq.Qid,
     circ.append(cirq.CNOT(qreg[0], qreg[1]))
 
     # Display the circuit.
-    print("circuit for |\\psi+>:")
-    print(circ)
+    if verbose:
+        with span('bell_states.diagram', stage='print'):
+            print("circuit for |\\psi+>:")
+            print(circ)
 
     message(circ, qreg)
-    print(simulate(circ, 10), end='\n\n')
+    return circ
 
 
+@instrumented(stage='build')
 def bell_phi_minus(qreg: cirq.Qid,
-                   circ: cirq.Circuit
-                   ) -> None:
+                   circ: cirq.Circuit,
+                   verbose: bool = False
+                   ) -> cirq.Circuit:
     """
     The second Bell state
     |Φ-⟩ = (|00⟩ - |11⟩)/√2
@@ -134,16 +178,20 @@ def bell_phi_minus(qreg: cirq.Qid,
     circ.append(cirq.CNOT(qreg[0], qreg[1]))
 
     # Display the circuit.
-    print("circuit for |\\phi->:")
-    print(circ)
+    if verbose:
+        with span('bell_states.diagram', stage='print'):
+            print("circuit for |\\phi->:")
+            print(circ)
 
     message(circ, qreg)
-    print(simulate(circ, 10), end='\n\n')
+    return circ
 
 
+@instrumented(stage='build')
 def bell_psi_minus(qreg: cirq.Qid,
-                   circ: cirq.Circuit
-                   ) -> None:
+                   circ: cirq.Circuit,
+                   verbose: bool = False
+                   ) -> cirq.Circuit:
     """
     The fourth Bell state
     |Ψ-⟩ = (|01⟩ - |10⟩)/√2
@@ -166,11 +214,13 @@ def bell_psi_minus(qreg: cirq.Qid,
     circ.append(cirq.CNOT(qreg[0], qreg[1]))
 
     # Display the circuit.
-    print("circuit for |\\psi->:")
-    print(circ)
+    if verbose:
+        with span('bell_states.diagram', stage='print'):
+            print("circuit for |\\psi->:")
+            print(circ)
 
     message(circ, qreg)
-    print(simulate(circ, 10), end='\n\n')
+    return circ
 
 
 def message(circ: cirq.Circuit,
@@ -181,11 +231,100 @@ def message(circ: cirq.Circuit,
     return circ.append(cirq.measure(*qreg, key=key))
 
 
+@instrumented(stage='build')
+def bell_template(qreg: cirq.Qid,
+                  key: str = 'z'
+                  ) -> cirq.Circuit:
+    """
+    One symbolic circuit for all four Bell states: |Φ+⟩ is prepared and
+    then Z^z_bit and X^x_bit select the state (up to a global phase):
+    0: ───H───@───Z^z_bit───M('z')───
+              │             │
+    1: ───────X───X^x_bit───M────────
+    """
+    circ = cirq.Circuit(
+        cirq.H(qreg[0]),
+        cirq.CNOT(qreg[0], qreg[1]),
+        cirq.Z(qreg[0])**Z_BIT,
+        cirq.X(qreg[1])**X_BIT
+    )
+    message(circ, qreg, key)
+    return circ
+
+
+def bell_resolvers(preparations: typing.Iterable[str | tuple[int, int]]
+                   ) -> list[cirq.ParamResolver]:
+    """resolvers for Bell state names or (z_bit, x_bit) pairs"""
+    resolvers: list[cirq.ParamResolver] = []
+    for prep in preparations:
+        z_bit, x_bit = BELL_PREPARATIONS[prep] if isinstance(prep, str) \
+            else prep
+        resolvers.append(cirq.ParamResolver({Z_BIT: z_bit, X_BIT: x_bit}))
+    return resolvers
+
+
+@functools.lru_cache(maxsize=None)
+def default_template() -> cirq.Circuit:
+    """the template on QREG, built on first use and shared afterwards"""
+    return bell_template(QREG)
+
+
+@instrumented(stage='sample')
+def run_bell_sweep(preparations: typing.Iterable[str | tuple[int, int]],
+                   repetitions: int = 10,
+                   template: cirq.Circuit | None = None
+                   ) -> list[cirq.Result]:
+    """run a batch of preparations through one `run_sweep` call"""
+    if template is None:
+        template = default_template()
+    resolvers: list[cirq.ParamResolver] = bell_resolvers(preparations)
+    return get_sampler(template, resolvers).run_sweep(
+        template, resolvers, repetitions=repetitions)
+
+
+@instrumented(stage='sample')
 def simulate(circ: cirq.Circuit,
-             repetitions: int = 10
+             repetitions: int = 10,
+             workers: int = 1
              ) -> cirq.Result:
-    """ simulate the circuit """
-    return cirq.Simulator().run(circ, repetitions=repetitions)
+    """ simulate the circuit, sharded over processes if workers > 1 """
+    if workers > 1:
+        return run_sharded(circ, repetitions, workers=workers)
+    return get_sampler(circ).run(circ, repetitions=repetitions)
+
+
+@instrumented(stage='build')
+def ghz_circuit(n_qubits: int,
+                key: str = 'z'
+                ) -> cirq.Circuit:
+    """
+    (|0...0⟩ + |1...1⟩)/√2 from H and a CNOT chain, then measured
+    0: ───H───@───────────M('z')───
+              │           │
+    1: ───────X───@───────M────────
+                  │       │
+    2: ───────────X───────M────────
+    """
+    qreg: list[cirq.LineQubit] = cirq.LineQubit.range(n_qubits)
+    circ = cirq.Circuit(cirq.H(qreg[0]))
+    circ.append(cirq.CNOT(control, target)
+                for control, target in zip(qreg, qreg[1:]))
+    message(circ, qreg, key)
+    return circ
+
+
+@instrumented(stage='build')
+def bell_chain(n_pairs: int,
+               key: str = 'z'
+               ) -> cirq.Circuit:
+    """|Φ+⟩ on each pair of qubits (2i, 2i + 1), all measured together"""
+    qreg: list[cirq.LineQubit] = cirq.LineQubit.range(2 * n_pairs)
+    circ = cirq.Circuit()
+    for i_pair in range(n_pairs):
+        circ.append([cirq.H(qreg[2 * i_pair]),
+                     cirq.CNOT(qreg[2 * i_pair], qreg[2 * i_pair + 1])])
+    message(circ, qreg, key)
+    return circ
 
 
 # Create a quantum circuit.
@@ -193,10 +332,29 @@ QREG = cirq.LineQubit.range(2)
 CIRC = cirq.Circuit()
 
 
-bell_phi_plus(QREG, CIRC.copy())
-
-bell_psi_plus(QREG, CIRC.copy())
-
-bell_phi_minus(QREG, CIRC.copy())
-
-bell_psi_minus(QREG, CIRC.copy())
+def main() -> None:
+    """Build, draw and simulate the four Bell states"""
+    for builder in (bell_phi_plus, bell_psi_plus,
+                    bell_phi_minus, bell_psi_minus):
+        circ: cirq.Circuit = builder(QREG, CIRC.copy(), verbose=True)
+        print(simulate(circ, 10), end='\n\n')
+
+    # The same states from the template and a single sweep
+    print(f"template circuit for the Bell states:\n{default_template()}\n")
+    for name, result in zip(BELL_PREPARATIONS,
+                            run_bell_sweep(BELL_PREPARATIONS, 10)):
+        print(f"|{name}>:")
+        print(result, end='\n\n')
+
+    # Far beyond a state vector: only all-0 and all-1 for the GHZ state,
+    # and equal bits within every pair of the Bell chain
+    ghz = simulate(ghz_circuit(200), 1000).measurements['z']
+    print("200 qubit GHZ state, distinct outcomes:",
+          len({row.tobytes() for row in ghz}))
+    chain = simulate(bell_chain(100), 1000).measurements['z']
+    print("100 Bell pairs, pairs always equal:",
+          bool((chain[:, 0::2] == chain[:, 1::2]).all()))
+
+
+if __name__ == '__main__':
+    main()
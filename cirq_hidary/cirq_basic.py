@@ -3,14 +3,29 @@ one qubit and applies NOT gate to it."""
 # pylint: disable=import-error
 
 
+import collections
+import functools
+import pathlib
+import sys
 import typing
 import cirq
 
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.histograms import StreamingHistogram, histogram_of
+from src.instrumentation import instrumented
+from src.utils import get_sampler, get_simulator, iter_shards, run_sharded
+
 if typing.TYPE_CHECKING:
     # Make sure the imports are only required for type checking
     from cirq import Circuit, GridQubit, Simulator, Result
 
 
+@instrumented(stage='simulate')
 def get_state_vector(qubit: 'GridQubit'
                      ) -> None:
     """Get the state vector of the qubit.
@@ -22,19 +37,25 @@ def get_state_vector(qubit: 'GridQubit'
     I|1⟩ = |1⟩
     """
     circuit = cirq.Circuit(cirq.I(qubit))
-    simulator: "Simulator" = cirq.Simulator()
+    simulator: "Simulator" = get_simulator()
     result = simulator.simulate(circuit)
     print(f"State vector of the qubit: {result.final_state_vector}\n")
 
 
+@instrumented(stage='sample')
 def simulating_circuit(circuit: 'Circuit',
-                       repetitions: int = 20
+                       repetitions: int = 20,
+                       workers: int = 1
                        ) -> 'Result':
-    """Simulate the circuit"""
-    simulator: "Simulator" = cirq.Simulator()
-    return simulator.run(circuit, repetitions=repetitions)
+    """Simulate the circuit, sharded over processes if workers > 1;
+    Clifford circuits (X, H, ...) run on the tableau sampler
+    """
+    if workers > 1:
+        return run_sharded(circuit, repetitions, workers=workers)
+    return get_sampler(circuit).run(circuit, repetitions=repetitions)
 
 
+@instrumented(stage='build')
 def not_gate(qubit: 'GridQubit'
              ) -> 'Circuit':
     """apply NOT gate to the circuit
@@ -53,6 +74,7 @@ def not_gate(qubit: 'GridQubit'
     return circuit
 
 
+@instrumented(stage='build')
 def hadamard_gate(qubit: 'GridQubit'
                   ) -> 'Circuit':
     """apply Hadamard gate to the circuit
@@ -76,11 +98,42 @@ def hadamard_gate(qubit: 'GridQubit'
     return circuit
 
 
-def get_histogram(result: 'Result') -> str:
-    """Get the histogram of the measurement results."""
-    return result.histogram(key='m')
-
-
+@instrumented(stage='post-process')
+def get_histogram(result: 'Result',
+                  key: str = 'm'
+                  ) -> collections.Counter:
+    """Get the histogram of the measurement results, as
+    `result.histogram(key)` but counted with NumPy
+    """
+    bits = result.measurements[key]
+    return StreamingHistogram(bits.shape[1]).update(bits).counts()
+
+
+@instrumented(stage='sample')
+def streamed_histogram(circuit: 'Circuit',
+                       repetitions: int,
+                       key: str = 'm',
+                       workers: int = 1,
+                       shard_size: int = 1_000_000,
+                       seed: int | None = None
+                       ) -> StreamingHistogram:
+    """Histogram of a run too large to keep: every shard is reduced to
+    its histogram (in the workers when workers > 1) and merged as soon as
+    it arrives, so only the shards in flight are held
+    """
+    n_bits: int = sum(len(op.qubits) for op in circuit.all_operations()
+                      if cirq.is_measurement(op)
+                      and cirq.measurement_key_name(op) == key)
+    histogram = StreamingHistogram(n_bits)
+    for shard in iter_shards(circuit, repetitions,
+                             reducer=functools.partial(histogram_of, key),
+                             seed=seed, workers=workers,
+                             shard_size=shard_size):
+        histogram.merge(shard)
+    return histogram
+
+
+@instrumented(stage='print')
 def print_circuit(gate: str,
                   circuit: 'Circuit'
                   ) -> None:
@@ -89,6 +142,7 @@ def print_circuit(gate: str,
           f"\t{circuit}")
 
 
+@instrumented(stage='print')
 def print_result_with_histogram(repetitions: int,
                                 result: "Result"
                                 ) -> None:
@@ -127,6 +181,11 @@ def main():
     # Print the results
     print_result_with_histogram(repetitions, result)
 
+    # Histogram of a long run, shard by shard, without the full result
+    histogram = streamed_histogram(circuit_had, repetitions := 10_000_000)
+    print(f"\tHistogram of {repetitions} rep., streamed:\n"
+          f"\t{histogram.counts()}\n")
+
 
 if __name__ == '__main__':
     main()
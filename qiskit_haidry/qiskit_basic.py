@@ -3,8 +3,19 @@ Simple Qiskit program to demonstrate the basic concepts of Quantum
 Computing
 """
 
+import pathlib
+import sys
+
 import qiskit
 
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.local_estimator import sample_counts
+
 # Create a quantum register with 1 qubit.
 qreg = qiskit.QuantumRegister(1, 'qreg')
 
@@ -23,12 +34,9 @@ circ.measure(qreg, creg)
 # Print the circuit.
 print(circ.draw())
 
-# Get a backend to run the quantum circuit.
-# backend = qiskit.BasicAer.get_backend("qasm_simulator")
-
-# Execute the circuit on the backend.
-# job = qiskit.execute(circ, backend, shots=10)
-# result = job.result()
+# Execute the circuit on the local statevector simulator, BasicAer and
+# qiskit.execute are gone from qiskit 1.0
+counts = sample_counts(circ, shots=10)
 
 # Print the result.
-# print(result.get_counts())
\ No newline at end of file
+print(counts)
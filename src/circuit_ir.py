@@ -0,0 +1,506 @@
+"""
+A small circuit IR shared by the cirq and qiskit halves of the repo.
+
+The protocols are written twice (teleportation, the *_basic scripts),
+once with `cirq.Circuit` and once with `qiskit.QuantumCircuit`. Both
+convert to one hashable description:
+    CircuitIR(n_qubits, operations, global_phase)
+    Operation(name, qubits, params)   e.g. Operation('rx', (0,), (pi/2,))
+with qiskit's gate names and cirq's qubit order (qubit 0 is the most
+significant bit of a state index). Parameters are floats or sympy
+expressions, so symbolic circuits convert too.
+
+Gate mapping (cirq -> IR):
+    X**t, Y**t     -> rx(pi t), ry(pi t) + global phase pi t (s + 1/2)
+    Z**t           -> p(pi t) + global phase pi t s (z, s, t, ... for
+                      the usual exponents)
+    CZ**t          -> cp(pi t), and CNOT, SWAP, CCX, CSWAP, H, measure
+    invert_mask    -> x before and after the measure of each inverted
+                      qubit (same outcomes and post-measurement state);
+                      confusion maps are not representable (ValueError)
+    anything else  -> 'unitary' with its matrix (cirq order)
+where s is the gate's global shift; the phases keep the conversion
+exact, not only up to a global phase.
+
+Cache:
+    `to_cirq` and `to_qiskit` are cached on the IR itself (a tuple, so
+    its hash is the content hash), and `from_cirq` on the
+    `cirq.FrozenCircuit` of the circuit, so converting the same circuit
+    again costs one hash. `from_qiskit` is a single pass over the
+    instructions.
+
+Dispatch and benchmark:
+    `final_state(circuit)` runs a circuit of either framework (unitary
+    part, measurements dropped) on the backend `choose_backend` picks
+    for its size: the NumPy einsum engine of src/local_estimator.py
+    has the smallest overhead up to 8 qubits, qiskit's `Statevector`
+    up to 13, and cirq's simulator is the fastest for wider circuits
+    (4x qiskit at 20 qubits). `benchmark` times cirq, qiskit and NumPy
+    on the identical workload.
+"""
+# pylint: disable=import-error
+
+import functools
+import math
+import pathlib
+import sys
+import time
+import typing
+
+import numpy as np
+import sympy
+
+import cirq
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+from qiskit.circuit import Parameter, ParameterExpression
+from qiskit.circuit.library import UnitaryGate
+from qiskit.quantum_info import Statevector
+
+# Make the sibling modules importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.instrumentation import annotate, instrumented
+from src.local_estimator import statevectors
+from src.utils import get_simulator
+
+
+Param = typing.Union[float, sympy.Expr, str, int]
+
+
+class Operation(typing.NamedTuple):
+    """one gate (qiskit name) on IR qubit indices"""
+    name: str
+    qubits: tuple[int, ...]
+    params: tuple[Param, ...] = ()
+
+
+class CircuitIR(typing.NamedTuple):
+    """framework-independent, hashable circuit"""
+    n_qubits: int
+    operations: tuple[Operation, ...]
+    global_phase: float | sympy.Expr = 0.0
+
+    def without_measurements(self) -> 'CircuitIR':
+        """the unitary part, measurements deferred"""
+        return self._replace(operations=tuple(
+            op for op in self.operations if op.name != 'measure'))
+
+
+# Gates without parameters, IR name <-> cirq gate
+_FIXED_GATES: dict[str, cirq.Gate] = {
+    'h': cirq.H,
+    'x': cirq.X,
+    'y': cirq.Y,
+    'z': cirq.Z,
+    's': cirq.S,
+    'sdg': cirq.S**-1,
+    't': cirq.T,
+    'tdg': cirq.T**-1,
+    'cx': cirq.CNOT,
+    'cz': cirq.CZ,
+    'swap': cirq.SWAP,
+    'ccx': cirq.CCX,
+    'cswap': cirq.CSWAP,
+}
+
+# Instructions without effect on the state
+_IGNORED: frozenset[str] = frozenset({'barrier', 'delay', 'id'})
+
+
+def _exponent(angle: Param) -> Param:
+    """cirq exponent of an angle in radians"""
+    if isinstance(angle, sympy.Expr):
+        return angle / sympy.pi
+    return angle / np.pi
+
+
+def _number(value: typing.Any) -> Param:
+    """float for numbers, sympy expression for symbols"""
+    if isinstance(value, sympy.Basic):
+        return float(value) if value.is_number else value
+    return float(value)
+
+
+def _from_cirq_operation(op: cirq.Operation,
+                         qubits: tuple[int, ...]
+                         ) -> tuple[list[Operation], Param]:
+    """IR operations and global phase of one cirq operation"""
+    gate: cirq.Gate | None = op.gate
+    for name, fixed in _FIXED_GATES.items():
+        if gate == fixed:
+            return [Operation(name, qubits)], 0.0
+    exponent = getattr(gate, 'exponent', None)
+    shift = getattr(gate, 'global_shift', 0.0)
+    if isinstance(gate, (cirq.XPowGate, cirq.YPowGate)):
+        name = 'rx' if isinstance(gate, cirq.XPowGate) else 'ry'
+        return [Operation(name, qubits, (_number(sympy.pi * exponent),))], \
+            _number(sympy.pi * exponent * (shift + sympy.Rational(1, 2)))
+    if isinstance(gate, (cirq.ZPowGate, cirq.CZPowGate)):
+        name = 'p' if isinstance(gate, cirq.ZPowGate) else 'cp'
+        return [Operation(name, qubits, (_number(sympy.pi * exponent),))], \
+            _number(sympy.pi * exponent * shift)
+    if isinstance(gate, cirq.MeasurementGate):
+        if gate.confusion_map:
+            raise ValueError(
+                f"cannot convert the confusion map of the measurement {op}")
+        flips: list[Operation] = [
+            Operation('x', (qubit,))
+            for qubit, inverted in zip(qubits, gate.full_invert_mask())
+            if inverted]
+        return [*flips, Operation('measure', qubits,
+                                  (gate.key, *range(len(qubits)))),
+                *flips], 0.0
+    if isinstance(gate, cirq.GlobalPhaseGate) and \
+            not cirq.is_parameterized(gate):
+        return [], float(np.angle(complex(gate.coefficient)))
+    if isinstance(gate, cirq.IdentityGate):
+        return [], 0.0
+    if cirq.is_parameterized(op) or not cirq.has_unitary(op):
+        raise ValueError(f"cannot convert the cirq operation {op}")
+    matrix: np.ndarray = cirq.unitary(op)
+    return [Operation('unitary', qubits,
+                      tuple(complex(entry) for entry in matrix.flat))], 0.0
+
+
+@functools.lru_cache(maxsize=256)
+def _from_frozen(circuit: cirq.FrozenCircuit) -> CircuitIR:
+    """convert a frozen cirq circuit, cached on its content hash"""
+    index: dict[cirq.Qid, int] = {
+        qubit: i for i, qubit in enumerate(sorted(circuit.all_qubits()))}
+    operations: list[Operation] = []
+    phase: Param = 0.0
+    for op in circuit.all_operations():
+        converted, op_phase = _from_cirq_operation(
+            op, tuple(index[qubit] for qubit in op.qubits))
+        operations.extend(converted)
+        phase = _number(phase + op_phase)
+    return CircuitIR(len(index), tuple(operations), phase)
+
+
+@instrumented(stage='compile')
+def from_cirq(circuit: cirq.AbstractCircuit) -> CircuitIR:
+    """
+    IR of a cirq circuit; the qubits are numbered in sorted order and
+    every measurement key becomes a classical register
+    """
+    return _from_frozen(circuit.freeze())
+
+
+def _qiskit_param(value: typing.Any) -> Param:
+    """float, or sympy expression for unbound qiskit parameters"""
+    if isinstance(value, ParameterExpression) and value.parameters:
+        return value.sympify()
+    return float(value)
+
+
+@instrumented(stage='compile')
+def from_qiskit(circuit: QuantumCircuit) -> CircuitIR:
+    """
+    IR of a qiskit circuit: qiskit qubit i is IR qubit i, and a
+    measurement into register[j] is ('measure', (q,), (register, j))
+    """
+    operations: list[Operation] = []
+    for instruction in circuit.data:
+        operation = instruction.operation
+        name: str = operation.name
+        if name in _IGNORED:
+            continue
+        qubits: tuple[int, ...] = tuple(
+            circuit.find_bit(qubit).index for qubit in instruction.qubits)
+        if name == 'measure':
+            location = circuit.find_bit(instruction.clbits[0])
+            register, bit = location.registers[0] if location.registers \
+                else (None, location.index)
+            key: str = register.name if register is not None else 'c'
+            operations.append(Operation(name, qubits, (key, bit)))
+        elif name in _FIXED_GATES:
+            operations.append(Operation(name, qubits))
+        elif name in ('rx', 'ry', 'rz', 'p', 'cp'):
+            operations.append(Operation(
+                name, qubits, (_qiskit_param(operation.params[0]),)))
+        else:
+            # Qiskit matrices are little endian, the IR is big endian
+            matrix: np.ndarray = operation.to_matrix()
+            operations.append(Operation(
+                'unitary', qubits[::-1],
+                tuple(complex(entry) for entry in matrix.flat)))
+    return CircuitIR(circuit.num_qubits, tuple(operations),
+                     _qiskit_param(circuit.global_phase))
+
+
+def _matrix(params: tuple[Param, ...]) -> np.ndarray:
+    """square matrix of a 'unitary' operation"""
+    entries: np.ndarray = np.array(params, dtype=complex)
+    size: int = math.isqrt(len(entries))
+    return entries.reshape(size, size)
+
+
+def _measure_groups(ir: CircuitIR) -> dict[str, list[int]]:
+    """positions of the measurements of every key"""
+    groups: dict[str, list[int]] = {}
+    for position, op in enumerate(ir.operations):
+        if op.name == 'measure':
+            groups.setdefault(op.params[0], []).append(position)
+    return groups
+
+
+def _cirq_measurement(ir: CircuitIR,
+                      key: str,
+                      positions: list[int],
+                      qubits: list[cirq.LineQubit]
+                      ) -> cirq.Operation:
+    """
+    One cirq measurement for all the measure operations of a key, in
+    bit order; the gates in between must not touch measured qubits
+    """
+    measured: dict[int, int] = {}
+    for position in positions:
+        op: Operation = ir.operations[position]
+        for qubit, bit in zip(op.qubits, op.params[1:]):
+            measured[bit] = qubit
+    for op in ir.operations[positions[0]:positions[-1]]:
+        if op.name != 'measure' and set(op.qubits) & set(measured.values()):
+            raise ValueError(f"measurements of '{key}' are interleaved "
+                             "with gates on the measured qubits")
+    return cirq.measure(*(qubits[measured[bit]] for bit in sorted(measured)),
+                        key=key)
+
+
+@functools.lru_cache(maxsize=256)
+def _to_frozen_cirq(ir: CircuitIR) -> cirq.FrozenCircuit:
+    """cirq circuit of an IR, cached on the IR content"""
+    qubits: list[cirq.LineQubit] = cirq.LineQubit.range(ir.n_qubits)
+    last_measure: dict[int, str] = {
+        positions[-1]: key for key, positions in _measure_groups(ir).items()}
+    groups: dict[str, list[int]] = _measure_groups(ir)
+    operations: list[cirq.Operation] = []
+    for position, op in enumerate(ir.operations):
+        targets: list[cirq.LineQubit] = [qubits[q] for q in op.qubits]
+        if op.name == 'measure':
+            if position in last_measure:
+                key: str = last_measure[position]
+                operations.append(
+                    _cirq_measurement(ir, key, groups[key], qubits))
+        elif op.name in _FIXED_GATES:
+            operations.append(_FIXED_GATES[op.name].on(*targets))
+        elif op.name == 'rx':
+            operations.append(cirq.rx(op.params[0]).on(*targets))
+        elif op.name == 'ry':
+            operations.append(cirq.ry(op.params[0]).on(*targets))
+        elif op.name == 'rz':
+            operations.append(cirq.rz(op.params[0]).on(*targets))
+        elif op.name == 'p':
+            operations.append(cirq.ZPowGate(
+                exponent=_exponent(op.params[0])).on(*targets))
+        elif op.name == 'cp':
+            operations.append(cirq.CZPowGate(
+                exponent=_exponent(op.params[0])).on(*targets))
+        elif op.name == 'unitary':
+            operations.append(
+                cirq.MatrixGate(_matrix(op.params)).on(*targets))
+        else:
+            raise ValueError(f"unknown IR operation {op.name}")
+    # cirq.rx, ry and rz are exact, so only the IR phase is left; a
+    # symbolic phase does not change any measurement and is dropped
+    if isinstance(ir.global_phase, float) and \
+            not np.isclose(ir.global_phase, 0):
+        operations.append(cirq.global_phase_operation(
+            np.exp(1j * ir.global_phase)))
+    return cirq.FrozenCircuit(operations)
+
+
+@instrumented(stage='compile')
+def to_cirq(ir: CircuitIR) -> cirq.Circuit:
+    """cirq circuit on LineQubit(0 .. n - 1)"""
+    return _to_frozen_cirq(ir).unfreeze(copy=True)
+
+
+def _to_qiskit_param(value: Param,
+                     parameters: dict[str, Parameter]
+                     ) -> float | ParameterExpression:
+    """float, or qiskit expression built from the sympy one"""
+    if not isinstance(value, sympy.Expr):
+        return float(value)
+    symbols: list[sympy.Symbol] = sorted(value.free_symbols, key=str)
+    for symbol in symbols:
+        parameters.setdefault(symbol.name, Parameter(symbol.name))
+    return sympy.lambdify(symbols, value, 'math')(
+        *(parameters[symbol.name] for symbol in symbols))
+
+
+@functools.lru_cache(maxsize=256)
+def _to_cached_qiskit(ir: CircuitIR) -> QuantumCircuit:
+    """qiskit circuit of an IR, cached on the IR content"""
+    sizes: dict[str, int] = {}
+    for op in ir.operations:
+        if op.name == 'measure':
+            sizes[op.params[0]] = max(
+                sizes.get(op.params[0], 0), max(op.params[1:]) + 1)
+    registers: dict[str, ClassicalRegister] = {
+        key: ClassicalRegister(size, key) for key, size in sizes.items()}
+    circuit = QuantumCircuit(QuantumRegister(ir.n_qubits, 'q'),
+                             *registers.values())
+    parameters: dict[str, Parameter] = {}
+    for op in ir.operations:
+        if op.name == 'measure':
+            register: ClassicalRegister = registers[op.params[0]]
+            circuit.measure(list(op.qubits),
+                            [register[bit] for bit in op.params[1:]])
+        elif op.name == 'unitary':
+            circuit.append(UnitaryGate(_matrix(op.params)), op.qubits[::-1])
+        else:
+            getattr(circuit, op.name)(
+                *(_to_qiskit_param(param, parameters)
+                  for param in op.params), *op.qubits)
+    circuit.global_phase = _to_qiskit_param(ir.global_phase, parameters)
+    return circuit
+
+
+@instrumented(stage='compile')
+def to_qiskit(ir: CircuitIR) -> QuantumCircuit:
+    """qiskit circuit with one classical register per measurement key"""
+    return _to_cached_qiskit(ir).copy()
+
+
+def to_ir(circuit: 'CircuitIR | cirq.AbstractCircuit | QuantumCircuit'
+          ) -> CircuitIR:
+    """IR of a circuit of either framework"""
+    if isinstance(circuit, CircuitIR):
+        return circuit
+    if isinstance(circuit, cirq.AbstractCircuit):
+        return from_cirq(circuit)
+    if isinstance(circuit, QuantumCircuit):
+        return from_qiskit(circuit)
+    raise TypeError(f"not a circuit: {type(circuit).__name__}")
+
+
+def convert(circuit: 'CircuitIR | cirq.AbstractCircuit | QuantumCircuit',
+            target: str
+            ) -> cirq.Circuit | QuantumCircuit:
+    """convert a circuit to 'cirq' or 'qiskit'"""
+    if target == 'cirq':
+        return to_cirq(to_ir(circuit))
+    if target == 'qiskit':
+        return to_qiskit(to_ir(circuit))
+    raise ValueError(f"unknown target framework: {target}")
+
+
+def _little_to_big_endian(state: np.ndarray,
+                          n_qubits: int
+                          ) -> np.ndarray:
+    """reorder a qiskit state so that qubit 0 is the most significant"""
+    return state.reshape((2,) * n_qubits).transpose().reshape(-1) \
+        if n_qubits else state
+
+
+def _cirq_state(ir: CircuitIR) -> np.ndarray:
+    simulator: cirq.Simulator = get_simulator(dtype=np.complex128)
+    return simulator.simulate(
+        _to_frozen_cirq(ir), qubit_order=cirq.LineQubit.range(ir.n_qubits)
+        ).final_state_vector
+
+
+def _qiskit_state(ir: CircuitIR) -> np.ndarray:
+    return _little_to_big_endian(
+        Statevector(_to_cached_qiskit(ir)).data, ir.n_qubits)
+
+
+def _numpy_state(ir: CircuitIR) -> np.ndarray:
+    return _little_to_big_endian(
+        statevectors(_to_cached_qiskit(ir))[0], ir.n_qubits)
+
+
+# Final state vectors of a measurement-free IR, qubit 0 most significant
+BACKENDS: dict[str, typing.Callable[[CircuitIR], np.ndarray]] = {
+    'cirq': _cirq_state,
+    'qiskit': _qiskit_state,
+    'numpy': _numpy_state,
+}
+
+# Widest circuits for which the NumPy engine, then qiskit's
+# Statevector, beat the others (random 10-layer circuits, `main`)
+NUMPY_MAX_QUBITS: int = 8
+QISKIT_MAX_QUBITS: int = 13
+
+
+def choose_backend(ir: CircuitIR) -> str:
+    """fastest backend for the size of the circuit"""
+    symbolic: bool = any(isinstance(param, sympy.Expr)
+                         for op in ir.operations for param in op.params)
+    if symbolic:
+        raise ValueError("resolve the parameters before simulating")
+    if ir.n_qubits <= NUMPY_MAX_QUBITS:
+        return 'numpy'
+    return 'qiskit' if ir.n_qubits <= QISKIT_MAX_QUBITS else 'cirq'
+
+
+@instrumented(stage='simulate')
+def final_state(circuit: 'CircuitIR | cirq.AbstractCircuit | QuantumCircuit',
+                backend: str | None = None
+                ) -> np.ndarray:
+    """
+    State vector of the unitary part of a circuit (measurements
+    dropped), qubit 0 most significant, on `backend` or the fastest one
+    """
+    ir: CircuitIR = to_ir(circuit).without_measurements()
+    if backend is None:
+        backend = choose_backend(ir)
+    annotate(backend=backend, qubits=ir.n_qubits,
+             state_bytes=16 * 2**ir.n_qubits)
+    return BACKENDS[backend](ir)
+
+
+def benchmark(circuit: 'CircuitIR | cirq.AbstractCircuit | QuantumCircuit',
+              repeats: int = 5
+              ) -> dict[str, float]:
+    """best time in seconds of every backend on the identical circuit"""
+    ir: CircuitIR = to_ir(circuit).without_measurements()
+    timings: dict[str, float] = {}
+    for name, run in BACKENDS.items():
+        run(ir)  # warm up the conversion caches
+        best: float = math.inf
+        for _ in range(repeats):
+            start: float = time.perf_counter()
+            run(ir)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+def random_circuit(n_qubits: int,
+                   depth: int,
+                   rng: np.random.Generator | None = None
+                   ) -> CircuitIR:
+    """layers of random rotations and a CZ ladder, a benchmark workload"""
+    if rng is None:
+        rng = np.random.default_rng()
+    operations: list[Operation] = []
+    for _ in range(depth):
+        for qubit in range(n_qubits):
+            name: str = str(rng.choice(['rx', 'ry', 'rz']))
+            operations.append(Operation(
+                name, (qubit,), (float(rng.uniform(0, 2 * np.pi)),)))
+        for qubit in range(n_qubits - 1):
+            operations.append(Operation('cz', (qubit, qubit + 1)))
+    return CircuitIR(n_qubits, tuple(operations))
+
+
+def main() -> None:
+    """Benchmark cirq, qiskit and NumPy on identical circuits"""
+    rng: np.random.Generator = np.random.default_rng(0)
+    print("qubits  depth   cirq (s)   qiskit (s)  numpy (s)  dispatch")
+    for n_qubits in (2, 4, 8, 12, 16, 20):
+        ir: CircuitIR = random_circuit(n_qubits, 10, rng)
+        states = [BACKENDS[name](ir) for name in BACKENDS]
+        assert all(np.allclose(state, states[0]) for state in states)
+        timings: dict[str, float] = benchmark(ir, repeats=3)
+        print(f"{n_qubits:<7} {10:<7} {timings['cirq']:<10.5f} "
+              f"{timings['qiskit']:<11.5f} {timings['numpy']:<10.5f} "
+              f"{choose_backend(ir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,17 @@
 """First Qiskit program."""
+import pathlib
+import sys
+
 from qiskit import QuantumCircuit
 
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.local_estimator import statevectors
+
 # Create a Quantum Circuit acting on a quantum register of one qubit
 circ = QuantumCircuit(1)
 
@@ -10,3 +21,8 @@ circ.h(0)
 # Draw the circuit
 print("\nHello world, Here is the circuit:")
 print(circ)
+
+# Run it on the local statevector simulator
+state = statevectors(circ)[0]
+print(f"\nFinal state: {state}")
+print(f"Probabilities: {abs(state)**2}")
@@ -1,14 +1,39 @@
 """
 This is a simple example of a Qiskit program that runs on IBM Quantum
 Experience.
+
+By default the estimator PUB runs offline on the local NumPy
+statevector estimator in src/local_estimator.py. To submit it to the
+least busy IBM device instead (needs `qiskit_ibm_runtime` and saved
+credentials), set
+    QUANTUM_IBM_BACKEND=1 python src/hello_world_ibm.py
 """
 
+import os
+import pathlib
+import sys
+
 from qiskit import QuantumCircuit
 from qiskit.quantum_info import SparsePauliOp
 from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
-from qiskit_ibm_runtime import EstimatorV2 as Estimator
 import matplotlib.pyplot as plt
 
+# The IBM cloud is only used when asked for explicitly
+USE_IBM_BACKEND: bool = \
+    os.environ.get('QUANTUM_IBM_BACKEND', '') not in ('', '0')
+if USE_IBM_BACKEND:
+    from qiskit_ibm_runtime import EstimatorV2 as Estimator
+    from qiskit_ibm_runtime import QiskitRuntimeService
+
+# Make the shared helpers in src/ importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.local_estimator import (LocalEstimator, grouped_expectation_values,
+                                 statevectors)
+
 # Create a new circuit with two qubits
 qc = QuantumCircuit(2)
 
@@ -25,3 +50,44 @@ figure = qc.draw("mpl")
 
 # Show the figure
 plt.show()
+
+# Set up six different observables of the Bell pair
+observables_labels = ["IZ", "IX", "ZI", "XI", "ZZ", "XX"]
+observables = [SparsePauliOp(label) for label in observables_labels]
+
+# Run on the local statevector estimator, or on the least busy IBM
+# device with QUANTUM_IBM_BACKEND=1
+if USE_IBM_BACKEND:
+    backend = QiskitRuntimeService().least_busy(
+        simulator=False, operational=True)
+    pass_manager = generate_preset_pass_manager(
+        backend=backend, optimization_level=1)
+    isa_circuit = pass_manager.run(qc)
+    mapped_observables = [
+        observable.apply_layout(isa_circuit.layout)
+        for observable in observables]
+    estimator = Estimator(mode=backend)
+    job = estimator.run([(isa_circuit, mapped_observables)])
+else:
+    estimator = LocalEstimator()
+    job = estimator.run([(qc, observables)])
+
+# Expectation values of the observables, <ZZ> = <XX> = 1 for the Bell pair
+values = job.result()[0].data.evs
+for label, value in zip(observables_labels, values):
+    print(f"<{label}> = {value:.4f}")
+
+# All sixteen two-qubit Pauli strings need only one measurement setting
+# per qubit-wise commuting group
+pauli_labels = [first + second for first in "IXYZ" for second in "IXYZ"]
+estimate = grouped_expectation_values(
+    statevectors(qc), [SparsePauliOp(label) for label in pauli_labels],
+    shots=1000)
+print(f"{len(pauli_labels)} observables from {estimate.n_groups} "
+      "measurement settings of 1000 shots")
+
+# Plot the expectation values
+plt.plot(observables_labels, values, "-o")
+plt.xlabel("Observables")
+plt.ylabel("Values")
+plt.show()
@@ -0,0 +1,129 @@
+"""
+Streaming histograms of measurement outcomes.
+
+`Result.histogram(key=...)` needs the whole result in memory and counts
+the rows in a Python Counter. `StreamingHistogram` takes the shots chunk
+by chunk instead: each row of k measured bits becomes one integer,
+big-endian like `Result.histogram` (the first measured qubit is the most
+significant bit), and the integers are counted with NumPy:
+    k <= dense_max_bits:  np.bincount into a dense array of 2^k counts
+    larger k:             np.unique of the chunk, merged into sorted
+                          (outcome, count) arrays of the outcomes seen
+The memory depends on k (or on the number of distinct outcomes), never
+on the number of shots, and histograms of separate shards (e.g. from
+`src.utils.iter_shards` with the `histogram_of` reducer) add up with
+`merge`:
+    histogram = StreamingHistogram(n_bits=2)
+    for chunk in chunks:
+        histogram.update(chunk.measurements['m'])
+    histogram.counts()  # Counter({0: ..., 3: ...})
+"""
+# pylint: disable=import-error
+
+import collections
+
+import numpy as np
+
+from src.instrumentation import instrumented
+
+
+# Largest outcome width counted in a dense array (2^20 int64 = 8 MB)
+DENSE_MAX_BITS: int = 20
+
+# Outcomes are int64 codes
+MAX_BITS: int = 63
+
+
+class StreamingHistogram:
+    """outcome counts of k-bit measurements, accumulated chunk by chunk"""
+    n_bits: int
+    total: int
+    _dense: np.ndarray | None
+    _outcomes: np.ndarray
+    _counts: np.ndarray
+
+    def __init__(self,
+                 n_bits: int,
+                 dense_max_bits: int = DENSE_MAX_BITS
+                 ) -> None:
+        if not 0 <= n_bits <= MAX_BITS:
+            raise ValueError(f"n_bits must be in [0, {MAX_BITS}], "
+                             f"not {n_bits}")
+        self.n_bits = n_bits
+        self.total = 0
+        self._dense = np.zeros(2**n_bits, dtype=np.int64) \
+            if n_bits <= dense_max_bits else None
+        self._outcomes = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def is_dense(self) -> bool:
+        """True when the counts are kept in a 2^n_bits array"""
+        return self._dense is not None
+
+    def encode(self, bits: np.ndarray) -> np.ndarray:
+        """(shots, n_bits) bits to big-endian integer outcomes"""
+        weights: np.ndarray = np.left_shift(
+            1, np.arange(self.n_bits - 1, -1, -1, dtype=np.int64))
+        return np.asarray(bits, dtype=np.int64) @ weights
+
+    @instrumented(stage='post-process')
+    def update(self, bits: np.ndarray) -> 'StreamingHistogram':
+        """add a chunk of shots, e.g. `result.measurements[key]`"""
+        bits = np.asarray(bits)
+        if bits.ndim != 2 or bits.shape[1] != self.n_bits:
+            raise ValueError(f"expected (shots, {self.n_bits}) bits, "
+                             f"got shape {bits.shape}")
+        outcomes: np.ndarray = self.encode(bits)
+        if self._dense is not None:
+            self._dense += np.bincount(outcomes, minlength=len(self._dense))
+        else:
+            self._add_sparse(*np.unique(outcomes, return_counts=True))
+        self.total += len(outcomes)
+        return self
+
+    def _add_sparse(self,
+                    outcomes: np.ndarray,
+                    counts: np.ndarray
+                    ) -> None:
+        """merge sorted (outcome, count) pairs into the sparse counts"""
+        merged: np.ndarray = np.concatenate([self._outcomes, outcomes])
+        self._outcomes, inverse = np.unique(merged, return_inverse=True)
+        self._counts = np.bincount(
+            inverse, weights=np.concatenate([self._counts, counts]),
+            minlength=len(self._outcomes)).astype(np.int64)
+
+    def merge(self, other: 'StreamingHistogram') -> 'StreamingHistogram':
+        """add the counts of another histogram of the same outcomes"""
+        if other.n_bits != self.n_bits:
+            raise ValueError(f"cannot merge {other.n_bits}-bit outcomes "
+                             f"into a {self.n_bits}-bit histogram")
+        outcomes, counts = other.items()
+        if self._dense is not None:
+            np.add.at(self._dense, outcomes, counts)
+        else:
+            self._add_sparse(outcomes, counts)
+        self.total += other.total
+        return self
+
+    def items(self) -> tuple[np.ndarray, np.ndarray]:
+        """sorted outcomes that occurred, and their counts"""
+        if self._dense is not None:
+            outcomes: np.ndarray = np.flatnonzero(self._dense)
+            return outcomes, self._dense[outcomes]
+        return self._outcomes, self._counts
+
+    def counts(self) -> collections.Counter:
+        """the counts as `Result.histogram` returns them"""
+        outcomes, counts = self.items()
+        return collections.Counter(dict(zip(outcomes.tolist(),
+                                            counts.tolist())))
+
+
+def histogram_of(key: str,
+                 measurements: dict[str, np.ndarray]
+                 ) -> StreamingHistogram:
+    """histogram of one key of a chunk; a `map_shards` reducer with
+    functools.partial(histogram_of, key)"""
+    bits: np.ndarray = measurements[key]
+    return StreamingHistogram(bits.shape[1]).update(bits)
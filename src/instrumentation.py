@@ -0,0 +1,303 @@
+"""
+Opt-in timing and memory spans for the stages of the scripts.
+
+The modules mark their hot paths with a stage:
+    build         circuit construction (cirq.Circuit appends)
+    compile       unitaries, tableaus, converted or lowered circuits
+    setup         simulator creation
+    simulate      state vectors and density matrices
+    sample        shots
+    post-process  scoring, histograms, bit strings
+    print         circuit diagrams and reports
+either as a context manager or as a decorator:
+    with span('run_bell_game', stage='sample', shots=repetitions):
+        ...
+    @instrumented(stage='build')
+    def make_bell_test_circuit(...): ...
+Every span records its wall time, its attributes (e.g. the state-vector
+size in `state_bytes`) and, with `enable(memory=True)`, the bytes it
+allocated (net, and peak above its start) from tracemalloc. Tracing
+every allocation slows cirq's sampling about tenfold, so the memory
+columns are a separate opt-in.
+
+Instrumentation is off by default: `span()` then returns one shared
+no-op context and an `instrumented` function costs a single flag check.
+`enable()` turns it on in code; for a whole script set
+    QUANTUM_TRACE=trace.json python algorithms/cirq/bell_inequality.py
+to write a Chrome trace (chrome://tracing, Perfetto) at exit and print
+the per-span summary, and add QUANTUM_TRACE_MEMORY=1 for the
+tracemalloc sizes. Spans are recorded per process, so the shards run
+by a process pool only appear through the span around the pool.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+
+# Stages used by the modules, in pipeline order
+STAGES: tuple[str, ...] = ('build', 'compile', 'setup', 'simulate',
+                           'sample', 'post-process', 'print')
+
+# Environment variable with the Chrome trace path of a traced script
+TRACE_ENV: str = 'QUANTUM_TRACE'
+MEMORY_ENV: str = 'QUANTUM_TRACE_MEMORY'
+
+
+class SpanRecord(typing.NamedTuple):
+    """one finished span"""
+    name: str
+    stage: str
+    start_ns: int
+    duration_ns: int
+    depth: int
+    thread: int
+    attributes: dict[str, typing.Any]
+    net_bytes: int | None
+    peak_bytes: int | None
+
+
+class _State(threading.local):
+    """per-thread stack of the open spans"""
+    stack: list['_Span']
+
+    def __init__(self) -> None:
+        self.stack = []
+
+
+# Global switches and the finished spans of this process
+_CONFIG: dict[str, bool] = {'enabled': False, 'memory': False}
+_RECORDS: list[SpanRecord] = []
+_LOCAL = _State()
+_NULL_SPAN: contextlib.nullcontext = contextlib.nullcontext()
+
+
+class _Span:
+    """context manager recording one span"""
+    name: str
+    stage: str
+    attributes: dict[str, typing.Any]
+    _start_ns: int
+    _start_bytes: int
+    _peak: int
+
+    def __init__(self,
+                 name: str,
+                 stage: str,
+                 attributes: dict[str, typing.Any]
+                 ) -> None:
+        self.name = name
+        self.stage = stage
+        self.attributes = attributes
+
+    def __enter__(self) -> '_Span':
+        stack: list[_Span] = _LOCAL.stack
+        if _CONFIG['memory']:
+            current, peak = tracemalloc.get_traced_memory()
+            # The enclosing span keeps the peak seen so far, then the
+            # peak restarts for this span
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+            self._start_bytes = self._peak = current
+        stack.append(self)
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        duration_ns: int = time.perf_counter_ns() - self._start_ns
+        stack: list[_Span] = _LOCAL.stack
+        stack.pop()
+        net_bytes: int | None = None
+        peak_bytes: int | None = None
+        if _CONFIG['memory']:
+            current, peak = tracemalloc.get_traced_memory()
+            self._peak = max(self._peak, peak)
+            net_bytes = current - self._start_bytes
+            peak_bytes = self._peak - self._start_bytes
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, self._peak)
+        _RECORDS.append(SpanRecord(
+            self.name, self.stage, self._start_ns, duration_ns, len(stack),
+            threading.get_ident(), self.attributes, net_bytes, peak_bytes))
+
+
+def enable(memory: bool = False) -> None:
+    """record spans from now on, with tracemalloc sizes if `memory`"""
+    _CONFIG['enabled'] = True
+    _CONFIG['memory'] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    """stop recording; the recorded spans are kept"""
+    _CONFIG['enabled'] = False
+    if _CONFIG['memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _CONFIG['memory'] = False
+
+
+def is_enabled() -> bool:
+    """True while spans are recorded"""
+    return _CONFIG['enabled']
+
+
+def reset() -> None:
+    """drop the recorded spans"""
+    _RECORDS.clear()
+
+
+def records() -> list[SpanRecord]:
+    """the spans finished so far, in the order they ended"""
+    return list(_RECORDS)
+
+
+def span(name: str,
+         stage: str = 'other',
+         **attributes: typing.Any
+         ) -> typing.ContextManager:
+    """context manager timing `name`; a shared no-op when disabled"""
+    if not _CONFIG['enabled']:
+        return _NULL_SPAN
+    return _Span(name, stage, attributes)
+
+
+def annotate(**attributes: typing.Any) -> None:
+    """add attributes (e.g. state_bytes) to the innermost open span"""
+    if _CONFIG['enabled'] and _LOCAL.stack:
+        _LOCAL.stack[-1].attributes.update(attributes)
+
+
+def instrumented(function: typing.Callable | None = None,
+                 *,
+                 stage: str = 'other',
+                 name: str | None = None
+                 ) -> typing.Callable:
+    """decorator running every call of the function in a span, named
+    after its module (without the package) and qualified name unless
+    `name` is given"""
+    def decorate(func: typing.Callable) -> typing.Callable:
+        # Short module name, also for the functions of a script
+        module: str = func.__module__
+        if module == '__main__':
+            module = os.path.splitext(os.path.basename(
+                func.__globals__.get('__file__', module)))[0]
+        label: str = name or \
+            f"{module.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            if not _CONFIG['enabled']:
+                return func(*args, **kwargs)
+            with _Span(label, stage, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate(function) if function is not None else decorate
+
+
+def summary() -> dict[str, dict[str, typing.Any]]:
+    """calls, wall time and memory per span name (slowest first)"""
+    rows: dict[str, dict[str, typing.Any]] = {}
+    for record in _RECORDS:
+        row: dict[str, typing.Any] = rows.setdefault(record.name, {
+            'stage': record.stage, 'calls': 0, 'total_s': 0.0,
+            'max_s': 0.0, 'net_bytes': 0, 'peak_bytes': 0})
+        seconds: float = record.duration_ns / 1e9
+        row['calls'] += 1
+        row['total_s'] += seconds
+        row['max_s'] = max(row['max_s'], seconds)
+        row['net_bytes'] += record.net_bytes or 0
+        row['peak_bytes'] = max(row['peak_bytes'], record.peak_bytes or 0)
+    for row in rows.values():
+        row['mean_s'] = row['total_s'] / row['calls']
+    return dict(sorted(rows.items(), key=lambda item: -item[1]['total_s']))
+
+
+def stage_totals() -> dict[str, float]:
+    """wall seconds per stage, counting only the outermost span of each
+    stage so that nested spans of the same stage are not added twice"""
+    totals: dict[str, float] = {}
+    for record in _RECORDS:
+        totals.setdefault(record.stage, 0.0)
+    # Intervals of every stage, merged before they are summed
+    for stage in totals:
+        intervals: list[tuple[int, int]] = sorted(
+            (record.start_ns, record.start_ns + record.duration_ns)
+            for record in _RECORDS if record.stage == stage)
+        covered: int = 0
+        end: int = -1
+        for start, stop in intervals:
+            if stop > end:
+                covered += stop - max(start, end)
+                end = stop
+        totals[stage] = covered / 1e9
+    return totals
+
+
+def export_json(path: str | os.PathLike) -> None:
+    """every span and the summary as JSON"""
+    payload: dict[str, typing.Any] = {
+        'spans': [record._asdict() for record in _RECORDS],
+        'summary': summary(),
+        'stages': stage_totals(),
+    }
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(payload, handle, indent=2, default=str)
+
+
+def export_chrome_trace(path: str | os.PathLike) -> None:
+    """the spans as complete ('X') events of the Chrome trace format"""
+    events: list[dict[str, typing.Any]] = []
+    for record in _RECORDS:
+        arguments: dict[str, typing.Any] = dict(record.attributes)
+        if record.net_bytes is not None:
+            arguments['net_bytes'] = record.net_bytes
+            arguments['peak_bytes'] = record.peak_bytes
+        events.append({
+            'name': record.name, 'cat': record.stage, 'ph': 'X',
+            'ts': record.start_ns / 1e3, 'dur': record.duration_ns / 1e3,
+            'pid': os.getpid(), 'tid': record.thread, 'args': arguments})
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, handle,
+                  default=str)
+
+
+def print_summary(file: typing.TextIO = sys.stderr) -> None:
+    """table of `summary()` and the time per stage"""
+    # The peak column only when tracemalloc sizes were recorded
+    memory: bool = any(record.peak_bytes is not None
+                       for record in _RECORDS)
+    print(f"{'span':<56} {'stage':<12} {'calls':>7} {'total':>10} "
+          f"{'mean':>10}" + (f" {'peak':>10}" if memory else ""),
+          file=file)
+    for name, row in summary().items():
+        print(f"{name[-56:]:<56} {row['stage']:<12} {row['calls']:7d} "
+              f"{row['total_s'] * 1e3:8.2f}ms {row['mean_s'] * 1e3:8.3f}ms"
+              + (f" {row['peak_bytes'] / 2**20:8.2f}MB" if memory else ""),
+              file=file)
+    print("time per stage: " + ", ".join(
+        f"{stage} {seconds * 1e3:.2f}ms"
+        for stage, seconds in stage_totals().items()), file=file)
+
+
+def _export_at_exit(path: str) -> None:
+    """write the trace of a QUANTUM_TRACE run"""
+    export_chrome_trace(path)
+    print_summary()
+    print(f"Chrome trace written to {path}", file=sys.stderr)
+
+
+# Trace the whole script when the environment asks for it; spawned
+# pool workers import this module too, but only the main process traces
+if os.environ.get(TRACE_ENV) and multiprocessing.parent_process() is None:
+    enable(memory=os.environ.get(MEMORY_ENV, '') not in ('', '0'))
+    atexit.register(_export_at_exit, os.environ[TRACE_ENV])
@@ -0,0 +1,477 @@
+"""
+Local statevector execution of qiskit circuits with NumPy.
+
+The qiskit scripts (src/hello_world.py, src/hello_world_ibm.py,
+qiskit_haidry/qiskit_basic.py) build `QuantumCircuit`s, but there is no
+Aer and the Runtime `EstimatorV2` needs an IBM account. This module
+runs the circuits here:
+
+Statevectors:
+    `statevectors(circuit, parameter_values)` applies the gates with
+    `np.einsum` to a batch of states at once, shape (B, 2^n), one row
+    per parameter set. The state is the tensor (B, 2, ..., 2) with the
+    highest qubit first (qiskit's little-endian order); parameterized
+    rotations (rx, ry, rz, p, u) are built for the whole batch from
+    the parameter expressions, other gates row by row.
+
+Expectation values:
+    A Pauli string P = (-i)^{q + n_y} Z^z X^x acts on a basis state as
+    P|j^x> = (-i)^{q + n_y} (-1)^{|j & z|} |j>, so
+        <psi|P|psi> = c * sum_j (-1)^{|j & z|} conj(psi[j]) psi[j ^ x]
+    `expectation_values` evaluates every term of a `SparsePauliOp` this
+    way on the batch, without building 2^n x 2^n matrices.
+
+Grouped observables:
+    Pauli strings that qubit-wise commute (on every qubit: I or one
+    common Pauli) are diagonal in one product basis.
+    `grouped_expectation_values` splits hundreds of observables into
+    such groups, rotates the states once per group (H for X, S^dagger H
+    for Y) and reads every Pauli of the group as a parity of the
+    outcome bits, exactly from the probabilities or from `shots`
+    samples. `measurement_circuit` gives the same rotation as a circuit
+    for a device, one execution per group instead of one per observable.
+
+Estimator:
+    `LocalEstimator` is a `BaseEstimatorV2`, a drop-in for the Runtime
+    `EstimatorV2` in the IBM examples:
+        job = LocalEstimator().run([(circuit, observables)])
+        job.result()[0].data.evs
+    Each PUB is simulated once for all its parameter sets, and its
+    distinct observables are evaluated together group by group; with a
+    precision > 0 the groups are sampled with 1 / precision^2 shots.
+"""
+# pylint: disable=import-error
+
+import string
+import typing
+
+import numpy as np
+import sympy
+
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate, ParameterExpression
+from qiskit.primitives import (BaseEstimatorV2, DataBin, PrimitiveJob,
+                               PrimitiveResult, PubResult)
+from qiskit.primitives.containers.estimator_pub import (
+    EstimatorPub, EstimatorPubLike)
+from qiskit.quantum_info import Pauli, PauliList, SparsePauliOp
+
+from src.instrumentation import annotate, instrumented
+
+
+# Subscripts of the state axes in the einsum expressions, 'A' is the batch
+_AXES: str = string.ascii_letters.replace('A', '')
+
+# Instructions without effect on the state
+_IGNORED: frozenset[str] = frozenset({'barrier', 'delay'})
+
+
+def _rotation(generator: np.ndarray) -> typing.Callable[..., np.ndarray]:
+    """exp(-i theta / 2 G) for a Pauli G, batched over theta"""
+    def matrices(theta: np.ndarray) -> np.ndarray:
+        cos = np.cos(theta / 2)[:, None, None]
+        sin = np.sin(theta / 2)[:, None, None]
+        return cos * np.eye(2) - 1j * sin * generator
+    return matrices
+
+
+def _phase(lam: np.ndarray) -> np.ndarray:
+    """P(lambda) = diag(1, e^{i lambda}), batched"""
+    matrices: np.ndarray = np.zeros((len(lam), 2, 2), dtype=complex)
+    matrices[:, 0, 0] = 1
+    matrices[:, 1, 1] = np.exp(1j * lam)
+    return matrices
+
+
+def _u_gate(theta: np.ndarray,
+            phi: np.ndarray,
+            lam: np.ndarray
+            ) -> np.ndarray:
+    """U(theta, phi, lambda) in qiskit's convention, batched"""
+    cos, sin = np.cos(theta / 2), np.sin(theta / 2)
+    return np.stack([
+        np.stack([cos, -np.exp(1j * lam) * sin], axis=-1),
+        np.stack([np.exp(1j * phi) * sin,
+                  np.exp(1j * (phi + lam)) * cos], axis=-1)], axis=-2)
+
+
+# Gates whose matrices are built for a whole batch of parameters
+_BATCHED_GATES: dict[str, typing.Callable[..., np.ndarray]] = {
+    'rx': _rotation(np.array([[0, 1], [1, 0]])),
+    'ry': _rotation(np.array([[0, -1j], [1j, 0]])),
+    'rz': _rotation(np.array([[1, 0], [0, -1]])),
+    'p': _phase,
+    'u1': _phase,
+    'u': _u_gate,
+    'u3': _u_gate,
+}
+
+
+def _parameter_function(value: typing.Any,
+                        parameters: list
+                        ) -> typing.Callable[[np.ndarray], np.ndarray]:
+    """function of the (B, P) parameter values giving one gate parameter"""
+    if not isinstance(value, ParameterExpression) or \
+            not value.parameters:
+        constant: float = float(value)
+        return lambda values: np.full(len(values), constant)
+    symbols: list[sympy.Symbol] = [
+        sympy.Symbol(parameter.name) for parameter in parameters]
+    function = sympy.lambdify(symbols, value.sympify(), 'numpy')
+    return lambda values: np.broadcast_to(
+        np.real(function(*values.T)), len(values)).astype(float)
+
+
+class _Step(typing.NamedTuple):
+    """one gate: a fixed matrix, or a function of the parameter values"""
+    qubits: tuple[int, ...]
+    matrix: np.ndarray | None
+    batched: typing.Callable[[np.ndarray], np.ndarray] | None
+
+
+@instrumented(stage='compile')
+def _compile(circuit: QuantumCircuit) -> list[_Step]:
+    """the gates of a circuit as matrices on qubit indices"""
+    parameters: list = list(circuit.parameters)
+    steps: list[_Step] = []
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in _IGNORED:
+            continue
+        if not isinstance(operation, Gate):
+            raise ValueError(
+                f"non-unitary instruction '{operation.name}' is not "
+                "supported, remove the final measurements first")
+        qubits: tuple[int, ...] = tuple(
+            circuit.find_bit(qubit).index for qubit in instruction.qubits)
+        # is_parameterized() misses expressions in controlled gates
+        if not any(isinstance(param, ParameterExpression) and
+                   param.parameters for param in operation.params):
+            steps.append(_Step(qubits, operation.to_matrix(), None))
+            continue
+        functions = [_parameter_function(param, parameters)
+                     for param in operation.params]
+        steps.append(_Step(qubits, None, _batched_matrices(
+            operation, functions)))
+    return steps
+
+
+def _batched_matrices(operation: Gate,
+                      functions: list[typing.Callable]
+                      ) -> typing.Callable[[np.ndarray], np.ndarray]:
+    """matrices (B, 2^k, 2^k) of a parameterized gate"""
+    def matrices(values: np.ndarray) -> np.ndarray:
+        params: list[np.ndarray] = [function(values) for function in functions]
+        if operation.name in _BATCHED_GATES:
+            return _BATCHED_GATES[operation.name](*params)
+        # Any other gate: bind and build the matrix row by row
+        rows: list[np.ndarray] = []
+        for row in zip(*params):
+            gate = operation.copy()
+            gate.params = [float(value) for value in row]
+            rows.append(gate.to_matrix())
+        return np.array(rows)
+    return matrices
+
+
+def _apply(state: np.ndarray,
+           matrix: np.ndarray,
+           qubits: tuple[int, ...],
+           n_qubits: int
+           ) -> np.ndarray:
+    """apply a k-qubit (or batched, (B, ...)) matrix with einsum"""
+    k: int = len(qubits)
+    batched: bool = matrix.ndim == 3
+    # Qiskit matrices are little endian: the first qarg is the last
+    # tensor axis of the gate
+    gate: np.ndarray = matrix.reshape(
+        ((len(matrix),) if batched else ()) + (2,) * (2 * k))
+    state_axes: list[str] = list(_AXES[:n_qubits])
+    outputs: list[str] = list(_AXES[n_qubits:n_qubits + k])
+    inputs: list[str] = [state_axes[n_qubits - 1 - q] for q in qubits]
+    result_axes: list[str] = state_axes.copy()
+    for qubit, out in zip(qubits, outputs):
+        result_axes[n_qubits - 1 - qubit] = out
+    gate_axes: str = ('A' if batched else '') + \
+        ''.join(outputs[::-1]) + ''.join(inputs[::-1])
+    return np.einsum(f"{gate_axes},A{''.join(state_axes)}->"
+                     f"A{''.join(result_axes)}", gate, state, optimize=True)
+
+
+@instrumented(stage='simulate')
+def statevectors(circuit: QuantumCircuit,
+                 parameter_values: np.ndarray | None = None
+                 ) -> np.ndarray:
+    """
+    Final states of a circuit from |0...0>, one row per parameter set:
+    parameter_values is (B, P) in the order of `circuit.parameters`
+    (or None for circuits without parameters); returns (B, 2^n)
+    """
+    n_qubits: int = circuit.num_qubits
+    if parameter_values is None:
+        parameter_values = np.zeros((1, 0))
+    values: np.ndarray = np.atleast_2d(
+        np.asarray(parameter_values, dtype=float))
+    state: np.ndarray = np.zeros((len(values),) + (2,) * n_qubits,
+                                 dtype=complex)
+    state[(slice(None),) + (0,) * n_qubits] = 1
+    annotate(qubits=n_qubits, batch=len(values), state_bytes=state.nbytes)
+    for step in _compile(circuit):
+        matrix = step.matrix if step.matrix is not None else \
+            step.batched(values)
+        state = _apply(state, matrix, step.qubits, n_qubits)
+    phase: np.ndarray = _parameter_function(
+        circuit.global_phase, list(circuit.parameters))(values)
+    return state.reshape(len(values), -1) * np.exp(1j * phase)[:, None]
+
+
+def expectation_values(states: np.ndarray,
+                       observable: SparsePauliOp
+                       ) -> np.ndarray:
+    """<psi|O|psi> of a SparsePauliOp for every row of (B, 2^n) states"""
+    states = np.atleast_2d(states)
+    index: np.ndarray = np.arange(states.shape[1])
+    weights: np.ndarray = 1 << np.arange(observable.num_qubits)
+    x_masks: np.ndarray = observable.paulis.x @ weights
+    z_masks: np.ndarray = observable.paulis.z @ weights
+    n_y: np.ndarray = np.sum(observable.paulis.x & observable.paulis.z,
+                             axis=1)
+    factors: np.ndarray = observable.coeffs * (-1j)**(
+        observable.paulis.phase + n_y)
+    values: np.ndarray = np.zeros(len(states), dtype=complex)
+    # Terms sharing an X mask share the gathered products
+    for x_mask in np.unique(x_masks):
+        products: np.ndarray = np.conj(states) * states[:, index ^ x_mask]
+        for term in np.flatnonzero(x_masks == x_mask):
+            signs: np.ndarray = 1 - 2 * (np.bitwise_count(
+                index & z_masks[term]) & 1).astype(np.int64)
+            values += factors[term] * (products @ signs)
+    return values
+
+
+@instrumented(stage='sample')
+def sample_counts(circuit: QuantumCircuit,
+                  shots: int,
+                  seed: int | None = None
+                  ) -> dict[str, int]:
+    """
+    Counts of the classical register, like `result.get_counts()`, for a
+    circuit whose measurements are all at the end
+    """
+    measured: list[tuple[int, int]] = [
+        (circuit.find_bit(instruction.qubits[0]).index,
+         circuit.find_bit(instruction.clbits[0]).index)
+        for instruction in circuit.data
+        if instruction.operation.name == 'measure']
+    state: np.ndarray = statevectors(
+        circuit.remove_final_measurements(inplace=False))[0]
+    probabilities: np.ndarray = np.abs(state)**2
+    rng: np.random.Generator = np.random.default_rng(seed)
+    outcomes: np.ndarray = rng.choice(
+        len(state), size=shots, p=probabilities / probabilities.sum())
+    clbits: np.ndarray = np.zeros(shots, dtype=np.int64)
+    for qubit, clbit in measured:
+        clbits |= ((outcomes >> qubit) & 1) << clbit
+    values, counts = np.unique(clbits, return_counts=True)
+    return {format(int(value), f'0{circuit.num_clbits}b'): int(count)
+            for value, count in zip(values, counts)}
+
+
+# Rotations into the eigenbasis of each Pauli, applied before a
+# Z-basis measurement: Y needs S^dagger then H
+_BASIS_ROTATIONS: dict[str, np.ndarray] = {
+    'X': np.array([[1, 1], [1, -1]]) / np.sqrt(2),
+    'Y': np.array([[1, -1j], [1, 1j]]) / np.sqrt(2),
+}
+
+
+class PauliGroup(typing.NamedTuple):
+    """qubit-wise commuting Paulis and their shared measurement basis"""
+    basis: str
+    paulis: PauliList
+    columns: np.ndarray
+
+
+class GroupedEstimate(typing.NamedTuple):
+    """expectation values (B, n_observables), their stds and group count"""
+    evs: np.ndarray
+    stds: np.ndarray
+    n_groups: int
+
+
+def pauli_terms(observables: typing.Sequence[SparsePauliOp]
+                ) -> tuple[PauliList, np.ndarray]:
+    """
+    Distinct Pauli strings of the observables, phase removed, and the
+    (n_observables, n_paulis) coefficient matrix
+    """
+    columns: dict[str, int] = {}
+    entries: list[tuple[int, int, complex]] = []
+    for row, observable in enumerate(observables):
+        for pauli, coeff in zip(observable.paulis, observable.coeffs):
+            label: str = Pauli((pauli.z, pauli.x)).to_label()
+            column: int = columns.setdefault(label, len(columns))
+            entries.append((row, column, coeff * (-1j)**pauli.phase))
+    coefficients: np.ndarray = np.zeros(
+        (len(observables), len(columns)), dtype=complex)
+    for row, column, coeff in entries:
+        coefficients[row, column] += coeff
+    return PauliList(list(columns)), coefficients
+
+
+def qubit_wise_groups(paulis: PauliList) -> list[PauliGroup]:
+    """
+    Partition Pauli strings into qubit-wise commuting sets: on every
+    qubit the strings of a set are I or one common Pauli, so a single
+    basis rotation measures them all
+    """
+    columns: dict[str, int] = {
+        label: column for column, label in enumerate(paulis.to_labels())}
+    groups: list[PauliGroup] = []
+    for group in paulis.group_qubit_wise_commuting():
+        labels: list[str] = group.to_labels()
+        basis: str = ''.join(
+            max(letters, key=lambda letter: letter != 'I')
+            for letters in zip(*labels))
+        groups.append(PauliGroup(basis, group, np.array(
+            [columns[label] for label in labels])))
+    return groups
+
+
+def measurement_circuit(circuit: QuantumCircuit,
+                        basis: str
+                        ) -> QuantumCircuit:
+    """the circuit rotated into a group basis and measured, for devices"""
+    measured: QuantumCircuit = circuit.remove_final_measurements(
+        inplace=False)
+    # Labels are big endian: the last letter is qubit 0
+    for qubit, letter in enumerate(reversed(basis)):
+        if letter == 'Y':
+            measured.sdg(qubit)
+        if letter in 'XY':
+            measured.h(qubit)
+    measured.measure_all()
+    return measured
+
+
+def _rotate(states: np.ndarray,
+            basis: str
+            ) -> np.ndarray:
+    """apply the basis rotation of a group to (B, 2^n) states"""
+    n_qubits: int = len(basis)
+    tensor: np.ndarray = states.reshape((len(states),) + (2,) * n_qubits)
+    for qubit, letter in enumerate(reversed(basis)):
+        if letter in _BASIS_ROTATIONS:
+            tensor = _apply(tensor, _BASIS_ROTATIONS[letter], (qubit,),
+                            n_qubits)
+    return tensor.reshape(len(states), -1)
+
+
+@instrumented(stage='post-process')
+def grouped_expectation_values(states: np.ndarray,
+                               observables: typing.Sequence[SparsePauliOp],
+                               shots: int | None = None,
+                               seed: int | np.random.Generator | None = None
+                               ) -> GroupedEstimate:
+    """
+    Expectation values of many observables on (B, 2^n) states with one
+    basis rotation per qubit-wise commuting group: exact from the
+    rotated probabilities, or from `shots` samples per group and state
+    """
+    states = np.atleast_2d(states)
+    paulis, coefficients = pauli_terms(observables)
+    coefficients = np.real(coefficients)
+    groups: list[PauliGroup] = qubit_wise_groups(paulis)
+    weights: np.ndarray = 1 << np.arange(paulis.num_qubits)
+    index: np.ndarray = np.arange(states.shape[1])
+    rng: np.random.Generator = np.random.default_rng(seed)
+
+    evs: np.ndarray = np.zeros((len(states), len(observables)))
+    variances: np.ndarray = np.zeros_like(evs)
+    for group in groups:
+        probabilities: np.ndarray = np.abs(_rotate(states, group.basis))**2
+        supports: np.ndarray = (group.paulis.x | group.paulis.z) @ weights
+        # Eigenvalue of every Pauli of the group on every basis state
+        signs: np.ndarray = 1 - 2 * (np.bitwise_count(
+            index[:, None] & supports) & 1).astype(np.int64)
+        group_coefficients: np.ndarray = coefficients[:, group.columns]
+        if shots is None:
+            evs += probabilities @ signs @ group_coefficients.T
+            continue
+        for row, probability in enumerate(probabilities):
+            outcomes: np.ndarray = rng.choice(
+                len(probability), size=shots,
+                p=probability / probability.sum())
+            per_shot: np.ndarray = signs[outcomes] @ group_coefficients.T
+            evs[row] += per_shot.mean(axis=0)
+            variances[row] += per_shot.var(axis=0) / shots
+    return GroupedEstimate(evs, np.sqrt(variances), len(groups))
+
+
+class LocalEstimator(BaseEstimatorV2):
+    """Estimator V2 running the PUBs on the local NumPy statevector"""
+
+    def __init__(self,
+                 *,
+                 default_precision: float = 0.0,
+                 seed: int | None = None
+                 ) -> None:
+        """
+        precision > 0 samples ceil(1 / precision^2) shots per commuting
+        group instead of returning exact values
+        """
+        self._default_precision = default_precision
+        self._seed = seed
+
+    def run(self,
+            pubs: typing.Iterable[EstimatorPubLike],
+            *,
+            precision: float | None = None
+            ) -> PrimitiveJob[PrimitiveResult[PubResult]]:
+        """estimate the expectation values of every PUB"""
+        if precision is None:
+            precision = self._default_precision
+        coerced: list[EstimatorPub] = [
+            EstimatorPub.coerce(pub, precision) for pub in pubs]
+        job = PrimitiveJob(self._run, coerced)
+        job._submit()  # pylint: disable=protected-access
+        return job
+
+    def _run(self,
+             pubs: list[EstimatorPub]
+             ) -> PrimitiveResult[PubResult]:
+        return PrimitiveResult([self._run_pub(pub) for pub in pubs],
+                               metadata={'version': 2})
+
+    def _run_pub(self, pub: EstimatorPub) -> PubResult:
+        """one simulation for all the parameter sets of a PUB"""
+        circuit: QuantumCircuit = pub.circuit.remove_final_measurements(
+            inplace=False)
+        bindings = pub.parameter_values
+        values: np.ndarray = bindings.as_array(circuit.parameters).reshape(
+            bindings.size, circuit.num_parameters)
+        states: np.ndarray = statevectors(circuit, values)
+        state_index: np.ndarray = np.arange(len(states)).reshape(
+            bindings.shape)
+        observables, state_index = np.broadcast_arrays(
+            pub.observables, state_index)
+
+        # Evaluate the distinct observables together, one basis rotation
+        # per qubit-wise commuting group
+        keys: dict[tuple, int] = {}
+        columns: np.ndarray = np.zeros(observables.shape, dtype=np.intp)
+        for index in np.ndindex(*observables.shape):
+            key: tuple = tuple(sorted(observables[index].items()))
+            columns[index] = keys.setdefault(key, len(keys))
+        shots: int | None = None if pub.precision == 0 else \
+            int(np.ceil(1 / pub.precision**2))
+        estimate: GroupedEstimate = grouped_expectation_values(
+            states, [SparsePauliOp([label for label, _ in key],
+                                   [coeff for _, coeff in key])
+                     for key in keys], shots, self._seed)
+        data = DataBin(evs=estimate.evs[state_index, columns],
+                       stds=estimate.stds[state_index, columns],
+                       shape=observables.shape)
+        return PubResult(data, metadata={
+            'target_precision': pub.precision,
+            'circuit_metadata': pub.circuit.metadata})
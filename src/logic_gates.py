@@ -0,0 +1,230 @@
+"""
+Bit-parallel logic gates.
+
+The notebooks in notebooks/logic_gates (gates_adder, gates_subtractor,
+gates_neuling) evaluate `half_adder`, `full_adder`, `half_subtractor`,
+... one bit at a time with Python ints; they stay the reference
+implementations. Here the same gate networks are evaluated on
+bit-sliced NumPy arrays: every signal is a uint64 array where bit k of
+word w carries the value of the signal for input vector 64 * w + k, so
+one bitwise NumPy operation evaluates a gate for 64 input vectors per
+word:
+    a = pack_bits([0, 1, 1, 0, ...])      # one word per 64 vectors
+    total, carry = full_adder(a, b, c_in)  # XOR / AND / OR on words
+    unpack_bits(total, count)              # back to 0/1 per vector
+
+On top of the gates:
+    - `evaluate` runs a network over an (N, n_inputs) array of bits,
+    - `truth_table` enumerates every input of a network as a DataFrame,
+    - `ripple_add` / `ripple_subtract` chain full adders / subtractors
+      over the bits of two integer arrays.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+# Bit-sliced signal: uint64 words, 64 input vectors per word
+Words = np.ndarray
+
+# A gate network takes and returns bit-sliced signals
+Network = typing.Callable[..., Words | tuple[Words, ...]]
+
+WORD_BITS: int = 64
+
+
+def pack_bits(bits: typing.Sequence[int] | np.ndarray) -> Words:
+    """pack a 0/1 array into uint64 words, element k -> bit k % 64"""
+    packed: np.ndarray = np.packbits(
+        np.asarray(bits, dtype=bool), bitorder='little')
+    padded: np.ndarray = np.zeros(-(-packed.size // 8) * 8, dtype=np.uint8)
+    padded[:packed.size] = packed
+    return padded.view('<u8')
+
+
+def unpack_bits(words: Words,
+                count: int
+                ) -> np.ndarray:
+    """the first `count` signal values as a uint8 0/1 array"""
+    return np.unpackbits(np.ascontiguousarray(words, dtype='<u8'
+                                              ).view(np.uint8),
+                         count=count, bitorder='little')
+
+
+# Elementary gates on bit-sliced signals
+def not_gate(a_in: Words) -> Words:
+    """NOT, the padding bits beyond the last vector are don't-care"""
+    return ~a_in
+
+
+def and_gate(a_in: Words, b_in: Words) -> Words:
+    """AND"""
+    return a_in & b_in
+
+
+def or_gate(a_in: Words, b_in: Words) -> Words:
+    """OR"""
+    return a_in | b_in
+
+
+def xor_gate(a_in: Words, b_in: Words) -> Words:
+    """XOR"""
+    return a_in ^ b_in
+
+
+def half_adder(a_in: Words,
+               b_in: Words
+               ) -> tuple[Words, Words]:
+    """Sum (XOR) and Carry (AND)"""
+    return xor_gate(a_in, b_in), and_gate(a_in, b_in)
+
+
+def full_adder(a_in: Words,
+               b_in: Words,
+               c_in: Words
+               ) -> tuple[Words, Words]:
+    """Sum and carry-out from two half adders and an OR"""
+    sum_1, carry_1 = half_adder(a_in, b_in)
+    total, carry_2 = half_adder(sum_1, c_in)
+    return total, or_gate(carry_1, carry_2)
+
+
+def half_subtractor(a_in: Words,
+                    b_in: Words
+                    ) -> tuple[Words, Words]:
+    """Difference (XOR) and Borrow (NOT A AND B)"""
+    return xor_gate(a_in, b_in), and_gate(not_gate(a_in), b_in)
+
+
+def full_subtractor(a_in: Words,
+                    b_in: Words,
+                    d_in: Words
+                    ) -> tuple[Words, Words]:
+    """Difference and borrow-out: (NOT A AND B) OR (NOT(A XOR B) AND Bin)"""
+    diff_1, borrow_1 = half_subtractor(a_in, b_in)
+    diff, borrow_2 = half_subtractor(diff_1, d_in)
+    return diff, or_gate(borrow_1, borrow_2)
+
+
+def evaluate(network: Network,
+             inputs: np.ndarray
+             ) -> np.ndarray:
+    """
+    Evaluate a network on an (N, n_inputs) array of 0/1 input vectors;
+    returns an (N, n_outputs) uint8 array
+    """
+    inputs = np.asarray(inputs)
+    outputs: Words | tuple[Words, ...] = network(
+        *(pack_bits(column) for column in inputs.T))
+    if not isinstance(outputs, tuple):
+        outputs = (outputs,)
+    return np.stack([unpack_bits(out, len(inputs)) for out in outputs],
+                    axis=1)
+
+
+def input_columns(n_inputs: int) -> list[Words]:
+    """
+    Bit-sliced inputs enumerating all 2^n rows of a truth table; the
+    first input is the most significant bit of the row number
+    """
+    rows: np.ndarray = np.arange(2**n_inputs, dtype=np.uint64)
+    return [pack_bits((rows >> np.uint64(n_inputs - 1 - i_in)) & 1)
+            for i_in in range(n_inputs)]
+
+
+def truth_table(network: Network,
+                inputs: list[str],
+                outputs: list[str]
+                ) -> pd.DataFrame:
+    """
+    Truth table of a network with the named inputs and outputs, e.g.
+        truth_table(full_adder, ['A', 'B', 'C_in'], ['S', 'C_out'])
+    """
+    n_rows: int = 2**len(inputs)
+    columns: list[Words] = input_columns(len(inputs))
+    results: Words | tuple[Words, ...] = network(*columns)
+    if not isinstance(results, tuple):
+        results = (results,)
+    table: dict[str, np.ndarray] = {
+        name: unpack_bits(words, n_rows)
+        for name, words in zip([*inputs, *outputs], [*columns, *results])}
+    return pd.DataFrame(table)
+
+
+def _bit_planes(values: np.ndarray,
+                width: int
+                ) -> list[Words]:
+    """bit-sliced signals of bits 0 .. width-1 of an integer array"""
+    values = np.asarray(values).astype(np.uint64)
+    return [pack_bits((values >> np.uint64(i_bit)) & np.uint64(1))
+            for i_bit in range(width)]
+
+
+def _from_bit_planes(planes: list[Words],
+                     count: int
+                     ) -> np.ndarray:
+    """integers from their bit-sliced bits, least significant first"""
+    values: np.ndarray = np.zeros(count, dtype=np.uint64)
+    for i_bit, plane in enumerate(planes):
+        values |= unpack_bits(plane, count).astype(np.uint64) \
+            << np.uint64(i_bit)
+    return values
+
+
+def _width(a_de: np.ndarray,
+           b_de: np.ndarray
+           ) -> int:
+    """number of bits of the largest operand (at least 1)"""
+    largest: int = int(max(np.max(a_de, initial=0), np.max(b_de, initial=0)))
+    return max(largest.bit_length(), 1)
+
+
+def ripple_add(a_de: np.ndarray,
+               b_de: np.ndarray,
+               width: int | None = None
+               ) -> np.ndarray:
+    """
+    Element-wise a + b of two arrays of non-negative integers through a
+    ripple-carry chain of `width` full adders; the last carry-out is
+    the extra top bit of the result
+    """
+    a_de, b_de = np.asarray(a_de), np.asarray(b_de)
+    if width is None:
+        width = _width(a_de, b_de)
+    if width > 63:
+        raise ValueError("width must fit in 63 bits")
+    count: int = a_de.size
+    carry: Words = np.zeros(-(-count // WORD_BITS), dtype='<u8')
+    planes: list[Words] = []
+    for a_in, b_in in zip(_bit_planes(a_de, width), _bit_planes(b_de, width)):
+        total, carry = full_adder(a_in, b_in, carry)
+        planes.append(total)
+    planes.append(carry)
+    return _from_bit_planes(planes, count).astype(np.int64)
+
+
+def ripple_subtract(a_de: np.ndarray,
+                    b_de: np.ndarray,
+                    width: int | None = None
+                    ) -> np.ndarray:
+    """
+    Element-wise a - b of two arrays of non-negative integers through a
+    chain of `width` full subtractors; a final borrow means a negative
+    result (two's complement on width bits)
+    """
+    a_de, b_de = np.asarray(a_de), np.asarray(b_de)
+    if width is None:
+        width = _width(a_de, b_de)
+    if width > 62:
+        raise ValueError("width must fit in 62 bits")
+    count: int = a_de.size
+    borrow: Words = np.zeros(-(-count // WORD_BITS), dtype='<u8')
+    planes: list[Words] = []
+    for a_in, b_in in zip(_bit_planes(a_de, width), _bit_planes(b_de, width)):
+        diff, borrow = full_subtractor(a_in, b_in, borrow)
+        planes.append(diff)
+    difference: np.ndarray = _from_bit_planes(planes, count).astype(np.int64)
+    return difference - (unpack_bits(borrow, count).astype(np.int64)
+                         << width)
@@ -0,0 +1,186 @@
+"""
+Compile small boolean functions into lookup tables.
+
+Controller functions such as `smart_room(presence, ambient_light, door)`
+(notebooks/logic_gates/smart_room_controller.ipynb) or the next-state
+rules of the SR / JK flip-flops recompute their NOT / AND / OR chains on
+every call. `lookup_table` evaluates such a function once for all the
+2^n inputs and stores the outputs packed in one integer per input
+(bit j = output j). Bulk inputs are then answered by a single gather:
+    @lookup_table
+    def smart_room(presence, ambient_light, door):
+        return presence & (1 - ambient_light), presence & (1 - door)
+
+    smart_room(1, 0, 1)                    # (1, 0), as before
+    light, fan = smart_room.lookup(readings)  # readings: (N, 3) array
+
+    @lookup_table
+    def jk_next(q, j, k):
+        return (j & (1 - q)) | ((1 - k) & q)
+
+A table is compiled on its first call or lookup, not at decoration,
+so importing a module of decorated functions costs nothing. With a
+`cache_dir` (or the LOOKUP_TABLE_CACHE environment variable) the
+compiled tables are saved there, keyed by a hash of the function
+source, so repeated notebook and batch runs load them instead of
+recompiling. Without one, or for functions whose source is unavailable,
+they are compiled in memory only.
+"""
+
+import functools
+import hashlib
+import inspect
+import itertools
+import os
+import pathlib
+import tempfile
+import typing
+
+import numpy as np
+
+
+# On-disk cache only if asked for
+DEFAULT_CACHE_DIR: pathlib.Path | None = pathlib.Path(
+    os.environ['LOOKUP_TABLE_CACHE']) \
+    if os.environ.get('LOOKUP_TABLE_CACHE') else None
+
+# Largest number of inputs compiled exhaustively
+MAX_INPUTS: int = 20
+
+
+def _table_dtype(n_outputs: int) -> type:
+    """smallest unsigned integer holding one bit per output"""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_outputs <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"too many outputs: {n_outputs}")
+
+
+def source_hash(function: typing.Callable) -> str | None:
+    """sha256 of the function source, None if it is not available"""
+    try:
+        source: str = inspect.getsource(function)
+    except (OSError, TypeError):
+        return None
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+class LookupTable:
+    """A boolean function compiled to a packed truth table"""
+    function: typing.Callable[..., int | tuple[int, ...]]
+    n_inputs: int
+    cache_dir: pathlib.Path | None
+
+    def __init__(self,
+                 function: typing.Callable[..., int | tuple[int, ...]],
+                 cache_dir: pathlib.Path | None = DEFAULT_CACHE_DIR
+                 ) -> None:
+        self.function = function
+        self.n_inputs = len(inspect.signature(function).parameters)
+        if self.n_inputs > MAX_INPUTS:
+            raise ValueError(
+                f"{function.__name__} has {self.n_inputs} inputs, at most "
+                f"{MAX_INPUTS} are compiled")
+        functools.update_wrapper(self, function)
+        self.cache_dir = None if cache_dir is None else \
+            pathlib.Path(cache_dir)
+
+    @property
+    def table(self) -> np.ndarray:
+        """packed outputs, one entry per input"""
+        return self._compiled[0]
+
+    @property
+    def n_outputs(self) -> int:
+        """number of outputs of the function"""
+        return self._compiled[1]
+
+    @property
+    def scalar_output(self) -> bool:
+        """whether the function returns a single bit"""
+        return self._compiled[2]
+
+    @functools.cached_property
+    def _compiled(self) -> tuple[np.ndarray, int, bool]:
+        """(table, n_outputs, scalar_output), built on first use"""
+        return self._load_or_compile()
+
+    def _compile(self) -> tuple[np.ndarray, int, bool]:
+        """evaluate the function on every input, first input = MSB"""
+        outputs: list[int | tuple[int, ...]] = [
+            self.function(*bits)
+            for bits in itertools.product((0, 1), repeat=self.n_inputs)]
+        columns: np.ndarray = np.array(outputs, dtype=np.uint64).reshape(
+            len(outputs), -1) & 1
+        n_outputs: int = columns.shape[1]
+        weights: np.ndarray = np.uint64(1) << np.arange(
+            n_outputs, dtype=np.uint64)
+        table: np.ndarray = (columns * weights).sum(axis=1).astype(
+            _table_dtype(n_outputs))
+        return table, n_outputs, not isinstance(outputs[0], tuple)
+
+    def _load_or_compile(self) -> tuple[np.ndarray, int, bool]:
+        """read the table from the cache, or compile and save it"""
+        digest: str | None = source_hash(self.function)
+        if self.cache_dir is None or digest is None:
+            return self._compile()
+        path: pathlib.Path = self.cache_dir / \
+            f'{self.function.__name__}-{digest[:16]}.npz'
+        if path.exists():
+            with np.load(path) as cached:
+                return (cached['table'], int(cached['n_outputs']),
+                        bool(cached['scalar_output']))
+        table, n_outputs, scalar_output = self._compile()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial
+        # table
+        with tempfile.NamedTemporaryFile(
+                dir=path.parent, suffix='.npz', delete=False) as tmp:
+            np.savez(tmp, table=table, n_outputs=n_outputs,
+                     scalar_output=scalar_output)
+        os.replace(tmp.name, path)
+        return table, n_outputs, scalar_output
+
+    def _unpack(self,
+                entries: np.ndarray | np.integer
+                ) -> typing.Any:
+        """split packed entries into the outputs of the function"""
+        outputs: tuple = tuple(
+            (entries >> j_out) & 1 for j_out in range(self.n_outputs))
+        return outputs[0] if self.scalar_output else outputs
+
+    def index(self, *inputs: np.ndarray) -> np.ndarray:
+        """table index of the inputs, the first input is the MSB"""
+        index: np.ndarray = np.zeros(np.shape(inputs[0]), dtype=np.intp)
+        for bits in inputs:
+            index = (index << 1) | (np.asarray(bits, dtype=np.intp) & 1)
+        return index
+
+    def __call__(self, *bits: int) -> int | tuple[int, ...]:
+        """same call and result as the original function"""
+        return self._unpack(int(self.table[self.index(*bits)]))
+
+    def lookup(self, inputs: np.ndarray) -> np.ndarray | tuple:
+        """
+        Answer an (N, n_inputs) array of inputs with one gather; returns
+        one uint8 array per output (a single array for scalar functions)
+        """
+        inputs = np.asarray(inputs)
+        entries: np.ndarray = self.table[self.index(*inputs.T)]
+        outputs = self._unpack(entries)
+        if self.scalar_output:
+            return outputs.astype(np.uint8)
+        return tuple(out.astype(np.uint8) for out in outputs)
+
+
+def lookup_table(function: typing.Callable | None = None,
+                 *,
+                 cache_dir: pathlib.Path | None = DEFAULT_CACHE_DIR
+                 ) -> LookupTable | typing.Callable[..., LookupTable]:
+    """
+    Decorator compiling a boolean function into a `LookupTable`; use
+    `@lookup_table(cache_dir=path)` to keep the tables on disk
+    """
+    if function is None:
+        return functools.partial(lookup_table, cache_dir=cache_dir)
+    return LookupTable(function, cache_dir)
@@ -0,0 +1,223 @@
+"""
+Cycle-accurate simulation of many flip-flops and counters at once.
+
+The notebooks (flip_flop_counter, sr_flip_flop, jk_flip_flop,
+smart_light_controller_v1, smart_room_controller) keep the state of one
+instance in Python attributes and advance it one `clock_pulse()` /
+`update()` at a time. Here the state of N independent instances is held
+bit-sliced, as in src/logic_gates.py: each state bit is a uint64 array
+where bit k of word w belongs to instance 64 * w + k. One clock cycle
+of every instance is then a handful of bitwise NumPy operations:
+    sim = ripple_counter(n_instances=10**6, bits=2)
+    trace = sim.run(cycles=10**4)        # (cycles, bits, n_words)
+    sim.states(trace)[:, :, 0]           # unpacked, instance 0
+
+Inputs are whole waveforms:
+    - (cycles, n_inputs): the same inputs for every instance,
+    - (cycles, n_inputs, N): one waveform per instance.
+
+A full trace stores cycles * n_state * N / 8 bytes; pass record=False
+to keep only the final state.
+"""
+
+import pathlib
+import sys
+import typing
+
+import numpy as np
+
+# Make the sibling modules importable when run as a script
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from src.logic_gates import (  # pylint: disable=wrong-import-position
+    WORD_BITS, Words, pack_bits)
+
+
+# Next-state logic: (state bits, input bits) -> new state bits
+NextState = typing.Callable[[list[Words], list[Words]], list[Words]]
+
+ALL_ONES: np.uint64 = np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+
+
+def toggle(state: list[Words],
+           inputs: list[Words]
+           ) -> list[Words]:
+    """1-bit synchronous counter: Q ^= 1 on every clock pulse"""
+    del inputs
+    return [~state[0]]
+
+
+def ripple_carry(state: list[Words],
+                 inputs: list[Words]
+                 ) -> list[Words]:
+    """
+    Ripple counter, state[0] is the least significant bit: a bit
+    toggles if the carry reaches it and passes the carry on when it
+    goes from 1 to 0
+    """
+    del inputs
+    carry: Words | np.uint64 = ALL_ONES
+    new_state: list[Words] = []
+    for bit in state:
+        new_state.append(bit ^ carry)
+        carry = carry & bit
+    return new_state
+
+
+def sr_clocked(state: list[Words],
+               inputs: list[Words]
+               ) -> list[Words]:
+    """
+    Clocked SR flip-flop, inputs (S, R, CLK): set or reset only when
+    CLK = 1; S = R = 1 with CLK = 1 is invalid
+    """
+    set_s, reset_r, clk = inputs
+    if np.any(set_s & reset_r & clk):
+        raise ValueError("Invalid state: S = 1 and R = 1 at the same time!")
+    return [(state[0] & ~(clk & reset_r)) | (clk & set_s)]
+
+
+def jk(state: list[Words],
+       inputs: list[Words]
+       ) -> list[Words]:
+    """JK flip-flop, inputs (J, K): set, reset, toggle (J = K = 1) or hold"""
+    set_j, reset_k = inputs
+    return [(set_j & ~state[0]) | (~reset_k & state[0])]
+
+
+def sr_priority_set(state: list[Words],
+                    inputs: list[Words]
+                    ) -> list[Words]:
+    """SmartLightSR, inputs (presence, button): presence wins over reset"""
+    presence, button = inputs
+    return [presence | (~button & state[0])]
+
+
+def t_flip_flop(state: list[Words],
+                inputs: list[Words]
+                ) -> list[Words]:
+    """SmartLightT, input (button): toggle when the button is pressed"""
+    return [state[0] ^ inputs[0]]
+
+
+class SequentialSimulator:
+    """N independent instances of a sequential circuit, bit-sliced"""
+    next_state: NextState
+    n_instances: int
+    n_inputs: int
+    state: list[Words]
+
+    def __init__(self,
+                 next_state: NextState,
+                 n_instances: int,
+                 n_state: int,
+                 n_inputs: int = 0,
+                 initial: int | np.ndarray = 0
+                 ) -> None:
+        """
+        initial: one integer for every instance (state[0] is bit 0), or
+        an (n_state, N) array of 0/1
+        """
+        self.next_state = next_state
+        self.n_instances = n_instances
+        self.n_inputs = n_inputs
+        if np.isscalar(initial):
+            initial = np.array(
+                [np.full(n_instances, (int(initial) >> i_bit) & 1)
+                 for i_bit in range(n_state)])
+        self.state = [pack_bits(bits) for bits in np.asarray(initial)]
+
+    @property
+    def n_words(self) -> int:
+        """words per state bit"""
+        return -(-self.n_instances // WORD_BITS)
+
+    def _cycle_inputs(self,
+                      waveforms: np.ndarray,
+                      cycle: int
+                      ) -> list[Words]:
+        """bit-sliced inputs of one cycle"""
+        if waveforms.ndim == 2:
+            return [ALL_ONES if bit else np.uint64(0)
+                    for bit in waveforms[cycle]]
+        return [pack_bits(bits) for bits in waveforms[cycle]]
+
+    def step(self, inputs: list[Words]) -> list[Words]:
+        """advance every instance by one clock cycle"""
+        self.state = self.next_state(self.state, inputs)
+        return self.state
+
+    def run(self,
+            waveforms: np.ndarray | None = None,
+            cycles: int | None = None,
+            record: bool = True
+            ) -> np.ndarray:
+        """
+        Clock all the instances through the waveforms (or `cycles`
+        cycles for circuits without inputs). Returns the packed state
+        after every cycle, shape (cycles, n_state, n_words), or only the
+        final state, shape (n_state, n_words), if record is False.
+        """
+        if waveforms is None:
+            waveforms = np.zeros((cycles or 0, 0), dtype=np.uint8)
+        waveforms = np.asarray(waveforms)
+        if waveforms.shape[1] != self.n_inputs:
+            raise ValueError(f"expected {self.n_inputs} inputs per cycle, "
+                             f"got {waveforms.shape[1]}")
+        n_cycles: int = waveforms.shape[0]
+        trace: np.ndarray | None = np.empty(
+            (n_cycles, len(self.state), self.n_words), dtype='<u8') \
+            if record else None
+        for cycle in range(n_cycles):
+            state: list[Words] = self.step(
+                self._cycle_inputs(waveforms, cycle))
+            if trace is not None:
+                trace[cycle] = state
+        return trace if trace is not None else np.stack(self.state)
+
+    def states(self, packed: np.ndarray) -> np.ndarray:
+        """unpack a trace (or a final state) to 0/1 per instance"""
+        return np.unpackbits(
+            np.ascontiguousarray(packed, dtype='<u8').view(np.uint8),
+            axis=-1, count=self.n_instances, bitorder='little')
+
+    def values(self, packed: np.ndarray) -> np.ndarray:
+        """state bits of a trace read as integers, state[0] is bit 0"""
+        bits: np.ndarray = self.states(packed).astype(np.int64)
+        weights: np.ndarray = 1 << np.arange(bits.shape[-2])
+        return np.einsum('...bn,b->...n', bits, weights)
+
+
+def counter_1bit(n_instances: int) -> SequentialSimulator:
+    """SynchronousCounter1Bit, Q starts at 0"""
+    return SequentialSimulator(toggle, n_instances, n_state=1)
+
+
+def ripple_counter(n_instances: int,
+                   bits: int = 2
+                   ) -> SequentialSimulator:
+    """RippleCounter with `bits` bits, starting at 0"""
+    return SequentialSimulator(ripple_carry, n_instances, n_state=bits)
+
+
+def sr_flip_flop_clocked(n_instances: int) -> SequentialSimulator:
+    """SRFlipFlopClocked, inputs (S, R, CLK), light starts off"""
+    return SequentialSimulator(sr_clocked, n_instances, 1, n_inputs=3)
+
+
+def jk_flip_flop(n_instances: int) -> SequentialSimulator:
+    """JKFlipFlop, inputs (J, K), light starts off"""
+    return SequentialSimulator(jk, n_instances, 1, n_inputs=2)
+
+
+def smart_light_sr(n_instances: int) -> SequentialSimulator:
+    """SmartLightSR, inputs (presence, button), light starts off"""
+    return SequentialSimulator(sr_priority_set, n_instances, 1, n_inputs=2)
+
+
+def smart_light_t(n_instances: int) -> SequentialSimulator:
+    """SmartLightT, input (button), light starts on"""
+    return SequentialSimulator(t_flip_flop, n_instances, 1, n_inputs=1,
+                               initial=1)
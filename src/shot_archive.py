@@ -0,0 +1,232 @@
+"""
+Bit-packed, memory-mapped archive of measurement results.
+
+`cirq.Result.measurements` holds one int8 per measured bit, so 10^8
+shots of the four CHSH bits take 400 MB in memory. A `ShotArchive`
+keeps each measured bit as its own column of `np.packbits` bytes in a
+memory-mapped file, 8 shots per byte, so the same run is 50 MB on disk
+and only the pages that are touched come into RAM.
+
+File layout:
+    magic   b'SHOTARC1'
+    count   uint64, shots written so far (updated on every append)
+    length  uint64, size of the JSON header
+    header  JSON: keys and their qubits, capacity, seed, circuit hash
+    columns (n_columns, capacity / 8) uint8, column-major, 64-byte aligned
+The capacity is fixed when the archive is created. Chunks are appended
+as they are simulated, at any bit offset, and `column()` returns a
+zero-copy view of the packed bytes, so whole-run statistics can be
+computed with bitwise operations without unpacking anything
+(`np.bitwise_count` needs NumPy >= 2):
+    with ShotArchive.for_circuit(path, circuit, capacity=10**8) as archive:
+        for chunk in ...:
+            archive.append(result.measurements)
+    archive = ShotArchive.open(path)
+    ones = np.bitwise_count(archive.column('a')).sum()
+"""
+# pylint: disable=import-error
+
+import hashlib
+import json
+import os
+import typing
+
+import numpy as np
+
+import cirq
+
+from src.instrumentation import instrumented
+
+
+MAGIC: bytes = b'SHOTARC1'
+
+# Magic, shot count and header length
+_PREAMBLE: int = len(MAGIC) + 16
+
+# Alignment of the start of the packed columns
+_ALIGNMENT: int = 64
+
+
+def circuit_hash(circuit: cirq.AbstractCircuit) -> str:
+    """sha256 of the cirq JSON of the circuit"""
+    return hashlib.sha256(cirq.to_json(circuit).encode()).hexdigest()
+
+
+def measured_qubits(circuit: cirq.AbstractCircuit
+                    ) -> dict[str, list[str]]:
+    """qubits of every measurement key, in measurement order"""
+    return {cirq.measurement_key_name(op): [str(qubit) for qubit in op.qubits]
+            for op in circuit.all_operations() if cirq.is_measurement(op)}
+
+
+class ShotArchive:
+    """measurement keys stored as bit-packed, memory-mapped columns"""
+    path: str
+    qubits: dict[str, list[str]]
+    capacity: int
+    seed: int | None
+    circuit_hash: str | None
+    _offsets: dict[str, int]
+    _count: np.memmap
+    _columns: np.memmap
+
+    def __init__(self,
+                 path: str | os.PathLike,
+                 header: dict[str, typing.Any],
+                 data_offset: int,
+                 mode: str
+                 ) -> None:
+        """use `create`, `for_circuit` or `open`"""
+        self.path = os.fspath(path)
+        self.qubits = header['qubits']
+        self.capacity = header['capacity']
+        self.seed = header['seed']
+        self.circuit_hash = header['circuit_hash']
+
+        # First column of every key
+        self._offsets = {}
+        n_columns: int = 0
+        for key, qubits in self.qubits.items():
+            self._offsets[key] = n_columns
+            n_columns += len(qubits)
+        self._count = np.memmap(self.path, dtype=np.uint64, mode=mode,
+                                offset=len(MAGIC), shape=(1,))
+        self._columns = np.memmap(
+            self.path, dtype=np.uint8, mode=mode, offset=data_offset,
+            shape=(n_columns, -(-self.capacity // 8)))
+
+    @classmethod
+    def create(cls,
+               path: str | os.PathLike,
+               qubits: dict[str, typing.Sequence[typing.Any]],
+               capacity: int,
+               seed: int | None = None,
+               circuit: cirq.AbstractCircuit | None = None
+               ) -> 'ShotArchive':
+        """
+        Create an empty archive for `capacity` shots; `qubits` gives the
+        measured qubits (or just their names) of every key, in order
+        """
+        header: dict[str, typing.Any] = {
+            'version': 1,
+            'qubits': {key: [str(qubit) for qubit in key_qubits]
+                       for key, key_qubits in qubits.items()},
+            'capacity': int(capacity),
+            'seed': seed,
+            'circuit_hash': None if circuit is None else circuit_hash(circuit),
+        }
+        encoded: bytes = json.dumps(header).encode()
+        data_offset: int = -(-(_PREAMBLE + len(encoded)) // _ALIGNMENT) \
+            * _ALIGNMENT
+        n_columns: int = sum(len(key_qubits) for key_qubits in qubits.values())
+        with open(path, 'wb') as handle:
+            handle.write(MAGIC)
+            handle.write(np.array([0, len(encoded)], dtype=np.uint64)
+                         .tobytes())
+            handle.write(encoded)
+            # Sparse on most file systems until the columns are written
+            handle.truncate(data_offset + n_columns * -(-capacity // 8))
+        return cls(path, header, data_offset, 'r+')
+
+    @classmethod
+    def for_circuit(cls,
+                    path: str | os.PathLike,
+                    circuit: cirq.AbstractCircuit,
+                    capacity: int,
+                    seed: int | None = None
+                    ) -> 'ShotArchive':
+        """archive for the measurement keys of `circuit`"""
+        return cls.create(path, measured_qubits(circuit), capacity, seed,
+                          circuit)
+
+    @classmethod
+    def open(cls,
+             path: str | os.PathLike,
+             mode: str = 'r'
+             ) -> 'ShotArchive':
+        """open an existing archive, read-only unless mode='r+'"""
+        with open(path, 'rb') as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a shot archive")
+            _, length = np.frombuffer(handle.read(16), dtype=np.uint64)
+            header: dict[str, typing.Any] = json.loads(
+                handle.read(int(length)))
+        data_offset: int = -(-(_PREAMBLE + int(length)) // _ALIGNMENT) \
+            * _ALIGNMENT
+        return cls(path, header, data_offset, mode)
+
+    @property
+    def count(self) -> int:
+        """shots written so far"""
+        return int(self._count[0])
+
+    @property
+    def keys(self) -> list[str]:
+        """measurement keys, in column order"""
+        return list(self.qubits)
+
+    @instrumented(stage='post-process')
+    def append(self, measurements: dict[str, np.ndarray]) -> None:
+        """append a chunk of `Result.measurements` (every key)"""
+        bits: np.ndarray = np.concatenate(
+            [np.asarray(measurements[key], dtype=np.uint8).T
+             for key in self.qubits]) & 1
+        start: int = self.count
+        stop: int = start + bits.shape[1]
+        if stop > self.capacity:
+            raise ValueError(f"{stop} shots exceed the capacity "
+                             f"{self.capacity} of {self.path}")
+
+        # Re-pack the bits already in the partly filled first byte
+        first_byte: int = start // 8
+        if start % 8:
+            written: np.ndarray = np.unpackbits(
+                self._columns[:, first_byte:first_byte + 1], axis=1)
+            bits = np.concatenate([written[:, :start % 8], bits], axis=1)
+        packed: np.ndarray = np.packbits(bits, axis=1)
+        self._columns[:, first_byte:first_byte + packed.shape[1]] = packed
+        self._count[0] = stop
+
+    def column(self, key: str, bit: int = 0) -> np.ndarray:
+        """
+        Zero-copy view of the packed bytes of one measured bit; the bits
+        past `count` in the last byte are zeros
+        """
+        return self._columns[self._offsets[key] + bit, :-(-self.count // 8)]
+
+    def read(self,
+             start: int = 0,
+             stop: int | None = None
+             ) -> dict[str, np.ndarray]:
+        """shots [start, stop) unpacked, as `Result.measurements`"""
+        stop = self.count if stop is None else min(stop, self.count)
+        first_byte: int = start // 8
+        bits: np.ndarray = np.unpackbits(
+            self._columns[:, first_byte:-(-stop // 8)], axis=1)
+        bits = bits[:, start - 8 * first_byte:stop - 8 * first_byte]
+        return {key: bits[offset:offset + len(self.qubits[key])].T
+                .astype(np.int8)
+                for key, offset in self._offsets.items()}
+
+    def chunks(self,
+               chunk_size: int = 1_000_000
+               ) -> typing.Iterator[dict[str, np.ndarray]]:
+        """the shots unpacked `chunk_size` at a time, in bounded memory"""
+        for start in range(0, self.count, chunk_size):
+            yield self.read(start, start + chunk_size)
+
+    def flush(self) -> None:
+        """write the mapped pages back to the file"""
+        self._columns.flush()
+        self._count.flush()
+
+    def close(self) -> None:
+        """flush and unmap the file"""
+        self.flush()
+        del self._columns, self._count
+
+    def __enter__(self) -> 'ShotArchive':
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.close()
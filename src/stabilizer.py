@@ -0,0 +1,205 @@
+"""
+Stabilizer (Clifford tableau) sampling for all-Clifford circuits.
+
+The Bell preparations, the superdense coding circuit, the DJ oracles and
+the X / H gates of cirq_basic.py only use Clifford gates (H, S, CNOT,
+CZ, Paulis). Their states are stabilizer states, which a tableau holds
+in O(n^2) bits instead of 2^n amplitudes, so 100+ qubit GHZ states and
+Bell chains can be simulated.
+
+Sampling:
+    cirq's `CliffordSimulator` measures a fresh copy of the state for
+    every repetition. But the Z-basis outcomes of a stabilizer state are
+    uniform over an affine subspace of GF(2)^n,
+        x = x_0 + r B  (mod 2),  r uniform in GF(2)^k
+    where the rows of B span the X parts of the stabilizer generators.
+    Eliminating those X parts (with the phase rule of Aaronson and
+    Gottesman) leaves the Z-type stabilizers (-1)^s Z^z, the parity
+    constraints z . x = s that give x_0. `TableauSampler` evolves the
+    tableau once, solves for (x_0, B) with vectorized GF(2) elimination
+    and draws all the repetitions with one matrix product.
+    Circuits with mid-circuit measurements or other non-unitary ops
+    (resets, ...) go to `CliffordSimulator`, since one evolution would
+    fix their random outcomes for every repetition.
+"""
+# pylint: disable=import-error
+
+import typing
+
+import numpy as np
+
+import cirq
+
+from src.instrumentation import span
+
+
+def is_clifford(circuit: cirq.AbstractCircuit) -> bool:
+    """True if every operation (measurements too) is a stabilizer op"""
+    return not cirq.is_parameterized(circuit) and all(
+        cirq.has_stabilizer_effect(op) for op in circuit.all_operations())
+
+
+def _is_unitary_then_measured(circuit: cirq.AbstractCircuit) -> bool:
+    """True if every op is unitary or a terminal measurement"""
+    return circuit.are_all_measurements_terminal() and all(
+        cirq.is_measurement(op) or cirq.has_unitary(op)
+        for op in circuit.all_operations())
+
+
+def gf2_row_basis(matrix: np.ndarray) -> np.ndarray:
+    """linearly independent rows spanning the rows of a 0/1 matrix"""
+    rows: np.ndarray = np.array(matrix, dtype=np.uint8) & 1
+    rank: int = 0
+    for column in range(rows.shape[1]):
+        pivots: np.ndarray = np.flatnonzero(rows[rank:, column]) + rank
+        if not len(pivots):
+            continue
+        rows[[rank, pivots[0]]] = rows[[pivots[0], rank]]
+        others: np.ndarray = np.flatnonzero(rows[:, column])
+        others = others[others != rank]
+        rows[others] ^= rows[rank]
+        rank += 1
+        if rank == len(rows):
+            break
+    return rows[:rank]
+
+
+def _rowsum(targets: np.ndarray,
+            pivot: np.ndarray
+            ) -> np.ndarray:
+    """
+    Multiply the stabilizer rows `targets` (m, 2n + 1) by the row
+    `pivot` (x bits, z bits, sign bit) with the Aaronson-Gottesman phase
+    rule; Y is the (x, z) = (1, 1) entry
+    """
+    n_qubits: int = (len(pivot) - 1) // 2
+    x_1, z_1 = pivot[:n_qubits].astype(np.int64), \
+        pivot[n_qubits:-1].astype(np.int64)
+    x_2, z_2 = targets[:, :n_qubits].astype(np.int64), \
+        targets[:, n_qubits:-1].astype(np.int64)
+    # Exponent of i picked up on every qubit
+    g_sum: np.ndarray = np.sum(
+        x_1 * z_1 * (z_2 - x_2)
+        + x_1 * (1 - z_1) * z_2 * (2 * x_2 - 1)
+        + (1 - x_1) * z_1 * x_2 * (1 - 2 * z_2), axis=1)
+    total: np.ndarray = 2 * targets[:, -1] + 2 * pivot[-1] + g_sum
+    product: np.ndarray = targets ^ pivot
+    product[:, -1] = (total % 4) // 2
+    return product
+
+
+def _solve_gf2(matrix: np.ndarray,
+               rhs: np.ndarray
+               ) -> np.ndarray:
+    """one solution x of matrix @ x = rhs (mod 2), free bits set to 0"""
+    system: np.ndarray = np.column_stack([matrix, rhs]).astype(np.uint8)
+    n_columns: int = matrix.shape[1]
+    pivots: list[int] = []
+    rank: int = 0
+    for column in range(n_columns):
+        rows: np.ndarray = np.flatnonzero(system[rank:, column]) + rank
+        if not len(rows):
+            continue
+        system[[rank, rows[0]]] = system[[rows[0], rank]]
+        others: np.ndarray = np.flatnonzero(system[:, column])
+        system[others[others != rank]] ^= system[rank]
+        pivots.append(column)
+        rank += 1
+    if np.any(system[rank:, -1]):
+        raise ValueError("inconsistent stabilizer constraints")
+    solution: np.ndarray = np.zeros(n_columns, dtype=np.uint8)
+    solution[pivots] = system[:rank, -1]
+    return solution
+
+
+def stabilizer_support(tableau: cirq.CliffordTableau
+                       ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (x_0, B) such that the Z-basis outcomes of the state are exactly
+    x_0 + r B (mod 2): eliminating the X parts of the stabilizers
+    leaves Z-type stabilizers (-1)^s Z^z, i.e. parities z . x = s
+    """
+    n_qubits: int = tableau.n
+    rows: np.ndarray = np.column_stack([
+        tableau.xs[n_qubits:], tableau.zs[n_qubits:],
+        tableau.rs[n_qubits:]]).astype(np.uint8)
+    free: np.ndarray = np.ones(n_qubits, dtype=bool)
+    for column in range(n_qubits):
+        candidates: np.ndarray = np.flatnonzero(free & (rows[:, column] == 1))
+        if not len(candidates):
+            continue
+        pivot: int = candidates[0]
+        free[pivot] = False
+        targets: np.ndarray = np.flatnonzero(rows[:, column])
+        targets = targets[targets != pivot]
+        if len(targets):
+            rows[targets] = _rowsum(rows[targets], rows[pivot])
+    z_type: np.ndarray = rows[free]
+    offset: np.ndarray = _solve_gf2(z_type[:, n_qubits:-1], z_type[:, -1])
+    return offset, gf2_row_basis(rows[~free, :n_qubits])
+
+
+class TableauSampler(cirq.Sampler):
+    """cirq sampler for Clifford circuits with terminal measurements"""
+    _rng: np.random.Generator
+
+    def __init__(self, seed: int | None = None) -> None:
+        self._rng = np.random.default_rng(seed)
+
+    def run_sweep(self,
+                  program: cirq.AbstractCircuit,
+                  params: cirq.Sweepable,
+                  repetitions: int = 1
+                  ) -> typing.Sequence[cirq.Result]:
+        """sample every resolved circuit of the sweep"""
+        return [self._run(cirq.resolve_parameters(program, resolver),
+                          resolver, repetitions)
+                for resolver in cirq.to_resolvers(params)]
+
+    def _run(self,
+             circuit: cirq.AbstractCircuit,
+             resolver: cirq.ParamResolver,
+             repetitions: int
+             ) -> cirq.Result:
+        """one tableau evolution, then all the repetitions at once"""
+        if not is_clifford(circuit):
+            raise ValueError("TableauSampler needs an all-Clifford circuit")
+        seed: int = int(self._rng.integers(2**32))
+        if not _is_unitary_then_measured(circuit):
+            return cirq.CliffordSimulator(seed=seed).run(
+                circuit, resolver, repetitions)
+
+        qubits: list[cirq.Qid] = sorted(circuit.all_qubits())
+        n_qubits: int = len(qubits)
+        state = cirq.CliffordTableauSimulationState(
+            tableau=cirq.CliffordTableau(n_qubits), qubits=qubits,
+            prng=np.random.RandomState(seed))
+        measurements: list[cirq.Operation] = []
+        with span('stabilizer.evolve', stage='simulate', qubits=n_qubits):
+            for op in circuit.all_operations():
+                if cirq.is_measurement(op):
+                    measurements.append(op)
+                else:
+                    cirq.act_on(op, state)
+
+        # Every repetition is x_0 + r B for uniform random bits r
+        with span('stabilizer.sample', stage='sample', shots=repetitions):
+            offset, basis = stabilizer_support(state.tableau)
+            coins: np.ndarray = self._rng.integers(
+                0, 2, (repetitions, len(basis)), dtype=np.uint8)
+            # uint8 sums wrap modulo 256, which keeps their parity
+            samples: np.ndarray = offset ^ ((coins @ basis) & 1)
+
+        index: dict[cirq.Qid, int] = {
+            qubit: i for i, qubit in enumerate(qubits)}
+        records: dict[str, np.ndarray] = {}
+        for op in measurements:
+            gate: cirq.MeasurementGate = typing.cast(
+                cirq.MeasurementGate, op.gate)
+            bits: np.ndarray = samples[:, [index[q] for q in op.qubits]]
+            if gate.invert_mask:
+                mask: np.ndarray = np.zeros(len(op.qubits), dtype=np.uint8)
+                mask[:len(gate.invert_mask)] = gate.invert_mask
+                bits = bits ^ mask
+            records[gate.key] = bits.astype(np.int8)
+        return cirq.ResultDict(params=resolver, measurements=records)
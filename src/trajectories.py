@@ -0,0 +1,179 @@
+"""
+Batched quantum trajectories for noisy cirq circuits.
+
+`cirq.Simulator.run` on a circuit with channels (depolarize,
+amplitude_damp, bit_flip, ...) re-simulates the whole circuit for every
+repetition, one trajectory at a time. `sample_trajectories` keeps all
+the trajectories of a shard in one (repetitions, 2, ..., 2) array:
+    unitary ops:   one tensordot over the whole batch
+    channels:      every Kraus branch K_k is applied to the batch, and
+                   each trajectory picks k with probability |K_k psi|^2
+    measurements:  each trajectory samples an outcome and collapses
+so a shard costs a few NumPy calls per operation, whatever its size.
+Its signature matches the `runner` of `src.utils.map_shards`, which
+spreads the shards over a process pool.
+
+`NoiseModel` adds depolarizing, amplitude-damping and readout noise to a
+circuit, and `density_matrix_probabilities` gives the exact outcome
+probabilities of small noisy circuits to compare with.
+"""
+# pylint: disable=import-error
+
+import typing
+
+import numpy as np
+
+import cirq
+
+from src.instrumentation import annotate, instrumented
+
+
+class NoiseModel(typing.NamedTuple):
+    """noise after every gate moment, and bit flips before measurements"""
+    depolarizing: float = 0.0
+    amplitude_damping: float = 0.0
+    readout: float = 0.0
+
+    def apply(self, circuit: cirq.AbstractCircuit) -> cirq.Circuit:
+        """the circuit with the channels of the model inserted"""
+        qubits: list[cirq.Qid] = sorted(circuit.all_qubits())
+        noisy = cirq.Circuit()
+        for moment in circuit:
+            # A moment can hold gates and measurements side by side
+            gates: list[cirq.Operation] = [
+                op for op in moment if not cirq.is_measurement(op)]
+            measurements: list[cirq.Operation] = [
+                op for op in moment if cirq.is_measurement(op)]
+            if gates:
+                noisy.append(cirq.Moment(gates))
+                # Every qubit decoheres during every gate moment, idle
+                # or not
+                if self.depolarizing:
+                    noisy.append(cirq.Moment(
+                        cirq.depolarize(self.depolarizing).on_each(*qubits)))
+                if self.amplitude_damping:
+                    noisy.append(cirq.Moment(
+                        cirq.amplitude_damp(self.amplitude_damping).on_each(
+                            *qubits)))
+            if measurements:
+                # Readout errors flip the measured bits
+                measured: list[cirq.Qid] = [
+                    qubit for op in measurements for qubit in op.qubits]
+                if self.readout:
+                    noisy.append(cirq.Moment(
+                        cirq.bit_flip(self.readout).on_each(*measured)))
+                noisy.append(cirq.Moment(measurements))
+        return noisy
+
+    def label(self) -> str:
+        """short description for tables"""
+        return (f"dep={self.depolarizing:g} damp={self.amplitude_damping:g}"
+                f" readout={self.readout:g}")
+
+
+def _apply(states: np.ndarray,
+           matrix: np.ndarray,
+           axes: list[int]
+           ) -> np.ndarray:
+    """apply a (2^k, 2^k) matrix to the qubit `axes` of every state"""
+    n_axes: int = len(axes)
+    tensor: np.ndarray = matrix.reshape((2,) * (2 * n_axes))
+    product: np.ndarray = np.tensordot(
+        tensor, states, axes=(list(range(n_axes, 2 * n_axes)), axes))
+    return np.moveaxis(product, list(range(n_axes)), axes)
+
+
+def _choose(weights: np.ndarray,
+            rng: np.random.Generator
+            ) -> np.ndarray:
+    """one index per column of the (m, B) weights, drawn proportionally"""
+    cumulative: np.ndarray = np.cumsum(weights, axis=0)
+    draws: np.ndarray = rng.random(weights.shape[1]) * cumulative[-1]
+    return np.minimum((draws > cumulative).sum(axis=0), len(weights) - 1)
+
+
+def _measure(states: np.ndarray,
+             axes: list[int],
+             rng: np.random.Generator
+             ) -> tuple[np.ndarray, np.ndarray]:
+    """sample and collapse the qubit `axes` of every trajectory; returns
+    the collapsed states and the outcomes as (B, k) bits"""
+    n_axes: int = len(axes)
+    rest: list[int] = [axis for axis in range(1, states.ndim)
+                       if axis not in axes]
+    order: list[int] = [0] + axes + rest
+    view: np.ndarray = states.transpose(order).reshape(
+        len(states), 2**n_axes, -1)
+    probabilities: np.ndarray = np.sum(np.abs(view)**2, axis=2)
+    outcomes: np.ndarray = _choose(probabilities.T, rng)
+
+    rows: np.ndarray = np.arange(len(states))
+    collapsed: np.ndarray = np.zeros_like(view)
+    collapsed[rows, outcomes] = view[rows, outcomes] / np.sqrt(
+        probabilities[rows, outcomes])[:, None]
+    collapsed = collapsed.reshape([len(states)] + [2] * (states.ndim - 1))
+    bits: np.ndarray = (outcomes[:, None] >> np.arange(n_axes)[::-1]) & 1
+    return collapsed.transpose(np.argsort(order)), bits
+
+
+@instrumented(stage='sample')
+def sample_trajectories(circuit: cirq.AbstractCircuit,
+                        repetitions: int,
+                        seed: int | None = None
+                        ) -> dict[str, np.ndarray]:
+    """
+    `repetitions` trajectories of `circuit` at once; returns the
+    measurements as `Result.measurements` would, (repetitions, k) per key
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    qubits: list[cirq.Qid] = sorted(circuit.all_qubits())
+    index: dict[cirq.Qid, int] = {
+        qubit: axis + 1 for axis, qubit in enumerate(qubits)}
+    states: np.ndarray = np.zeros(
+        (repetitions,) + (2,) * len(qubits), dtype=np.complex128)
+    states[(slice(None),) + (0,) * len(qubits)] = 1
+    annotate(trajectories=repetitions, state_bytes=states.nbytes)
+
+    records: dict[str, np.ndarray] = {}
+    for op in circuit.all_operations():
+        axes: list[int] = [index[qubit] for qubit in op.qubits]
+        if cirq.is_measurement(op):
+            gate: cirq.MeasurementGate = typing.cast(
+                cirq.MeasurementGate, op.gate)
+            states, bits = _measure(states, axes, rng)
+            if gate.invert_mask:
+                mask: np.ndarray = np.zeros(len(axes), dtype=bits.dtype)
+                mask[:len(gate.invert_mask)] = gate.invert_mask
+                bits = bits ^ mask
+            records[gate.key] = bits.astype(np.int8)
+        elif cirq.has_unitary(op):
+            states = _apply(states, cirq.unitary(op), axes)
+        else:
+            # Every Kraus branch, then one branch per trajectory
+            branches: np.ndarray = np.stack([
+                _apply(states, kraus, axes) for kraus in cirq.kraus(op)])
+            weights: np.ndarray = np.sum(
+                np.abs(branches.reshape(len(branches), repetitions, -1))**2,
+                axis=2)
+            chosen: np.ndarray = _choose(weights, rng)
+            rows: np.ndarray = np.arange(repetitions)
+            norms: np.ndarray = np.sqrt(weights[chosen, rows])
+            states = branches[chosen, rows] / norms.reshape(
+                (-1,) + (1,) * len(qubits))
+    return records
+
+
+@instrumented(stage='simulate')
+def density_matrix_probabilities(circuit: cirq.AbstractCircuit,
+                                 qubit_order: typing.Sequence[cirq.Qid]
+                                 ) -> np.ndarray:
+    """
+    exact outcome probabilities of a noisy circuit with terminal
+    measurements, big-endian in `qubit_order`
+    """
+    unmeasured = cirq.Circuit(
+        op for op in circuit.all_operations() if not cirq.is_measurement(op))
+    rho: np.ndarray = cirq.DensityMatrixSimulator(
+        dtype=np.complex128).simulate(
+            unmeasured, qubit_order=qubit_order).final_density_matrix
+    return np.clip(np.real(np.diag(rho)), 0, None)
@@ -0,0 +1,248 @@
+"""
+Shared helpers for the cirq scripts.
+
+Simulator provider:
+    The scripts ask `get_simulator()` for a simulator instead of building
+    their own `cirq.Simulator()`. Simulators are created once per
+    (dtype, seed) and reused, so the setup cost is paid once per process
+    and one global precision and seed policy applies to every run:
+        set_simulator_policy(dtype=np.complex128, seed=1234)
+        sim = get_simulator()  # same instance on every call
+
+Sharded runs:
+    `run_sharded()` splits a repetition count into fixed-size shards, each
+    with its own seed spawned from one global seed, and runs them on a
+    process pool. The shards only depend on (seed, shard_size), so the
+    merged measurements are identical whatever the number of workers.
+    A `runner(circuit, repetitions, seed)` replaces the simulator of the
+    shards, e.g. the batched noisy trajectories of src/trajectories.py.
+    `iter_shards()` yields the shards in order as they finish, with a
+    few in flight, so a consumer that appends or merges them holds only
+    those few in memory.
+
+Clifford fast path:
+    `get_sampler(circuit)` hands out a shared `TableauSampler` (see
+    src/stabilizer.py) when every operation of the circuit is Clifford,
+    and the dense simulator otherwise. Shards of Clifford circuits use
+    the tableau sampler too, so GHZ states and Bell chains of 100+
+    qubits run in polynomial time.
+"""
+# pylint: disable=import-error
+
+import collections
+import concurrent.futures
+import os
+import typing
+
+import numpy as np
+
+import cirq
+
+from src.instrumentation import annotate, instrumented, span
+from src.stabilizer import TableauSampler, is_clifford
+
+
+# Default precision and seed when the caller does not ask for one
+_POLICY: dict[str, "type | int | None"] = {
+    'dtype': np.complex64,
+    'seed': None,
+}
+
+# Default of `set_simulator_policy(seed=...)`: keep the current seed
+_KEEP: object = object()
+
+# Registry of the simulators handed out so far, keyed by (dtype, seed)
+_SIMULATORS: dict[tuple[type, int | None], cirq.Simulator] = {}
+
+# Registry of the tableau samplers for Clifford circuits, keyed by seed
+_SAMPLERS: dict[int | None, TableauSampler] = {}
+
+
+def set_simulator_policy(dtype: type | None = None,
+                         seed: int | None | object = _KEEP
+                         ) -> None:
+    """Set the global precision (complex64 or complex128) and seed
+    used by `get_simulator()` when they are not given explicitly.
+    Only the values passed change; seed=None clears the seed.
+    """
+    if dtype is not None:
+        if dtype not in (np.complex64, np.complex128):
+            raise ValueError(
+                f"dtype must be complex64 or complex128, not {dtype}")
+        _POLICY['dtype'] = dtype
+    if seed is not _KEEP:
+        _POLICY['seed'] = seed
+
+
+def get_simulator(dtype: type | None = None,
+                  seed: int | None = None
+                  ) -> cirq.Simulator:
+    """Return the shared simulator for (dtype, seed), creating it on
+    the first request. Missing values fall back to the global policy.
+    """
+    if dtype is None:
+        dtype = _POLICY['dtype']
+    if seed is None:
+        seed = _POLICY['seed']
+    key: tuple[type, int | None] = (dtype, seed)
+    if key not in _SIMULATORS:
+        with span('utils.get_simulator', stage='setup', dtype=str(dtype)):
+            _SIMULATORS[key] = cirq.Simulator(dtype=dtype, seed=seed)
+    return _SIMULATORS[key]
+
+
+def get_sampler(circuit: cirq.AbstractCircuit,
+                params: cirq.Sweepable = None,
+                dtype: type | None = None,
+                seed: int | None = None
+                ) -> cirq.Sampler:
+    """The shared `TableauSampler` when `circuit` (resolved by every
+    resolver of `params`) is all-Clifford, else `get_simulator()`.
+    """
+    if not all(is_clifford(cirq.resolve_parameters(circuit, resolver))
+               for resolver in cirq.to_resolvers(params)):
+        return get_simulator(dtype, seed)
+    if seed is None:
+        seed = _POLICY['seed']
+    if seed not in _SAMPLERS:
+        _SAMPLERS[seed] = TableauSampler(seed=seed)
+    return _SAMPLERS[seed]
+
+
+def clear_simulators() -> None:
+    """drop every shared simulator, e.g. to restart the seeded streams"""
+    _SIMULATORS.clear()
+    _SAMPLERS.clear()
+
+
+def shard_plan(repetitions: int,
+               shard_size: int,
+               seed: int | None = None
+               ) -> list[tuple[int, int]]:
+    """(repetitions, seed) of every shard, in order
+    The shard seeds are spawned from `seed` (or the policy seed), so the
+    plan does not depend on how the shards are spread over workers.
+    """
+    if seed is None:
+        seed = _POLICY['seed']
+    n_shards: int = -(-repetitions // shard_size)
+    children: list[np.random.SeedSequence] = \
+        np.random.SeedSequence(seed).spawn(n_shards)
+    return [(min(shard_size, repetitions - i_shard * shard_size),
+             int(child.generate_state(1)[0]))
+            for i_shard, child in enumerate(children)]
+
+
+# Sampling function of a shard: (circuit, repetitions, seed) -> measurements
+ShardRunner = typing.Callable[[cirq.Circuit, int, int],
+                              dict[str, np.ndarray]]
+
+
+def _run_shard(circuit: cirq.Circuit,
+               repetitions: int,
+               seed: int,
+               dtype: type,
+               reducer: typing.Callable[[dict[str, np.ndarray]], typing.Any]
+               | None,
+               runner: ShardRunner | None = None
+               ) -> typing.Any:
+    """run one shard with its own seeded simulator (tableau if Clifford)"""
+    measurements: dict[str, np.ndarray]
+    if runner is not None:
+        measurements = runner(circuit, repetitions, seed)
+    else:
+        sampler: cirq.Sampler = TableauSampler(seed=seed) \
+            if is_clifford(circuit) \
+            else cirq.Simulator(dtype=dtype, seed=seed)
+        measurements = sampler.run(
+            circuit, repetitions=repetitions).measurements
+    return measurements if reducer is None else reducer(measurements)
+
+
+def _pool_size(workers: int | None, n_shards: int) -> int:
+    """processes for `n_shards` shards, all the CPUs by default"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return min(workers, n_shards)
+
+
+def iter_shards(circuit: cirq.Circuit,
+                repetitions: int,
+                reducer: typing.Callable[[dict[str, np.ndarray]], typing.Any]
+                | None = None,
+                seed: int | None = None,
+                workers: int | None = None,
+                shard_size: int = 100_000,
+                runner: ShardRunner | None = None
+                ) -> typing.Iterator[typing.Any]:
+    """`map_shards` as a generator: the shards are yielded in order as
+    they finish, and at most 2 * workers of them are submitted ahead of
+    the consumer, so the parent never holds every shard at once.
+    """
+    plan: list[tuple[int, int]] = shard_plan(repetitions, shard_size, seed)
+    dtype: type = _POLICY['dtype']
+    workers = _pool_size(workers, len(plan))
+    if workers <= 1:
+        for reps, shard_seed in plan:
+            yield _run_shard(circuit, reps, shard_seed, dtype, reducer,
+                             runner)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: collections.deque[concurrent.futures.Future] = \
+            collections.deque()
+        for reps, shard_seed in plan:
+            pending.append(pool.submit(_run_shard, circuit, reps, shard_seed,
+                                       dtype, reducer, runner))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@instrumented(stage='sample')
+def map_shards(circuit: cirq.Circuit,
+               repetitions: int,
+               reducer: typing.Callable[[dict[str, np.ndarray]], typing.Any]
+               | None = None,
+               seed: int | None = None,
+               workers: int | None = None,
+               shard_size: int = 100_000,
+               runner: ShardRunner | None = None
+               ) -> list[typing.Any]:
+    """Run the shards of `circuit` on a process pool and return, in
+    shard order, the measurements of each shard or `reducer(measurements)`
+    when a reducer is given. Reducing in the workers (e.g. to counts)
+    avoids sending the raw measurement arrays back to the parent.
+    `reducer` (and `runner`) must be picklable, e.g. module-level
+    functions or `functools.partial` of them.
+    """
+    n_shards: int = -(-repetitions // shard_size)
+    annotate(shots=repetitions, shards=n_shards,
+             workers=_pool_size(workers, n_shards))
+    return list(iter_shards(circuit, repetitions, reducer, seed, workers,
+                            shard_size, runner))
+
+
+def merge_results(measurements: list[dict[str, np.ndarray]]
+                  ) -> cirq.ResultDict:
+    """concatenate per-shard measurements into one result"""
+    keys: list[str] = list(measurements[0]) if measurements else []
+    return cirq.ResultDict(
+        params=cirq.ParamResolver({}),
+        measurements={key: np.concatenate([shard[key]
+                                           for shard in measurements])
+                      for key in keys})
+
+
+def run_sharded(circuit: cirq.Circuit,
+                repetitions: int,
+                seed: int | None = None,
+                workers: int | None = None,
+                shard_size: int = 100_000
+                ) -> cirq.ResultDict:
+    """`Simulator.run` split over a process pool; the merged result (and
+    so its `histogram()`) is the same for any number of workers.
+    """
+    return merge_results(map_shards(
+        circuit, repetitions, seed=seed, workers=workers,
+        shard_size=shard_size))
@@ -0,0 +1,109 @@
+"""
+Scoring, exact win rate and seeded runs of the CHSH game
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq.bell_inequality import (BellGameScore,
+                                             exact_win_probability,
+                                             make_bell_test_circuit,
+                                             run_bell_game,
+                                             sweep_win_probability,
+                                             win_probability, wilson_interval)
+
+
+CIRCUIT = make_bell_test_circuit()
+
+
+def _assert_same_score(first: BellGameScore,
+                       second: BellGameScore
+                       ) -> None:
+    np.testing.assert_array_equal(first.wins, second.wins)
+    np.testing.assert_array_equal(first.trials, second.trials)
+
+
+def test_seeded_game_is_the_same_for_any_worker_count() -> None:
+    """one seed, one score, whether the shards run in-process or not"""
+    single: BellGameScore = run_bell_game(CIRCUIT, 20_000, chunk_size=5_000,
+                                          workers=1, seed=7)
+    _assert_same_score(single, run_bell_game(
+        CIRCUIT, 20_000, chunk_size=5_000, workers=1, seed=7))
+    _assert_same_score(single, run_bell_game(
+        CIRCUIT, 20_000, chunk_size=5_000, workers=2, seed=7))
+
+
+def test_batched_score_matches_the_per_shot_loop() -> None:
+    """the bincount score equals scoring the shots one at a time"""
+    measurements: dict[str, np.ndarray] = cirq.Simulator(seed=3).run(
+        CIRCUIT, repetitions=5_000).measurements
+    score: BellGameScore = BellGameScore().update(measurements)
+    wins: np.ndarray = np.zeros((2, 2), dtype=np.int64)
+    trials: np.ndarray = np.zeros((2, 2), dtype=np.int64)
+    for a_bit, b_bit, x_coin, y_coin in zip(
+            *(measurements[key][:, 0].tolist() for key in 'abxy')):
+        trials[x_coin, y_coin] += 1
+        wins[x_coin, y_coin] += (a_bit ^ b_bit) == (x_coin & y_coin)
+    np.testing.assert_array_equal(score.wins, wins)
+    np.testing.assert_array_equal(score.trials, trials)
+    # The win rate of the original script
+    outcomes = measurements['a'][:, 0] ^ measurements['b'][:, 0] \
+        == measurements['x'][:, 0] & measurements['y'][:, 0]
+    assert score.win_rate == len([e for e in outcomes if e]) / 5_000
+
+
+@pytest.mark.parametrize('trials', [1, 10, 1_000])
+def test_wilson_interval_edges(trials: int) -> None:
+    """0 and n wins give intervals inside [0, 1] touching the edge"""
+    low, high = wilson_interval(0, trials)
+    assert low == pytest.approx(0, abs=1e-12) and 0 < high < 1
+    low, high = wilson_interval(trials, trials)
+    assert 0 < low < 1 and high == pytest.approx(1, abs=1e-12)
+    low, high = wilson_interval(trials // 2, trials)
+    assert 0 <= low <= (trials // 2) / trials <= high <= 1
+    # No shots yet: a finite interval, not a division by zero
+    assert all(np.isfinite(wilson_interval(0, 0)))
+
+
+def test_chsh_win_probability_is_the_quantum_bound() -> None:
+    """the default circuit wins with cos^2(pi / 8), from every path"""
+    bound: float = np.cos(np.pi / 8)**2
+    assert exact_win_probability(CIRCUIT) == pytest.approx(bound, abs=1e-6)
+    assert sweep_win_probability([-0.25], [0.5])[0, 0] == pytest.approx(
+        bound, abs=1e-12)
+    # win_probability on a density-matrix simulation, keys in a, b, x, y
+    qubits: list[cirq.Qid] = [
+        op.qubits[0] for key in 'abxy' for op in CIRCUIT.all_operations()
+        if cirq.is_measurement(op) and cirq.measurement_key_name(op) == key]
+    rho: np.ndarray = cirq.DensityMatrixSimulator().simulate(
+        cirq.drop_terminal_measurements(CIRCUIT),
+        qubit_order=qubits).final_density_matrix
+    assert win_probability(np.diag(rho).real) == pytest.approx(bound,
+                                                               abs=1e-6)
+
+
+def test_sweep_matches_the_circuits() -> None:
+    """the vectorized grid equals exact_win_probability cell by cell"""
+    alice_exponents: np.ndarray = np.array([-0.5, -0.25, 0.0, 0.3])
+    cnot_exponents: np.ndarray = np.array([0.0, 0.5, 1.0])
+    grid: np.ndarray = sweep_win_probability(alice_exponents, cnot_exponents)
+    assert grid.shape == (4, 3)
+    for i_alice, alice in enumerate(alice_exponents):
+        for i_cnot, cnot in enumerate(cnot_exponents):
+            assert grid[i_alice, i_cnot] == pytest.approx(
+                exact_win_probability(make_bell_test_circuit(alice, cnot)),
+                abs=1e-6)
+    # No classical strategy beats 3/4
+    assert grid[:, 0].max() <= 0.75 + 1e-12
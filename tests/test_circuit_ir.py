@@ -0,0 +1,46 @@
+"""
+Measurements through the cirq <-> IR conversion
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.circuit_ir import from_cirq, to_cirq
+
+
+QUBITS: list[cirq.LineQubit] = cirq.LineQubit.range(2)
+
+
+def test_invert_mask_survives_the_round_trip() -> None:
+    """inverted bits read the same after cirq -> IR -> cirq"""
+    circuit = cirq.Circuit(
+        cirq.X(QUBITS[1]),
+        cirq.measure(*QUBITS, key='m', invert_mask=(True,)),
+        cirq.measure(QUBITS[0], key='n'))
+    expected = cirq.Simulator().run(circuit, repetitions=10)
+    converted = cirq.Simulator().run(to_cirq(from_cirq(circuit)),
+                                     repetitions=10)
+    for key in ('m', 'n'):
+        np.testing.assert_array_equal(converted.measurements[key],
+                                      expected.measurements[key])
+
+
+def test_confusion_map_is_rejected() -> None:
+    """the IR has no readout-error model"""
+    confusion: np.ndarray = np.array([[0.9, 0.1], [0.1, 0.9]])
+    circuit = cirq.Circuit(cirq.measure(
+        QUBITS[0], key='m', confusion_map={(0,): confusion}))
+    with pytest.raises(ValueError):
+        from_cirq(circuit)
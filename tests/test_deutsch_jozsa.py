@@ -0,0 +1,64 @@
+"""
+Batched phase-oracle Deutsch-Jozsa against cirq
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq.deutsch_jozsa_algorithm import (ORACLES, Q_0, Q_1,
+                                                     classify_oracles)
+from algorithms.cirq.deutsch_jozsa_algorithm_three_qbits import (
+    classify_oracle, classify_phase_oracles, make_oracle, phase_oracle,
+    random_truth_table, simulate_phase_oracles)
+
+
+def test_phase_oracle_states_match_cirq() -> None:
+    """the NumPy state vectors are those of the cirq circuit"""
+    rng: np.random.Generator = np.random.default_rng(5)
+    n_inputs: int = 4
+    inputs: list[cirq.LineQubit] = cirq.LineQubit.range(n_inputs)
+    tables: np.ndarray = np.stack(
+        [random_truth_table(n_inputs, True, rng),
+         random_truth_table(n_inputs, False, rng),
+         rng.integers(2, size=2**n_inputs, dtype=np.uint8)])
+    states: np.ndarray = simulate_phase_oracles(tables)
+    for table, state in zip(tables, states):
+        circuit = cirq.Circuit(cirq.H.on_each(*inputs),
+                               phase_oracle(table, inputs),
+                               cirq.H.on_each(*inputs))
+        expected: np.ndarray = cirq.final_state_vector(
+            circuit, qubit_order=inputs, dtype=np.complex128)
+        np.testing.assert_allclose(state, expected, atol=1e-9)
+
+
+def test_phase_and_full_oracles_agree() -> None:
+    """the phase oracle classifies like the multi-controlled X oracle"""
+    inputs: list[cirq.LineQubit] = cirq.LineQubit.range(3)
+    target = cirq.LineQubit(3)
+    for table in ([0] * 8, [1] * 8, [0, 1, 1, 0, 1, 0, 0, 1]):
+        expected: str = classify_oracle(
+            make_oracle(table, inputs, target), inputs, target)
+        assert classify_oracle(
+            phase_oracle(table, inputs), inputs, target) == expected
+        assert classify_phase_oracles(np.array([table]))[0] == expected
+
+
+def test_batched_one_input_classification() -> None:
+    """the batched pass tells the four one-input oracles apart"""
+    rows = classify_oracles(ORACLES, Q_0, Q_1)
+    assert {name: row.kind for name, row in rows.items()} == {
+        'constant_0': 'constant', 'constant_1': 'constant',
+        'balanced': 'balanced', 'balanced_': 'balanced'}
+    # One batched pass, so one simulate time for every oracle
+    assert len({row.simulate_seconds for row in rows.values()}) == 1
@@ -0,0 +1,84 @@
+"""
+Grover's iteration count and the two-amplitude fast path
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+from qiskit.quantum_info import Statevector
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.qiskit.grover_algorithm import (grover_circuit,
+                                                grover_probabilities,
+                                                grover_state_vector,
+                                                grover_subspace,
+                                                optimal_iterations)
+
+
+# (n_qubits, marked states)
+CASES: list[tuple[int, list[int]]] = [
+    (2, [3]), (3, [5]), (4, [1, 6, 9]), (5, [0, 4, 17, 30, 31]), (6, [42])]
+
+
+def test_optimal_iterations() -> None:
+    """known counts, and no iterations when every state is marked"""
+    assert optimal_iterations(2, 1) == 1
+    assert optimal_iterations(3, 1) == 2
+    assert optimal_iterations(4, 1) == 3
+    assert optimal_iterations(10, 1) == 25
+    assert optimal_iterations(3, 8) == 0
+    # The chosen count succeeds with probability at least 1 - M / N
+    for n_qubits in range(1, 12):
+        for n_marked in range(1, 2**n_qubits + 1, max(2**n_qubits // 7, 1)):
+            k_opt: int = optimal_iterations(n_qubits, n_marked)
+            assert grover_probabilities(n_qubits, n_marked, k_opt) >= \
+                1 - n_marked / 2**n_qubits - 1e-12
+
+
+@pytest.mark.parametrize('n_marked', [0, -1, 9])
+def test_optimal_iterations_validation(n_marked: int) -> None:
+    """at least one and at most 2^n marked states"""
+    with pytest.raises(ValueError):
+        optimal_iterations(3, n_marked)
+
+
+@pytest.mark.parametrize('n_qubits, marked', CASES)
+def test_subspace_matches_statevector(n_qubits: int,
+                                      marked: list[int]) -> None:
+    """P(marked) of the fast path equals qiskit's Statevector"""
+    iterations: int = optimal_iterations(n_qubits, len(marked)) + 2
+    marked_amp, other_amp = grover_subspace(n_qubits, len(marked),
+                                            iterations)
+    closed_form: np.ndarray = grover_probabilities(
+        n_qubits, len(marked), np.arange(iterations + 1))
+    np.testing.assert_allclose(len(marked) * marked_amp**2, closed_form,
+                               atol=1e-12)
+    for k in range(iterations + 1):
+        probabilities: np.ndarray = Statevector(grover_circuit(
+            n_qubits, marked, k, measure=False)).probabilities()
+        assert probabilities[marked].sum() == pytest.approx(
+            len(marked) * marked_amp[k]**2, abs=1e-9)
+        # Every state of a class has the same probability
+        others: np.ndarray = np.delete(probabilities, marked)
+        np.testing.assert_allclose(probabilities[marked], marked_amp[k]**2,
+                                   atol=1e-9)
+        np.testing.assert_allclose(others, other_amp[k]**2, atol=1e-9)
+
+
+@pytest.mark.parametrize('n_qubits, marked', CASES[:3])
+def test_numpy_state_vector(n_qubits: int, marked: list[int]) -> None:
+    """the NumPy oracle / diffusion steps give qiskit's probabilities"""
+    k_opt: int = optimal_iterations(n_qubits, len(marked))
+    state: np.ndarray = grover_state_vector(n_qubits, marked, k_opt)
+    expected: np.ndarray = Statevector(grover_circuit(
+        n_qubits, marked, k_opt, measure=False)).probabilities()
+    np.testing.assert_allclose(np.abs(state)**2, expected, atol=1e-9)
@@ -0,0 +1,33 @@
+"""
+StreamingHistogram against Result.histogram
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from cirq_hidary.cirq_basic import streamed_histogram
+from src.utils import run_sharded
+
+
+QUBITS: list[cirq.LineQubit] = cirq.LineQubit.range(3)
+CIRCUIT = cirq.Circuit(cirq.H(QUBITS[0]), cirq.X(QUBITS[1])**0.4,
+                       cirq.CNOT(QUBITS[0], QUBITS[2]),
+                       cirq.measure(*QUBITS, key='m'))
+
+
+def test_streamed_histogram_matches_result_histogram() -> None:
+    """the shards merged as they arrive count the same outcomes"""
+    expected = run_sharded(CIRCUIT, 20_000, seed=3, workers=1,
+                           shard_size=4_000).histogram(key='m')
+    streamed = streamed_histogram(CIRCUIT, 20_000, workers=2,
+                                  shard_size=4_000, seed=3)
+    assert streamed.counts() == expected
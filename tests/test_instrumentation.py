@@ -0,0 +1,118 @@
+"""
+Spans, nesting and stage totals of src/instrumentation.py
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+import time
+import typing
+
+import pytest
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src import instrumentation
+from src.instrumentation import (SpanRecord, annotate, instrumented, span,
+                                 stage_totals)
+from cirq_hidary.super_dense_teleportation import (alice_message_perepration,
+                                                   message_operations)
+
+
+@instrumented(stage='build')
+def _build() -> int:
+    """an instrumented function"""
+    return 1
+
+
+@pytest.fixture(name='recording')
+def fixture_recording() -> typing.Iterator[None]:
+    """record spans during the test, and leave instrumentation off"""
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def _by_name() -> dict[str, SpanRecord]:
+    """the recorded spans by name"""
+    return {record.name: record for record in instrumentation.records()}
+
+
+def test_disabled_span_is_the_shared_no_op() -> None:
+    """nothing is created or recorded while disabled"""
+    assert not instrumentation.is_enabled()
+    instrumentation.reset()
+    first = span('a', stage='simulate', shots=1)
+    # pylint: disable-next=protected-access
+    assert first is instrumentation._NULL_SPAN
+    assert span('b') is first
+    with first:
+        annotate(state_bytes=8)
+        assert _build() == 1
+    assert not instrumentation.records()
+
+
+@pytest.mark.usefixtures('recording')
+def test_nested_spans_record_their_depth() -> None:
+    """depth 0 for the outermost span, one more per open span"""
+    with span('outer', stage='sample'):
+        with span('middle', stage='simulate'):
+            annotate(state_bytes=64)
+            _build()
+        _build()
+    records: dict[str, SpanRecord] = _by_name()
+    assert records['outer'].depth == 0
+    assert records['middle'].depth == 1
+    assert records['middle'].attributes == {'state_bytes': 64}
+    depths: list[int] = [record.depth for record in instrumentation.records()
+                         if record.name.endswith('._build')]
+    assert depths == [2, 1]
+    # Spans end innermost first
+    assert [record.name for record in instrumentation.records()][-2:] == \
+        ['test_instrumentation._build', 'outer']
+
+
+@pytest.mark.usefixtures('recording')
+def test_stage_totals_do_not_double_count() -> None:
+    """a span nested in one of its own stage adds nothing"""
+    with span('outer', stage='simulate'):
+        time.sleep(0.01)
+        with span('inner', stage='simulate'):
+            time.sleep(0.01)
+            with span('shots', stage='sample'):
+                time.sleep(0.01)
+    with span('after', stage='simulate'):
+        time.sleep(0.01)
+    records: dict[str, SpanRecord] = _by_name()
+    totals: dict[str, float] = stage_totals()
+    assert totals['simulate'] == pytest.approx(
+        (records['outer'].duration_ns + records['after'].duration_ns) / 1e9)
+    assert totals['sample'] == pytest.approx(
+        records['shots'].duration_ns / 1e9)
+    assert totals['simulate'] < sum(
+        record.duration_ns for record in records.values()
+        if record.stage == 'simulate') / 1e9
+
+
+@pytest.mark.usefixtures('recording')
+def test_verbose_diagram_is_a_print_span(capsys: pytest.CaptureFixture
+                                         ) -> None:
+    """the circuit printout is timed as 'print', inside the build"""
+    qreg: list[cirq.LineQubit] = cirq.LineQubit.range(2)
+    alice_message_perepration(cirq.Circuit(), qreg, '01',
+                              message_operations(qreg), verbose=True)
+    assert "Alice's message = 01" in capsys.readouterr().out
+    records: dict[str, SpanRecord] = _by_name()
+    diagram: SpanRecord = records['super_dense_teleportation.diagram']
+    assert (diagram.stage, diagram.depth) == ('print', 1)
+    assert records[
+        'super_dense_teleportation.alice_message_perepration'].stage == \
+        'build'
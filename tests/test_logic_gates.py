@@ -0,0 +1,146 @@
+"""
+Bit-sliced gates against the one-bit-at-a-time notebook versions
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.logic_gates import (and_gate, evaluate, full_adder, full_subtractor,
+                             half_adder, half_subtractor, not_gate, or_gate,
+                             pack_bits, ripple_add, ripple_subtract,
+                             truth_table, unpack_bits, xor_gate)
+
+
+# Vector counts on and off the 64-bit word boundary
+COUNTS: list[int] = [1, 7, 63, 64, 65, 130, 1000]
+
+
+# Scalar references, as in notebooks/logic_gates
+def ref_half_adder(a_in: int, b_in: int) -> tuple[int, int]:
+    """Sum (XOR) and Carry (AND)"""
+    return a_in ^ b_in, a_in & b_in
+
+
+def ref_full_adder(a_in: int, b_in: int, c_in: int) -> tuple[int, int]:
+    """two half adders and an OR"""
+    sum_1, carry_1 = ref_half_adder(a_in, b_in)
+    total, carry_2 = ref_half_adder(sum_1, c_in)
+    return total, carry_1 | carry_2
+
+
+def ref_half_subtractor(a_in: int, b_in: int) -> tuple[int, int]:
+    """Difference (XOR) and Borrow (NOT A AND B)"""
+    return a_in ^ b_in, (1 - a_in) & b_in
+
+
+def ref_full_subtractor(a_in: int, b_in: int, d_in: int) -> tuple[int, int]:
+    """
+    a - b - d_in on one bit; the notebooks' (A XOR B) AND Bin term gives
+    no borrow for 0 - 0 - 1, so the borrow here follows the arithmetic
+    """
+    value: int = a_in - b_in - d_in
+    return value & 1, int(value < 0)
+
+
+def random_bits(count: int,
+                n_inputs: int,
+                seed: int
+                ) -> np.ndarray:
+    """(count, n_inputs) random 0/1 input vectors"""
+    return np.random.default_rng(seed).integers(
+        2, size=(count, n_inputs), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('count', COUNTS)
+def test_pack_round_trip(count: int) -> None:
+    """unpack_bits(pack_bits(x)) == x for any length"""
+    bits: np.ndarray = random_bits(count, 1, count)[:, 0]
+    words: np.ndarray = pack_bits(bits)
+    assert words.dtype == np.dtype('<u8')
+    assert words.size == -(-count // 64)
+    np.testing.assert_array_equal(unpack_bits(words, count), bits)
+
+
+def test_elementary_gates_on_random_words() -> None:
+    """NOT / AND / OR / XOR bit by bit on full random words"""
+    rng: np.random.Generator = np.random.default_rng(3)
+    a_in: np.ndarray = rng.integers(2**64, size=16, dtype=np.uint64)
+    b_in: np.ndarray = rng.integers(2**64, size=16, dtype=np.uint64)
+    count: int = 64 * a_in.size
+    a_bits: np.ndarray = unpack_bits(a_in, count)
+    b_bits: np.ndarray = unpack_bits(b_in, count)
+    expected: dict[str, list[int]] = {
+        'not': [1 - a for a in a_bits],
+        'and': [a & b for a, b in zip(a_bits, b_bits)],
+        'or': [a | b for a, b in zip(a_bits, b_bits)],
+        'xor': [a ^ b for a, b in zip(a_bits, b_bits)]}
+    results: dict[str, np.ndarray] = {
+        'not': not_gate(a_in), 'and': and_gate(a_in, b_in),
+        'or': or_gate(a_in, b_in), 'xor': xor_gate(a_in, b_in)}
+    for name, words in results.items():
+        np.testing.assert_array_equal(unpack_bits(words, count),
+                                      expected[name], err_msg=name)
+
+
+@pytest.mark.parametrize('count', COUNTS)
+@pytest.mark.parametrize('network, reference, n_inputs', [
+    (half_adder, ref_half_adder, 2),
+    (full_adder, ref_full_adder, 3),
+    (half_subtractor, ref_half_subtractor, 2),
+    (full_subtractor, ref_full_subtractor, 3)])
+def test_gates_match_the_notebooks(network, reference, n_inputs: int,
+                                   count: int) -> None:
+    """every output of every input vector equals the scalar gate"""
+    inputs: np.ndarray = random_bits(count, n_inputs, count + n_inputs)
+    expected: list[tuple[int, int]] = [
+        reference(*map(int, row)) for row in inputs]
+    np.testing.assert_array_equal(evaluate(network, inputs), expected)
+
+
+def test_truth_tables() -> None:
+    """the full truth tables, rows in counting order"""
+    table = truth_table(full_adder, ['A', 'B', 'C_in'], ['S', 'C_out'])
+    expected: list[tuple[int, ...]] = [
+        (a, b, c, *ref_full_adder(a, b, c))
+        for a in (0, 1) for b in (0, 1) for c in (0, 1)]
+    assert table.values.tolist() == [list(row) for row in expected]
+    table = truth_table(half_subtractor, ['A', 'B'], ['D', 'Bout'])
+    assert table.values.tolist() == [
+        [a, b, *ref_half_subtractor(a, b)] for a in (0, 1) for b in (0, 1)]
+
+
+def test_multi_gate_network() -> None:
+    """a 2-bit adder built from gates, 100 vectors (not a word multiple)"""
+    def two_bit_adder(a_0, a_1, b_0, b_1):
+        s_0, carry = half_adder(a_0, b_0)
+        s_1, carry = full_adder(a_1, b_1, carry)
+        return s_0, s_1, carry
+
+    inputs: np.ndarray = random_bits(100, 4, 11)
+    outputs: np.ndarray = evaluate(two_bit_adder, inputs)
+    for (a_0, a_1, b_0, b_1), out in zip(inputs.astype(int), outputs):
+        s_0, carry = ref_half_adder(a_0, b_0)
+        s_1, carry = ref_full_adder(a_1, b_1, carry)
+        assert out.tolist() == [s_0, s_1, carry]
+
+
+@pytest.mark.parametrize('count', [1, 64, 129])
+def test_ripple_add_and_subtract(count: int) -> None:
+    """ripple chains agree with integer arithmetic"""
+    rng: np.random.Generator = np.random.default_rng(count)
+    a_de: np.ndarray = rng.integers(2**20, size=count)
+    b_de: np.ndarray = rng.integers(2**20, size=count)
+    np.testing.assert_array_equal(ripple_add(a_de, b_de), a_de + b_de)
+    np.testing.assert_array_equal(ripple_subtract(a_de, b_de), a_de - b_de)
+    with pytest.raises(ValueError):
+        ripple_add(a_de, b_de, width=64)
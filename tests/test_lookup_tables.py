@@ -0,0 +1,90 @@
+"""
+Compiled lookup tables and their on-disk cache
+"""
+# pylint: disable=import-error
+
+import importlib.util
+import itertools
+import pathlib
+import sys
+import types
+
+import numpy as np
+import pytest
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.lookup_tables import LookupTable, lookup_table
+
+
+def smart_room(presence: int, ambient_light: int, door: int
+               ) -> tuple[int, int]:
+    """light and fan of notebooks/logic_gates/smart_room_controller"""
+    return presence & (1 - ambient_light), presence & (1 - door)
+
+
+def jk_next(q_in: int, set_j: int, reset_k: int) -> int:
+    """JK next state"""
+    return (set_j & (1 - q_in)) | ((1 - reset_k) & q_in)
+
+
+def load_module(path: pathlib.Path, source: str) -> types.ModuleType:
+    """write `source` to `path` and import it, so getsource sees it"""
+    path.write_text(source)
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module: types.ModuleType = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_table_matches_the_function() -> None:
+    """calls and bulk lookups equal the function on every input"""
+    for function in (smart_room, jk_next):
+        table: LookupTable = lookup_table(function)
+        rows: np.ndarray = np.array(
+            list(itertools.product((0, 1), repeat=table.n_inputs)))
+        looked_up = table.lookup(rows)
+        expected: list = [function(*map(int, row)) for row in rows]
+        for i_row, row in enumerate(rows):
+            assert table(*map(int, row)) == expected[i_row]
+        if table.scalar_output:
+            np.testing.assert_array_equal(looked_up, expected)
+        else:
+            np.testing.assert_array_equal(np.stack(looked_up, axis=1),
+                                          expected)
+
+
+def test_nothing_is_written_until_first_use(tmp_path: pathlib.Path) -> None:
+    """decorating compiles nothing and touches no directory"""
+    cache_dir: pathlib.Path = tmp_path / 'tables'
+    table: LookupTable = lookup_table(cache_dir=cache_dir)(smart_room)
+    assert not cache_dir.exists()
+    assert table(1, 0, 1) == (1, 0)
+    assert len(list(cache_dir.glob('smart_room-*.npz'))) == 1
+    # Uncached tables never write
+    assert lookup_table(jk_next).cache_dir is None
+
+
+def test_source_change_invalidates_the_cache(tmp_path: pathlib.Path
+                                             ) -> None:
+    """a new source hash compiles a new table, the old one still loads"""
+    cache_dir: pathlib.Path = tmp_path / 'tables'
+    old = load_module(tmp_path / 'gate_v1.py',
+                      'def gate(a, b):\n    return a & b\n')
+    new = load_module(tmp_path / 'gate_v2.py',
+                      'def gate(a, b):\n    return a | b\n')
+    assert lookup_table(old.gate, cache_dir=cache_dir).lookup(
+        [[0, 1], [1, 1]]).tolist() == [0, 1]
+    assert len(list(cache_dir.glob('gate-*.npz'))) == 1
+    assert lookup_table(new.gate, cache_dir=cache_dir).lookup(
+        [[0, 1], [1, 1]]).tolist() == [1, 1]
+    assert len(list(cache_dir.glob('gate-*.npz'))) == 2
+    # The cached table is loaded, not recompiled
+    cached = LookupTable(old.gate, cache_dir)
+    cached._compile = lambda: pytest.fail(  # pylint: disable=protected-access
+        "recompiled a cached table")
+    assert cached(1, 1) == 1 and cached(0, 1) == 0
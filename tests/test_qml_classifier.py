@@ -0,0 +1,61 @@
+"""
+Training and pooled gradients of the data re-uploading classifier
+"""
+# pylint: disable=import-error
+
+import concurrent.futures
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.hybrid.qml_classifier import (QuantumClassifier,
+                                              batch_loss_and_gradient)
+
+
+def _separable(n_samples: int,
+               seed: int
+               ) -> tuple[np.ndarray, np.ndarray]:
+    """points in [-1, 1]^2, label 1 above the diagonal"""
+    points: np.ndarray = np.random.default_rng(seed).uniform(
+        -1, 1, (n_samples, 2))
+    return points, (points[:, 1] > points[:, 0]).astype(float)
+
+
+def test_fit_lowers_the_loss() -> None:
+    """a linearly separable set trains in a few epochs"""
+    features, labels = _separable(120, seed=1)
+    classifier = QuantumClassifier(n_qubits=1, layers=2, seed=3)
+    history: list[float] = classifier.fit(features, labels, epochs=10,
+                                          batch_size=20,
+                                          learning_rate=0.1)
+    assert history[-1] < 0.7 * history[0]
+    assert np.mean(classifier.predict(features) == labels) > 0.7
+
+
+def test_pooled_gradient_matches_single_process() -> None:
+    """splitting a mini-batch over workers sums to the same gradient"""
+    features, labels = _separable(100, seed=2)
+    classifier = QuantumClassifier(n_qubits=2, layers=2, seed=4)
+    classifier.fit(features[:1], labels[:1], epochs=0)
+    expected_loss, expected_gradient = batch_loss_and_gradient(
+        classifier.weights, features, labels, 2, 2)
+    with concurrent.futures.ProcessPoolExecutor(2) as pool:
+        # pylint: disable=protected-access
+        loss, gradient = classifier._batch(pool, 2, features, labels)
+    assert loss == pytest.approx(expected_loss)
+    np.testing.assert_allclose(gradient, expected_gradient, atol=1e-6)
+
+
+def test_fit_without_labels_raises() -> None:
+    """an array without `labels` has nothing to train on"""
+    features, _ = _separable(10, seed=0)
+    with pytest.raises(ValueError):
+        QuantumClassifier(seed=0).fit(features)
@@ -0,0 +1,53 @@
+"""
+Batched teleportation check against a direct cirq simulation
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.cirq.quantum_teleportation import (
+    TeleportationCheck, make_quantum_teleportation_circuit,
+    verify_teleportation)
+
+
+def test_mean_fidelity_is_one() -> None:
+    """Bob's qubit is the message for every random input"""
+    check: TeleportationCheck = verify_teleportation(
+        10_000, np.random.default_rng(8))
+    assert check.fidelity.shape == (10_000,)
+    assert abs(check.fidelity.mean() - 1) < 1e-9
+    assert check.fidelity.min() > 1 - 1e-9
+    np.testing.assert_allclose(np.linalg.norm(check.bob_bloch, axis=1), 1,
+                               atol=1e-9)
+
+
+def test_bloch_vectors_match_cirq() -> None:
+    """message and Bob's Bloch vectors as in a cirq simulation"""
+    check: TeleportationCheck = verify_teleportation(
+        5, np.random.default_rng(9))
+    simulator = cirq.Simulator(seed=9)
+    for i_msg in range(5):
+        msg, circuit = make_quantum_teleportation_circuit(
+            float(check.ran_x[i_msg]), float(check.ran_y[i_msg]))
+        message = simulator.simulate(cirq.Circuit(
+            [cirq.X(msg)**check.ran_x[i_msg],
+             cirq.Y(msg)**check.ran_y[i_msg]]))
+        np.testing.assert_allclose(
+            check.message_bloch[i_msg], cirq.bloch_vector_from_state_vector(
+                message.final_state_vector, 0), atol=1e-5)
+        # Bob's qubit is a product factor whatever Alice measured
+        final = simulator.simulate(circuit)
+        np.testing.assert_allclose(
+            check.bob_bloch[i_msg], cirq.bloch_vector_from_state_vector(
+                final.final_state_vector, 2), atol=1e-5)
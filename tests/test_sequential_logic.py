@@ -0,0 +1,164 @@
+"""
+Bit-sliced flip-flops and counters against the notebook classes
+"""
+# pylint: disable=import-error
+
+import itertools
+import pathlib
+import sys
+import typing
+
+import numpy as np
+import pytest
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.sequential_logic import (SequentialSimulator, counter_1bit, jk,
+                                  jk_flip_flop, ripple_carry, ripple_counter,
+                                  smart_light_sr, smart_light_t, sr_clocked,
+                                  sr_flip_flop_clocked, sr_priority_set,
+                                  t_flip_flop)
+
+
+# Scalar next-state references, as in notebooks/logic_gates
+def ref_sr_clocked(light: int, sr_s: int, sr_r: int, clk: int) -> int:
+    """SRFlipFlopClocked.update"""
+    if clk == 1:
+        if sr_s == 1 and sr_r == 0:
+            return 1
+        if sr_s == 0 and sr_r == 1:
+            return 0
+        if sr_s == 1 and sr_r == 1:
+            raise ValueError("Invalid state: S = 1 and R = 1!")
+    return light
+
+
+def ref_jk(light: int, set_j: int, reset_k: int) -> int:
+    """JKFlipFlop.update"""
+    if set_j == 1 and reset_k == 0:
+        return 1
+    if set_j == 0 and reset_k == 1:
+        return 0
+    if set_j == 1 and reset_k == 1:
+        return light ^ 1
+    return light
+
+
+def ref_sr_priority_set(light: int, presence: int, button: int) -> int:
+    """SmartLightSR.update"""
+    if presence == 1:
+        return 1
+    if button == 1:
+        return 0
+    return light
+
+
+def ref_t(light: int, button: int) -> int:
+    """SmartLightT.update"""
+    return light ^ 1 if button == 1 else light
+
+
+def ref_ripple(count: list[int]) -> list[int]:
+    """RippleCounter.clock_pulse, count[0] is the least significant bit"""
+    count = list(count)
+    carry: int = 1
+    for i_bit, bit in enumerate(count):
+        if carry:
+            count[i_bit] = bit ^ 1
+            carry = 0 if count[i_bit] else 1
+    return count
+
+
+@pytest.mark.parametrize('next_state, reference, n_inputs', [
+    (sr_clocked, ref_sr_clocked, 3),
+    (jk, ref_jk, 2),
+    (sr_priority_set, ref_sr_priority_set, 2),
+    (t_flip_flop, ref_t, 1)])
+def test_next_state_tables(next_state, reference: typing.Callable[..., int],
+                           n_inputs: int) -> None:
+    """one instance per (Q, inputs) row of the next-state table"""
+    rows: list[tuple[int, ...]] = [
+        row for row in itertools.product((0, 1), repeat=1 + n_inputs)
+        if next_state is not sr_clocked or row[1:] != (1, 1, 1)]
+    table: np.ndarray = np.array(rows, dtype=np.uint8)
+    sim = SequentialSimulator(next_state, len(rows), n_state=1,
+                              n_inputs=n_inputs, initial=table[:, :1].T)
+    # One clock cycle with one waveform per instance
+    final: np.ndarray = sim.run(table[:, 1:].T[None], record=False)
+    expected: list[int] = [reference(*row) for row in rows]
+    np.testing.assert_array_equal(sim.states(final)[0], expected)
+
+
+def test_clocked_sr_rejects_set_and_reset() -> None:
+    """S = R = 1 on a clock pulse raises, as in the notebook"""
+    sim: SequentialSimulator = sr_flip_flop_clocked(3)
+    sim.run(np.array([[1, 1, 0]]))
+    with pytest.raises(ValueError):
+        sim.run(np.array([[1, 1, 1]]))
+
+
+@pytest.mark.parametrize('factory, reference, n_inputs, initial', [
+    (sr_flip_flop_clocked, ref_sr_clocked, 3, 0),
+    (jk_flip_flop, ref_jk, 2, 0),
+    (smart_light_sr, ref_sr_priority_set, 2, 0),
+    (smart_light_t, ref_t, 1, 1)])
+def test_random_waveforms(factory, reference: typing.Callable[..., int],
+                          n_inputs: int, initial: int) -> None:
+    """per-instance waveforms over many cycles, 100 instances"""
+    rng: np.random.Generator = np.random.default_rng(n_inputs)
+    n_instances: int = 100
+    n_cycles: int = 20
+    waveforms: np.ndarray = rng.integers(
+        2, size=(n_cycles, n_inputs, n_instances), dtype=np.uint8)
+    if factory is sr_flip_flop_clocked:
+        # Never S = R = 1 together
+        waveforms[:, 1] &= 1 - waveforms[:, 0]
+    sim: SequentialSimulator = factory(n_instances)
+    trace: np.ndarray = sim.states(sim.run(waveforms))[:, 0]
+    for i_inst in range(n_instances):
+        light: int = initial
+        for cycle in range(n_cycles):
+            light = reference(light, *map(int, waveforms[cycle, :, i_inst]))
+            assert trace[cycle, i_inst] == light
+
+
+def test_shared_waveform() -> None:
+    """a (cycles, n_inputs) waveform drives every instance alike"""
+    sequence: list[tuple[int, int]] = [
+        (0, 0), (1, 0), (0, 0), (0, 1), (1, 1), (1, 1), (1, 0), (1, 1)]
+    sim: SequentialSimulator = jk_flip_flop(70)
+    trace: np.ndarray = sim.states(sim.run(np.array(sequence)))[:, 0]
+    light: int = 0
+    for cycle, (set_j, reset_k) in enumerate(sequence):
+        light = ref_jk(light, set_j, reset_k)
+        assert set(trace[cycle].tolist()) == {light}
+
+
+@pytest.mark.parametrize('bits', [1, 2, 3, 5])
+def test_ripple_counter_sequence(bits: int) -> None:
+    """the count goes 1, 2, ... and wraps around at 2**bits"""
+    n_cycles: int = 2**bits + 3
+    sim: SequentialSimulator = ripple_counter(65, bits=bits)
+    trace: np.ndarray = sim.run(cycles=n_cycles)
+    values: np.ndarray = sim.values(trace)
+    count: list[int] = [0] * bits
+    for cycle in range(n_cycles):
+        count = ref_ripple(count)
+        assert sim.states(trace)[cycle, :, 0].tolist() == count
+        assert set(values[cycle].tolist()) == {(cycle + 1) % 2**bits}
+
+
+def test_counter_from_given_state() -> None:
+    """instances started at different counts keep counting"""
+    initial: np.ndarray = np.array([[0, 1, 0, 1], [0, 0, 1, 1]])
+    sim = SequentialSimulator(ripple_carry, 4, n_state=2, initial=initial)
+    values: np.ndarray = sim.values(sim.run(cycles=5))
+    np.testing.assert_array_equal(
+        values, (np.arange(1, 6)[:, None] + np.arange(4)) % 4)
+    one_bit: SequentialSimulator = counter_1bit(3)
+    np.testing.assert_array_equal(
+        one_bit.values(one_bit.run(cycles=4))[:, 0], [1, 0, 1, 0])
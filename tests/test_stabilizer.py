@@ -0,0 +1,40 @@
+"""
+TableauSampler against the dense simulator
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.stabilizer import TableauSampler
+from src.utils import get_sampler
+
+
+Q_0, Q_1 = cirq.LineQubit.range(2)
+
+
+def test_reset_is_sampled_per_repetition() -> None:
+    """a reset collapses its partner differently in every repetition"""
+    circuit = cirq.Circuit(cirq.H(Q_0), cirq.CNOT(Q_0, Q_1), cirq.reset(Q_0),
+                           cirq.measure(Q_0, Q_1, key='m'))
+    for sampler in (TableauSampler(seed=1), get_sampler(circuit, seed=1)):
+        counts = sampler.run(circuit, repetitions=1000).histogram(key='m')
+        assert set(counts) == {0, 1}
+        assert 400 < counts[0] < 600
+
+
+def test_terminal_measurements_use_the_tableau() -> None:
+    """a Bell pair is always measured equal"""
+    circuit = cirq.Circuit(cirq.H(Q_0), cirq.CNOT(Q_0, Q_1),
+                           cirq.measure(Q_0, Q_1, key='m'))
+    counts = TableauSampler(seed=1).run(
+        circuit, repetitions=1000).histogram(key='m')
+    assert set(counts) == {0, 3}
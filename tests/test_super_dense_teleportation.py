@@ -0,0 +1,68 @@
+"""
+Superdense-coding distributions and throughput
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from cirq_hidary.super_dense_teleportation import (
+    ThroughputReport, alice_message_perepration, bit_string,
+    bob_message_measurement, message_distributions, message_operations,
+    superdense_throughput)
+
+
+DATA: bytes = np.random.default_rng(0).integers(
+    256, size=4096, dtype=np.uint8).tobytes()
+
+
+def test_noiseless_distributions_decode_every_message() -> None:
+    """each message is received as itself, as the sampled circuit reads it"""
+    np.testing.assert_allclose(message_distributions(0.0), np.eye(4),
+                               atol=1e-6)
+    qreg: list[cirq.LineQubit] = cirq.LineQubit.range(2)
+    messages = message_operations(qreg)
+    for mesg in sorted(messages):
+        circuit: cirq.Circuit = bob_message_measurement(
+            alice_message_perepration(cirq.Circuit(), qreg, mesg, messages),
+            qreg)
+        result = cirq.Simulator(seed=1).run(circuit, repetitions=1)
+        assert bit_string(result.measurements.values()) == mesg
+
+
+def test_noiseless_throughput_is_exact() -> None:
+    """noise 0 decodes every bit"""
+    report: ThroughputReport = superdense_throughput(
+        DATA, 0.0, np.random.default_rng(1))
+    assert report.bits == 8 * len(DATA)
+    assert report.bit_errors == 0 and report.error_rate == 0
+    assert report.received == DATA
+
+
+def test_error_rate_rises_with_noise() -> None:
+    """more depolarizing noise, more bit errors"""
+    rates: list[float] = [
+        superdense_throughput(DATA, noise, np.random.default_rng(2)
+                              ).error_rate
+        for noise in (0.0, 0.01, 0.05, 0.2)]
+    assert rates[0] == 0
+    assert all(low < high for low, high in zip(rates, rates[1:]))
+    # Exact error rates from the distributions, same ordering
+    exact: list[float] = []
+    for noise in (0.01, 0.05, 0.2):
+        distributions: np.ndarray = message_distributions(noise)
+        wrong_bits: np.ndarray = np.array(
+            [[bin(sent ^ got).count('1') for got in range(4)]
+             for sent in range(4)])
+        exact.append(float((distributions * wrong_bits).sum() / 8))
+    np.testing.assert_allclose(rates[1:], exact, rtol=0.15)
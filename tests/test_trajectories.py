@@ -0,0 +1,57 @@
+"""
+NoiseModel placement and batched trajectories
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.trajectories import (NoiseModel, density_matrix_probabilities,
+                              sample_trajectories)
+
+
+Q_0, Q_1 = cirq.LineQubit.range(2)
+
+
+def test_gates_next_to_measurements_get_noise() -> None:
+    """a gate sharing its moment with a measurement is still noisy"""
+    circuit = cirq.Circuit(cirq.Moment(cirq.X(Q_0), cirq.measure(Q_1)),
+                           cirq.Moment(cirq.measure(Q_0)))
+    noisy: cirq.Circuit = NoiseModel(depolarizing=0.1, readout=0.2).apply(
+        circuit)
+    depolarized: set[cirq.Qid] = {
+        op.qubits[0] for op in noisy.all_operations()
+        if isinstance(op.gate, cirq.DepolarizingChannel)}
+    flipped: list[cirq.Qid] = [
+        op.qubits[0] for op in noisy.all_operations()
+        if isinstance(op.gate, cirq.BitFlipChannel)]
+    assert depolarized == {Q_0, Q_1}
+    assert sorted(flipped) == [Q_0, Q_1]
+    # The bit flip comes before the measurement of its qubit
+    for qubit in (Q_0, Q_1):
+        ops: list[cirq.Operation] = [
+            op for op in noisy.all_operations() if qubit in op.qubits]
+        assert cirq.is_measurement(ops[-1])
+        assert isinstance(ops[-2].gate, cirq.BitFlipChannel)
+
+
+def test_trajectories_match_the_density_matrix() -> None:
+    """sampled frequencies of a noisy Bell pair near the exact ones"""
+    circuit = cirq.Circuit(cirq.H(Q_0), cirq.CNOT(Q_0, Q_1),
+                           cirq.measure(Q_0, Q_1, key='m'))
+    noisy: cirq.Circuit = NoiseModel(0.05, 0.05, 0.02).apply(circuit)
+    exact: np.ndarray = density_matrix_probabilities(noisy, [Q_0, Q_1])
+    bits: np.ndarray = sample_trajectories(noisy, 20_000, seed=1)['m']
+    frequencies: np.ndarray = np.bincount(
+        2 * bits[:, 0] + bits[:, 1], minlength=4) / len(bits)
+    np.testing.assert_allclose(frequencies, exact, atol=0.015)
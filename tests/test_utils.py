@@ -0,0 +1,49 @@
+"""
+Sharded runs and the simulator policy of src/utils.py
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from src.utils import (clear_simulators, get_simulator, iter_shards,
+                       map_shards, set_simulator_policy)
+
+
+QUBITS: list[cirq.LineQubit] = cirq.LineQubit.range(2)
+CIRCUIT = cirq.Circuit(cirq.H(QUBITS[0]), cirq.X(QUBITS[1])**0.3,
+                       cirq.measure(*QUBITS, key='m'))
+
+
+def test_iter_shards_matches_map_shards() -> None:
+    """the streamed shards are the same, in the same order"""
+    streamed: list[dict[str, np.ndarray]] = list(iter_shards(
+        CIRCUIT, 5_000, seed=7, workers=2, shard_size=1_000))
+    listed: list[dict[str, np.ndarray]] = map_shards(
+        CIRCUIT, 5_000, seed=7, workers=1, shard_size=1_000)
+    assert len(streamed) == len(listed) == 5
+    for stream_shard, list_shard in zip(streamed, listed):
+        np.testing.assert_array_equal(stream_shard['m'], list_shard['m'])
+
+
+def test_policy_keeps_the_seed_when_only_dtype_changes() -> None:
+    """set_simulator_policy(dtype=...) does not clear an earlier seed"""
+    set_simulator_policy(seed=1234)
+    try:
+        set_simulator_policy(dtype=np.complex128)
+        assert get_simulator() is get_simulator(np.complex128, 1234)
+        set_simulator_policy(seed=None)
+        assert get_simulator() is get_simulator(np.complex128, None)
+    finally:
+        set_simulator_policy(dtype=np.complex64, seed=None)
+        clear_simulators()
@@ -0,0 +1,98 @@
+"""
+Parameter-shift gradients of VariationalEngine against finite differences
+"""
+# pylint: disable=import-error
+
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+import sympy
+
+import cirq
+
+# Make the repository importable when the tests are run from anywhere
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+# pylint: disable=wrong-import-position
+from algorithms.hybrid.variational_qc import VariationalEngine
+
+
+THETA, PHI = sympy.symbols('theta phi')
+Q_0, Q_1 = cirq.LineQubit.range(2)
+HAMILTONIAN: cirq.PauliSum = (cirq.X(Q_0) * cirq.Y(Q_1)
+                              + 0.5 * cirq.Z(Q_0) - 0.3 * cirq.Y(Q_1))
+
+
+def _finite_difference(engine: VariationalEngine,
+                       params: np.ndarray,
+                       step: float = 1e-6
+                       ) -> np.ndarray:
+    """central differences of the energy"""
+    return np.array([
+        (engine.energy(params + step * unit)
+         - engine.energy(params - step * unit)) / (2 * step)
+        for unit in np.eye(len(params))])
+
+
+@pytest.mark.parametrize('two_qubit_gate', [
+    cirq.ISWAP**PHI,
+    cirq.PhasedISwapPowGate(phase_exponent=0.3, exponent=PHI),
+    cirq.FSimGate(theta=PHI, phi=0.2),
+    cirq.ZZ**(2 * PHI + 0.1),
+])
+def test_gradient_matches_finite_differences(two_qubit_gate: cirq.Gate
+                                             ) -> None:
+    """gates with more than two eigenvalues are decomposed first"""
+    ansatz = cirq.Circuit(
+        cirq.X(Q_0)**THETA, cirq.H(Q_1),
+        two_qubit_gate.on(Q_0, Q_1),
+        cirq.Y(Q_1)**THETA)
+    engine = VariationalEngine(ansatz, [THETA, PHI], HAMILTONIAN,
+                               simulator=cirq.Simulator(dtype=np.complex128))
+    for params in ([0.3, 0.7], [-0.4, 1.3]):
+        params = np.array(params)
+        energy, gradient = engine.energy_and_gradient(params)
+        assert energy == pytest.approx(engine.energy(params))
+        np.testing.assert_allclose(
+            gradient, _finite_difference(engine, params), atol=1e-5)
+
+
+class _OpaqueGate(cirq.Gate):
+    """parameterized single-qubit gate without a decomposition"""
+
+    def _num_qubits_(self) -> int:
+        return 1
+
+    def _is_parameterized_(self) -> bool:
+        return True
+
+
+def test_unsupported_gate_raises() -> None:
+    """parameterized gates without a decomposition are rejected"""
+    ansatz = cirq.Circuit(_OpaqueGate().on(Q_0))
+    with pytest.raises(ValueError):
+        VariationalEngine(ansatz, [THETA], cirq.PauliSum.from_pauli_strings(
+            cirq.Z(Q_0)))
+
+
+@pytest.mark.parametrize('exponent', [THETA**2, THETA * PHI, sympy.sin(PHI)])
+def test_nonlinear_exponent_raises(exponent: sympy.Expr) -> None:
+    """the error names the exponent the shift rule cannot handle"""
+    ansatz = cirq.Circuit(cirq.H(Q_0), cirq.X(Q_0)**exponent)
+    with pytest.raises(ValueError, match='unsupported exponent'):
+        VariationalEngine(ansatz, [THETA, PHI], HAMILTONIAN)
+    # Also for a gate that is decomposed first
+    ansatz = cirq.Circuit(cirq.ISWAP(Q_0, Q_1)**exponent)
+    with pytest.raises(ValueError, match=r'ISWAP\*\*'):
+        VariationalEngine(ansatz, [THETA, PHI], HAMILTONIAN)
+
+
+def test_unknown_symbol_raises() -> None:
+    """every symbol of the ansatz must be one of the parameters"""
+    ansatz = cirq.Circuit(cirq.X(Q_0)**THETA, cirq.Y(Q_1)**PHI)
+    with pytest.raises(ValueError, match='phi'):
+        VariationalEngine(ansatz, [THETA], HAMILTONIAN)